@@ -0,0 +1,307 @@
+import time
+import logging
+import threading
+import multiprocessing as mp
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from leitor_frames import posicionar
+
+# Estado de cada posição do anel
+LIVRE, ESCREVENDO, NA_FILA, LENDO = 0, 1, 2, 3
+
+# Contadores globais no cabeçalho
+_PROX_SEQ, _DESCARTADOS, _FECHADO, _ESCRITOS = range(4)
+
+POLITICAS = ("bloquear", "sobrescrever")
+
+QuadroAnel = namedtuple("QuadroAnel", ["seq", "idx", "t_ms", "frame"])
+
+
+class AnelFrames:
+    """
+    Anel de frames em memória compartilhada entre um processo produtor
+    (decodificação) e um consumidor (inferência). Cada posição guarda um
+    frame pré-alocado; o produtor escreve uma vez e o consumidor lê no
+    próprio buffer, como view NumPy, sem serializar o frame.
+
+    Cada frame recebe um número de sequência crescente e o consumidor
+    sempre recebe o mais antigo na fila. Quando não há posição livre,
+    `politica="bloquear"` faz o produtor esperar e `"sobrescrever"` descarta
+    o frame mais antigo ainda não lido. O frame devolvido por `ler` continua
+    válido até a próxima chamada de `ler` ou `liberar`.
+
+    Um produtor e um consumidor por anel. O objeto pode ser passado como
+    argumento para um processo filho, que se conecta ao mesmo bloco.
+    """
+
+    def __init__(self, forma, slots=8, politica="bloquear", dtype=np.uint8, ctx=None):
+        if slots < 2:
+            raise ValueError("O anel precisa de pelo menos 2 posições.")
+        if politica not in POLITICAS:
+            raise ValueError(f"Política inválida '{politica}' (use {POLITICAS}).")
+        ctx = ctx or mp.get_context("spawn")
+        self.forma = tuple(forma)
+        self.slots = slots
+        self.politica = politica
+        self.dtype = np.dtype(dtype)
+        self._cond = ctx.Condition(ctx.Lock())
+        tamanho = self._tamanho_cabecalho() + slots * int(np.prod(self.forma)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=tamanho)
+        self._dono = True
+        self._mapear()
+        self._cab[:] = 0
+
+    def _tamanho_cabecalho(self):
+        # estado, seq, idx (int64) e t_ms (float64) por posição + contadores
+        return (4 * self.slots + 4) * 8
+
+    def _mapear(self):
+        n = self.slots
+        buf = self._shm.buf
+        self._cab = np.ndarray(4 * n + 4, dtype=np.int64, buffer=buf)
+        self._estado = self._cab[:n]
+        self._seq = self._cab[n:2 * n]
+        self._idx = self._cab[2 * n:3 * n]
+        self._t_ms = np.ndarray(n, dtype=np.float64, buffer=buf, offset=3 * n * 8)
+        self._cont = self._cab[4 * n:]
+        self._frames = np.ndarray((n,) + self.forma, dtype=self.dtype,
+                                  buffer=buf, offset=self._tamanho_cabecalho())
+        self._segurado = -1
+
+    def __getstate__(self):
+        return {"nome": self._shm.name, "forma": self.forma, "slots": self.slots,
+                "politica": self.politica, "dtype": self.dtype.str, "cond": self._cond}
+
+    def __setstate__(self, estado):
+        self.forma = estado["forma"]
+        self.slots = estado["slots"]
+        self.politica = estado["politica"]
+        self.dtype = np.dtype(estado["dtype"])
+        self._cond = estado["cond"]
+        self._shm = shared_memory.SharedMemory(name=estado["nome"])
+        self._dono = False
+        self._mapear()
+
+    @property
+    def descartados(self):
+        return int(self._cont[_DESCARTADOS])
+
+    @property
+    def escritos(self):
+        return int(self._cont[_ESCRITOS])
+
+    @property
+    def fechado(self):
+        return bool(self._cont[_FECHADO])
+
+    def ocupacao(self):
+        """Quantidade de frames na fila, ainda não lidos."""
+        with self._cond:
+            return int((self._estado == NA_FILA).sum())
+
+    def _mais_antigo(self):
+        na_fila = np.flatnonzero(self._estado == NA_FILA)
+        if len(na_fila) == 0:
+            return -1
+        return int(na_fila[np.argmin(self._seq[na_fila])])
+
+    def escrever(self, frame, idx=-1, t_ms=0.0, timeout=None):
+        """
+        Copia `frame` para uma posição livre. Retorna False se o anel foi
+        fechado ou se `timeout` expirou esperando espaço (política bloquear).
+        """
+        pos = self.posicao_livre(timeout)
+        if pos is None:
+            return False
+        # A posição reservada não é tocada pelo consumidor: copia fora da trava
+        s, destino = pos
+        destino[...] = frame
+        self.publicar(s, idx, t_ms)
+        return True
+
+    def posicao_livre(self, timeout=None):
+        """Alternativa sem cópia a `escrever`: devolve `(posição, view)` para o produtor preencher."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._cont[_FECHADO]:
+                    return None
+                livres = np.flatnonzero(self._estado == LIVRE)
+                if len(livres):
+                    s = int(livres[0])
+                    self._estado[s] = ESCREVENDO
+                    return s, self._frames[s]
+                if self.politica == "sobrescrever":
+                    antigo = self._mais_antigo()
+                    if antigo >= 0:
+                        self._estado[antigo] = LIVRE
+                        self._cont[_DESCARTADOS] += 1
+                        continue
+                resto = None if limite is None else limite - time.monotonic()
+                if resto is not None and resto <= 0:
+                    return None
+                self._cond.wait(0.1 if resto is None else min(resto, 0.1))
+
+    def publicar(self, s, idx=-1, t_ms=0.0):
+        """Coloca na fila a posição obtida com `posicao_livre`."""
+        with self._cond:
+            self._seq[s] = self._cont[_PROX_SEQ]
+            self._cont[_PROX_SEQ] += 1
+            self._cont[_ESCRITOS] += 1
+            self._idx[s] = idx
+            self._t_ms[s] = t_ms
+            self._estado[s] = NA_FILA
+            self._cond.notify_all()
+
+    def ler(self, timeout=None):
+        """
+        Retorna o `QuadroAnel` mais antigo na fila, com o frame como view da
+        memória compartilhada. Libera o frame lido anteriormente. Retorna None
+        quando o anel foi fechado e está vazio, ou se `timeout` expirou.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._liberar()
+            while True:
+                s = self._mais_antigo()
+                if s >= 0:
+                    break
+                if self._cont[_FECHADO]:
+                    return None
+                resto = None if limite is None else limite - time.monotonic()
+                if resto is not None and resto <= 0:
+                    return None
+                self._cond.wait(0.1 if resto is None else min(resto, 0.1))
+            self._estado[s] = LENDO
+            self._segurado = s
+            return QuadroAnel(int(self._seq[s]), int(self._idx[s]), float(self._t_ms[s]), self._frames[s])
+
+    def _liberar(self):
+        if self._segurado >= 0:
+            self._estado[self._segurado] = LIVRE
+            self._segurado = -1
+            self._cond.notify_all()
+
+    def liberar(self):
+        """Devolve ao produtor a posição do último frame lido."""
+        with self._cond:
+            self._liberar()
+
+    def fechar(self):
+        """Sinaliza o fim do fluxo; o consumidor ainda recebe o que estiver na fila."""
+        with self._cond:
+            self._cont[_FECHADO] = 1
+            self._cond.notify_all()
+
+    def encerrar(self):
+        """Desconecta do bloco de memória; o criador também o remove."""
+        # Views NumPy precisam sair antes de fechar o mmap
+        self._cab = self._estado = self._seq = self._idx = None
+        self._t_ms = self._cont = self._frames = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # Ainda há views externas (ex.: último frame lido); o mmap fecha com elas
+            pass
+        if self._dono:
+            self._shm.unlink()
+
+
+def _decodificar(video_path, tamanho, anel, passo, stop_event, inicio=0):
+    """Processo de decodificação: lê, redimensiona direto no anel e publica."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        idx = posicionar(cap, inicio) - 1
+        while not stop_event.is_set():
+            idx += 1
+            if idx < inicio or idx % passo:
+                if not cap.grab():
+                    break
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            t_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            pos = anel.posicao_livre(timeout=0.5)
+            while pos is None and not stop_event.is_set() and not anel.fechado:
+                pos = anel.posicao_livre(timeout=0.5)
+            if pos is None:
+                break
+            s, destino = pos
+            cv2.resize(frame, tamanho, dst=destino)
+            anel.publicar(s, idx, t_ms)
+    except Exception:
+        logging.exception("Erro no processo de decodificação.")
+    finally:
+        cap.release()
+        anel.fechar()
+        anel.encerrar()
+
+
+class LeitorFramesProcesso:
+    """
+    Mesma interface do `LeitorFrames`, mas com a decodificação em outro
+    processo e os frames entregues pelo `AnelFrames`, sem cópia entre
+    processos. O frame devolvido vale até a próxima iteração.
+    """
+
+    def __init__(self, video_path, tamanho, slots=8, stop_event=None, passo=1, politica="bloquear", inicio=0):
+        ctx = mp.get_context("spawn")
+        w, h = tamanho
+        self.anel = AnelFrames((h, w, 3), slots, politica, ctx=ctx)
+        self.stop_event = stop_event
+        self._parar = ctx.Event()
+        self._processo = ctx.Process(
+            target=_decodificar, name="decodificacao",
+            args=(video_path, tuple(tamanho), self.anel, max(int(passo), 1), self._parar, inicio),
+            daemon=True
+        )
+
+    def iniciar(self):
+        self._processo.start()
+        if self.stop_event is not None:
+            # Repassa a parada externa (threading.Event) ao processo
+            threading.Thread(target=self._vigiar, daemon=True).start()
+        return self
+
+    def _vigiar(self):
+        while self._processo.is_alive():
+            if self.stop_event.wait(0.1):
+                self._parar.set()
+                self.anel.fechar()
+                return
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            if self.stop_event is not None and self.stop_event.is_set():
+                raise StopIteration
+            q = self.anel.ler(timeout=0.1)
+            if q is not None:
+                return q.idx, q.frame, q.t_ms
+            if self.anel.fechado or not self._processo.is_alive():
+                # Último dreno: pode ter chegado algo entre as verificações
+                q = self.anel.ler(timeout=0)
+                if q is None:
+                    raise StopIteration
+                return q.idx, q.frame, q.t_ms
+
+    @property
+    def descartados(self):
+        return self.anel.descartados
+
+    def parar(self):
+        self._parar.set()
+        self.anel.fechar()
+        self._processo.join(timeout=2.0)
+        if self._processo.is_alive():
+            self._processo.terminate()
+            self._processo.join()
+        self.anel.liberar()
+        self.anel.encerrar()
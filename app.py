@@ -1,4 +1,6 @@
 import os
+import queue
+import shutil
 import threading
 import logging
 import sqlite3
@@ -11,6 +13,8 @@ import requests
 from contar_nVideo import contar_veiculos_nVideo
 from contar import contar_veiculos
 from definir_areas import AreaSelector
+from orquestrador import Orquestrador
+from rastreadores import RASTREADORES
 
 # --- Config e logging ---
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -26,10 +30,15 @@ YOLO_MODELS = {
     "yolov8m.pt": "https://github.com/ultralytics/ultralytics/releases/download/v8.0.0/yolov8m.pt",
     "yolov5nu.pt": "https://github.com/ultralytics/yolov5/releases/download/v6.0/yolov5nu.pt",
 }
+LARGURAS_INFERENCIA = {
+    "Padrão do modelo": None, "320 px": 320, "480 px": 480,
+    "640 px": 640, "960 px": 960
+}
 CLASSES_DISPONIVEIS = {
     "Pessoa": 0, "Bicicleta": 1, "Carro": 2,
     "Moto": 3, "Ônibus": 5, "Caminhão": 7
 }
+STATS_POLL_MS = 250  # intervalo de leitura dos instantâneos da contagem
 
 os.makedirs(RESULT_DIR, exist_ok=True)
 os.makedirs(MODEL_DIR, exist_ok=True)
@@ -53,6 +62,15 @@ class App(ctk.CTk):
         self.class_vars = {name: ctk.IntVar(value=1) for name in CLASSES_DISPONIVEIS}
         self.show_video_var = ctk.BooleanVar(value=True)  # novo: controla se vídeo será exibido
         self.stop_flag = threading.Event()  # novo: controla parada manual
+        self.roi_var = ctk.BooleanVar(value=False)  # inferência só no recorte das áreas
+        self.motion_var = ctk.BooleanVar(value=False)  # pula o detector sem movimento
+        self.save_tracks_var = ctk.BooleanVar(value=False)  # grava trilhas para recontagem
+        self.save_video_var = ctk.BooleanVar(value=False)  # grava o vídeo anotado (modo com vídeo)
+        self.inference_width = ctk.StringVar(value=list(LARGURAS_INFERENCIA.keys())[0])
+        self.tracker_name = ctk.StringVar(value="botsort")  # "iou": rastreador leve em NumPy
+        self.orquestrador = None  # criado ao abrir a janela de múltiplas câmeras
+        self.stats_queue = queue.Queue(maxsize=16)  # instantâneos publicados pela contagem
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Layout
         self.grid_columnconfigure(0, weight=1)
@@ -65,6 +83,8 @@ class App(ctk.CTk):
 
         self.progress_bar = ctk.CTkProgressBar(self, mode='determinate')
         self.progress_bar.set(0)
+        self.create_stats_panel()
+        self.after(STATS_POLL_MS, self.poll_stats)
         self.toggle_video_source_input()
 
     def create_settings_frame(self):
@@ -94,7 +114,10 @@ class App(ctk.CTk):
         row=5, column=0, columnspan=2, sticky="w", padx=10, pady=5
      )
         ctk.CTkOptionMenu(frm, variable=self.model_name, values=list(YOLO_MODELS.keys())).grid(
-        row=6, column=0, columnspan=2, sticky="ew", padx=10, pady=10
+        row=6, column=0, sticky="ew", padx=10, pady=10
+     )
+        ctk.CTkOptionMenu(frm, variable=self.inference_width, values=list(LARGURAS_INFERENCIA.keys())).grid(
+        row=6, column=1, sticky="ew", padx=10, pady=10
      )
 
       # 2.1 Nome da Câmera (opcional)
@@ -113,6 +136,28 @@ class App(ctk.CTk):
         ctk.CTkCheckBox(frm, text="Exibir vídeo durante contagem", variable=self.show_video_var).grid(
         row=10, column=0, columnspan=2, sticky="w", padx=20
         )
+        ctk.CTkCheckBox(frm, text="Detectar apenas na região das áreas (mais rápido)",
+        variable=self.roi_var).grid(
+        row=11, column=0, columnspan=2, sticky="w", padx=20, pady=(5, 0)
+        )
+        ctk.CTkCheckBox(frm, text="Pular detecção quando não houver movimento",
+        variable=self.motion_var).grid(
+        row=12, column=0, columnspan=2, sticky="w", padx=20, pady=(5, 0)
+        )
+        ctk.CTkCheckBox(frm, text="Salvar trilhas para recontar com outras áreas",
+        variable=self.save_tracks_var).grid(
+        row=13, column=0, columnspan=2, sticky="w", padx=20, pady=(5, 10)
+        )
+        ctk.CTkLabel(frm, text="Rastreador (iou: mais leve, para câmera fixa)").grid(
+        row=14, column=0, sticky="w", padx=20, pady=(0, 10)
+        )
+        ctk.CTkOptionMenu(frm, variable=self.tracker_name, values=list(RASTREADORES)).grid(
+        row=14, column=1, sticky="ew", padx=10, pady=(0, 10)
+        )
+        ctk.CTkCheckBox(frm, text="Salvar vídeo anotado ao lado do relatório (com exibição)",
+        variable=self.save_video_var).grid(
+        row=15, column=0, columnspan=2, sticky="w", padx=20, pady=(0, 10)
+        )
 
     def create_class_selection_frame(self):
         frm = ctk.CTkFrame(self)
@@ -159,6 +204,47 @@ class App(ctk.CTk):
         self.stop_counting_button.grid(row=4, column=0, pady=10, sticky="ew")
         self.stop_counting_button.grid_remove()  # começa invisível
 
+        ctk.CTkButton(frm, text="Múltiplas Câmeras", command=self.show_cameras,
+                      fg_color="gray30", hover_color="gray40").grid(
+            row=5, column=0, pady=5, sticky="ew"
+        )
+
+    def create_stats_panel(self):
+        # Painel ao vivo da contagem; aparece no primeiro instantâneo recebido
+        self.stats_frame = ctk.CTkFrame(self)
+        self.stats_frame.grid_columnconfigure(0, weight=1)
+        self.stats_label = ctk.CTkLabel(self.stats_frame, text="", justify="left", anchor="w",
+                                        font=ctk.CTkFont(family="Courier", size=12))
+        self.stats_label.grid(row=0, column=0, sticky="ew", padx=10, pady=5)
+
+    def poll_stats(self):
+        # Esvazia a fila e desenha só o instantâneo mais recente, então a
+        # janela não atrasa mesmo que a contagem publique mais rápido
+        ultimo = None
+        while True:
+            try:
+                ultimo = self.stats_queue.get_nowait()
+            except queue.Empty:
+                break
+        if ultimo is not None:
+            self.render_stats(ultimo)
+        self.after(STATS_POLL_MS, self.poll_stats)
+
+    def render_stats(self, st):
+        decorrido = int(st["decorrido_s"])
+        h, m, s = decorrido // 3600, decorrido // 60 % 60, decorrido % 60
+        latencia = f"{st['latencia_ms']:.1f} ms" if st["latencia_ms"] is not None else "-"
+        entradas = "  ".join(f"{n} {v}" for n, v in st["entradas"].items())
+        saidas = "  ".join(f"{n} {v}" for n, v in st["saidas"].items())
+        estado = "concluído" if st["fim"] else "ao vivo"
+        texto = (f"{st['camera'] or ''} [{estado}]  {h:02d}:{m:02d}:{s:02d}\n"
+                 f"{st['fps']:.1f} FPS | inferência {latencia} | "
+                 f"{st['frames']} frames | descartados {st['descartados']}\n"
+                 f"Entradas: {entradas}\n"
+                 f"Saídas:   {saidas}")
+        self.stats_label.configure(text=texto)
+        self.stats_frame.grid(row=6, column=0, padx=20, pady=(5, 10), sticky="ew")
+
     def select_video_file(self):
         path = filedialog.askopenfilename(
             title="Selecione um vídeo",
@@ -210,6 +296,9 @@ class App(ctk.CTk):
 
     def start_counting(self):
         self.stop_flag.clear()
+        # Descarta instantâneos de uma contagem anterior
+        while not self.stats_queue.empty():
+            self.stats_queue.get_nowait()
         show_video = self.show_video_var.get()
 
         # Alterna exibição do botão "Finalizar Contagem"
@@ -302,7 +391,14 @@ class App(ctk.CTk):
                 model_path,
                 classes_selecionadas=selected_ids,
                 show_video=True,
-                camera_name=self.camera_name.get()
+                camera_name=self.camera_name.get(),
+                salvar_video=self.save_video_var.get(),
+                fila_estatisticas=self.stats_queue,
+                recorte_roi=self.roi_var.get(),
+                portao_movimento=self.motion_var.get(),
+                largura_inferencia=LARGURAS_INFERENCIA[self.inference_width.get()],
+                salvar_trilhas=self.save_tracks_var.get(),
+                rastreador=self.tracker_name.get()
             )
             self.last_report_path = relatorio_path
             self.after(0, lambda: self.update_status("Processamento concluído com sucesso!", "success"))
@@ -322,7 +418,13 @@ class App(ctk.CTk):
                 model_path=model_path,
                 classes_selecionadas=selected_ids,
                 camera_name=self.camera_name.get(),
-                stop_event=self.stop_flag
+                stop_event=self.stop_flag,
+                fila_estatisticas=self.stats_queue,
+                recorte_roi=self.roi_var.get(),
+                portao_movimento=self.motion_var.get(),
+                largura_inferencia=LARGURAS_INFERENCIA[self.inference_width.get()],
+                salvar_trilhas=self.save_tracks_var.get(),
+                rastreador=self.tracker_name.get()
             )
             self.last_report_path = relatorio_path
             self.after(0, lambda: self.update_status("Contagem finalizada!", "success"))
@@ -342,6 +444,90 @@ class App(ctk.CTk):
         self.update_status("Contagem interrompida manualmente.", "warning")
 
 
+    def show_cameras(self):
+        if self.orquestrador is None:
+            self.orquestrador = Orquestrador()
+
+        win = ctk.CTkToplevel(self)
+        win.title("Múltiplas Câmeras")
+        win.geometry("700x400")
+        win.transient(self)
+        win.lift()
+
+        ctk.CTkButton(win, text="Adicionar Câmera Atual (fonte, áreas e classes)",
+                      command=lambda: self.add_current_camera(win)).pack(fill="x", padx=10, pady=(10, 5))
+        ctk.CTkButton(win, text="Parar Todas", fg_color="#E74C3C", hover_color="#C0392B",
+                      command=lambda: self.run_in_thread(self.orquestrador.parar_todas)).pack(fill="x", padx=10, pady=5)
+
+        sf = ctk.CTkScrollableFrame(win)
+        sf.pack(expand=True, fill="both", padx=10, pady=10)
+        win.rows = {}
+
+        def refresh():
+            if not win.winfo_exists():
+                return
+            for nome, st in self.orquestrador.status().items():
+                if nome not in win.rows:
+                    frm = ctk.CTkFrame(sf)
+                    frm.pack(fill="x", pady=5, padx=5)
+                    frm.grid_columnconfigure(0, weight=1)
+                    lbl = ctk.CTkLabel(frm, text="", anchor="w")
+                    lbl.grid(row=0, column=0, sticky="w", padx=5)
+                    ctk.CTkButton(frm, text="Iniciar", width=80,
+                                  command=lambda n=nome: self.orquestrador.iniciar(n)).grid(row=0, column=1, padx=5)
+                    ctk.CTkButton(frm, text="Parar", width=80, fg_color="#E74C3C", hover_color="#C0392B",
+                                  command=lambda n=nome: self.run_in_thread(self.orquestrador.parar, args=(n,))
+                                  ).grid(row=0, column=2, padx=5)
+                    win.rows[nome] = lbl
+                info = f"{nome} | {st['estado']} | {st['duracao']:.0f}s | reinícios: {st['reinicios']}"
+                if st["erro"]:
+                    info += f" | erro: {st['erro'][:40]}"
+                win.rows[nome].configure(text=info)
+                if st["relatorio"]:
+                    self.last_report_path = st["relatorio"]
+            win.after(1000, refresh)
+
+        refresh()
+
+    def add_current_camera(self, win):
+        src = self.get_current_video_source()
+        if not src:
+            return
+        if not os.path.exists(AREAS_PATH):
+            messagebox.showerror("Erro", "Defina as áreas primeiro.", parent=win)
+            return
+        ids = self.get_selected_ids()
+        if not ids:
+            messagebox.showerror("Erro", "Selecione pelo menos uma classe.", parent=win)
+            return
+        model_path = os.path.join(MODEL_DIR, self.model_name.get())
+        if not os.path.exists(model_path):
+            messagebox.showerror("Erro", f"Modelo '{model_path}' não encontrado.", parent=win)
+            return
+
+        nome = self.camera_name.get().strip() or f"Câmera {len(self.orquestrador.nomes()) + 1}"
+        # Cada câmera guarda uma cópia das áreas atuais
+        areas_cam = os.path.join(RESULT_DIR, f"areas_{nome.replace(' ', '_')}.json")
+        shutil.copyfile(AREAS_PATH, areas_cam)
+        try:
+            self.orquestrador.adicionar(
+                nome, src, areas_cam, model_path, ids,
+                recorte_roi=self.roi_var.get(),
+                portao_movimento=self.motion_var.get(),
+                largura_inferencia=LARGURAS_INFERENCIA[self.inference_width.get()],
+                salvar_trilhas=self.save_tracks_var.get(),
+                rastreador=self.tracker_name.get()
+            )
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e), parent=win)
+            return
+        self.update_status(f"Câmera '{nome}' adicionada.", "success")
+
+    def on_close(self):
+        if self.orquestrador is not None:
+            self.orquestrador.encerrar()
+        self.destroy()
+
     def show_history(self):
         win = ctk.CTkToplevel(self)
         win.title("Histórico de Relatórios")
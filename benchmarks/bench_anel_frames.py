@@ -0,0 +1,98 @@
+"""
+Vazão de frames entre dois processos: `multiprocessing.Queue` (frame
+serializado a cada envio) contra o `AnelFrames` em memória compartilhada.
+
+Uso: python benchmarks/bench_anel_frames.py [--frames 600] [--largura 1280] [--altura 720] [--slots 8]
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing as mp
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anel_frames import AnelFrames
+
+
+def produtor_fila(fila, n, forma):
+    frame = np.random.default_rng(0).integers(0, 255, forma, dtype=np.uint8)
+    for i in range(n):
+        frame[0, 0, 0] = i % 256
+        fila.put((i, frame))
+    fila.put(None)
+
+
+def produtor_anel(anel, n, forma):
+    frame = np.random.default_rng(0).integers(0, 255, forma, dtype=np.uint8)
+    for i in range(n):
+        frame[0, 0, 0] = i % 256
+        anel.escrever(frame, idx=i)
+    anel.fechar()
+    anel.encerrar()
+
+
+def medir_fila(ctx, n, forma):
+    fila = ctx.Queue(maxsize=8)
+    p = ctx.Process(target=produtor_fila, args=(fila, n, forma))
+    p.start()
+    item = fila.get()  # espera o processo subir antes de medir
+    t0 = time.perf_counter()
+    recebidos, soma = 1, int(item[1][0, 0, 0])
+    while True:
+        item = fila.get()
+        if item is None:
+            break
+        soma += int(item[1][0, 0, 0])
+        recebidos += 1
+    dt = time.perf_counter() - t0
+    p.join()
+    return recebidos, dt
+
+
+def medir_anel(ctx, n, forma, slots, politica):
+    anel = AnelFrames(forma, slots, politica, ctx=ctx)
+    p = ctx.Process(target=produtor_anel, args=(anel, n, forma))
+    p.start()
+    q = anel.ler()
+    t0 = time.perf_counter()
+    recebidos, soma = 1, int(q.frame[0, 0, 0])
+    while True:
+        q = anel.ler()
+        if q is None:
+            break
+        soma += int(q.frame[0, 0, 0])
+        recebidos += 1
+    dt = time.perf_counter() - t0
+    p.join()
+    descartados = anel.descartados
+    anel.encerrar()
+    return recebidos, dt, descartados
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--largura", type=int, default=1280)
+    ap.add_argument("--altura", type=int, default=720)
+    ap.add_argument("--slots", type=int, default=8)
+    args = ap.parse_args()
+
+    ctx = mp.get_context("spawn")
+    forma = (args.altura, args.largura, 3)
+    mb = np.prod(forma) / 1e6
+    print(f"{args.frames} frames de {args.largura}x{args.altura} ({mb:.1f} MB cada)")
+
+    n, dt = medir_fila(ctx, args.frames, forma)
+    print(f"multiprocessing.Queue      {n / dt:8.1f} frames/s  ({n * mb / dt:7.0f} MB/s)")
+
+    for politica in ("bloquear", "sobrescrever"):
+        n, dt, desc = medir_anel(ctx, args.frames, forma, args.slots, politica)
+        print(f"AnelFrames ({politica:<12}) {n / dt:8.1f} frames/s  ({n * mb / dt:7.0f} MB/s)"
+              f"  recebidos={n} descartados={desc}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark: estado por trilha em dicionário de dicionários (formato
+antigo de `estados`) contra o `ArmazemTrilhas` em arrays.
+
+Uso: python benchmarks/bench_estado_trilhas.py [--frames 2000] [--objetos 80]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from estado_trilhas import ArmazemTrilhas
+
+
+def gerar_frames(n_frames, n_objetos, seed=0):
+    """IDs, classes, centróides e pertinência (entrada, saída) por frame."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    base = 0
+    for f in range(n_frames):
+        if f % 30 == 0:
+            base += n_objetos // 4
+        ids = np.arange(base, base + n_objetos, dtype=np.int64)
+        clss = rng.choice([2, 3, 5, 7], n_objetos).astype(np.int64)
+        centros = rng.integers(0, 1280, (n_objetos, 2)).astype(np.int32)
+        ent = rng.random(n_objetos) < 0.2
+        sai = rng.random(n_objetos) < 0.2
+        frames.append((ids, clss, centros, ent, sai))
+    return frames
+
+
+def rodar_dicts(frames):
+    estados = {}
+    ids_ent, ids_sai = set(), set()
+    for f, (ids, clss, centros, ent, sai) in enumerate(frames):
+        for tid, c, (cx, cy), e, s in zip(ids.tolist(), clss.tolist(), centros.tolist(),
+                                          ent.tolist(), sai.tolist()):
+            st = estados.setdefault(tid, {'in_entry': False, 'in_exit': False,
+                                          'classe': c, 'primeiro': f})
+            if e:
+                if not st['in_entry']:
+                    ids_ent.add(tid)
+                    st['in_entry'] = True
+            else:
+                st['in_entry'] = False
+            if s:
+                if not st['in_exit']:
+                    ids_sai.add(tid)
+                    st['in_exit'] = True
+            else:
+                st['in_exit'] = False
+            st['classe'] = c
+            st['ultimo'] = f
+            st['centroide'] = (cx, cy)
+    return len(ids_ent), len(ids_sai)
+
+
+def rodar_armazem(frames):
+    t = ArmazemTrilhas(ttl_frames=len(frames) + 1, max_trilhas=10**9)
+    total_ent = total_sai = 0
+    for f, (ids, clss, centros, ent, sai) in enumerate(frames):
+        slots, _ = t.slots(ids, f)
+        novos_ent = ent & ~t.na_entrada[slots] & ~t.contado_ent[slots]
+        novos_sai = sai & ~t.na_saida[slots] & ~t.contado_sai[slots]
+        total_ent += int(novos_ent.sum())
+        total_sai += int(novos_sai.sum())
+        t.contado_ent[slots[novos_ent]] = True
+        t.contado_sai[slots[novos_sai]] = True
+        t.na_entrada[slots] = ent
+        t.na_saida[slots] = sai
+        t.classe[slots] = clss
+        t.centroide[slots] = centros
+    return total_ent, total_sai
+
+
+def medir(nome, func, frames):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resultado = func(frames)
+    dt = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    us_frame = dt / len(frames) * 1e6
+    print(f"{nome:<10} {us_frame:9.1f} us/frame   pico {pico / 1e6:7.2f} MB   contagens {resultado}")
+    return resultado
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=2000)
+    ap.add_argument("--objetos", type=int, default=80)
+    args = ap.parse_args()
+
+    frames = gerar_frames(args.frames, args.objetos)
+    print(f"{args.frames} frames, {args.objetos} objetos por frame")
+    a = medir("dicts", rodar_dicts, frames)
+    b = medir("armazem", rodar_armazem, frames)
+    if a != b:
+        print("ATENÇÃO: as contagens divergem!")
+
+
+if __name__ == "__main__":
+    main()
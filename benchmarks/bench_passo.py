@@ -0,0 +1,76 @@
+"""
+Compara a contagem com detecção a cada N frames (com interpolação das
+trilhas) contra a detecção em todos os frames, no mesmo vídeo.
+
+Uso: python benchmarks/bench_passo.py VIDEO AREAS.json MODELO.pt [--passos 1 2 3 5] [--classes 2 3 5 7]
+"""
+import os
+import sys
+import time
+import argparse
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ultralytics import YOLO
+
+from deteccao import inferir
+from leitor_frames import LeitorFrames
+from motor_contagem import MotorContagem
+from zonas import obter_mascara
+
+TODAS_AS_CLASSES = {0:"Pessoa",1:"Bicicleta",2:"Carro",
+                    3:"Moto",5:"Onibus",7:"Caminhao"}
+
+
+def contar(video, areas, modelo_path, classes, passo):
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise IOError(f"Não foi possível abrir vídeo '{video}'.")
+    w_o = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    h_o = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    w_out, h_out = 1280, 720
+    mascara = obter_mascara(areas, (w_o, h_o), (w_out, h_out))
+    motor = MotorContagem(mascara, classes, TODAS_AS_CLASSES, passo=passo)
+
+    # Modelo novo a cada execução para não herdar o estado do rastreador
+    modelo = YOLO(modelo_path)
+    leitor = LeitorFrames(cap, (w_out, h_out), passo=passo).iniciar()
+    t0 = time.perf_counter()
+    n = 0
+    for idx, frame, _ in leitor:
+        motor.atualizar(*inferir(modelo, frame, classes), frame=idx)
+        n += 1
+    dt = time.perf_counter() - t0
+    leitor.parar()
+    cap.release()
+    return motor, n, dt
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("video")
+    ap.add_argument("areas")
+    ap.add_argument("modelo")
+    ap.add_argument("--passos", type=int, nargs="+", default=[1, 2, 3, 5])
+    ap.add_argument("--classes", type=int, nargs="+", default=[2, 3, 5, 7])
+    args = ap.parse_args()
+
+    passos = sorted(set(args.passos) | {1})
+    referencia = None
+    for passo in passos:
+        motor, n, dt = contar(args.video, args.areas, args.modelo, args.classes, passo)
+        ent, sai = motor.total_ids_ent, motor.total_ids_sai
+        if referencia is None:
+            referencia = (ent, sai)
+        erro_ent = (ent - referencia[0]) / referencia[0] if referencia[0] else 0.0
+        erro_sai = (sai - referencia[1]) / referencia[1] if referencia[1] else 0.0
+        print(f"passo={passo:<2} detecções={n:<6} {n / dt:6.1f} det/s  "
+              f"entradas={ent:<5} ({erro_ent:+.1%})  saídas={sai:<5} ({erro_sai:+.1%})")
+        print(f"          entradas por classe: {motor.cont_ent}")
+        print(f"          saídas por classe:   {motor.cont_sai}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Benchmark: rastreador leve `RastreadorIoU` contra o BoT-SORT do ultralytics
+sobre as mesmas detecções. Mede o tempo de rastreamento por frame (sem o
+detector) e as trocas de ID.
+
+Modo sintético (padrão, não precisa de modelo): objetos em movimento
+retilíneo com ruído, detecções perdidas e de confiança baixa; as trocas de
+ID são contadas contra o ID verdadeiro de cada objeto.
+
+Modo vídeo: roda o YOLO uma vez no vídeo, guarda as detecções e passa as
+mesmas para os dois rastreadores. Sem ID verdadeiro, conta como troca cada
+caixa que casa (IoU >= 0.5) com uma do frame anterior mas muda de ID.
+
+Uso: python benchmarks/bench_rastreadores.py [--frames 1500] [--objetos 25]
+     python benchmarks/bench_rastreadores.py --video VIDEO --modelo models/yolov8n.pt [--classes 2 3 5 7]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rastreadores import RastreadorIoU, associar, iou_matriz
+
+
+# --- Detecções ---
+
+def gerar_sintetico(n_frames, n_objetos, largura=1280, altura=720, seed=0):
+    """
+    Lista por frame de `(xyxy, conf, cls, gt)`; `gt` é o ID verdadeiro de
+    cada detecção (-1 para falsos positivos).
+    """
+    rng = np.random.default_rng(seed)
+    n_total = n_objetos * max(n_frames // 150, 1)
+    inicio = rng.integers(0, max(n_frames - 60, 1), n_total)
+    duracao = rng.integers(60, 240, n_total)
+    tam = rng.uniform(40, 140, (n_total, 2))
+    pos0 = rng.uniform([0, 0], [largura, altura], (n_total, 2))
+    vel = rng.normal(0, 6, (n_total, 2))
+    classes = rng.choice([2, 3, 5, 7], n_total)
+
+    frames = []
+    for f in range(n_frames):
+        vivos = np.flatnonzero((inicio <= f) & (f < inicio + duracao))
+        vivos = vivos[rng.random(len(vivos)) > 0.08]  # detecções perdidas
+        centro = pos0[vivos] + vel[vivos] * (f - inicio[vivos])[:, None]
+        centro += rng.normal(0, 2.0, centro.shape)
+        meia = tam[vivos] / 2 * rng.uniform(0.95, 1.05, (len(vivos), 1))
+        xyxy = np.hstack([centro - meia, centro + meia])
+        # Parte das detecções vem com confiança baixa (oclusão, borrão)
+        conf = np.where(rng.random(len(vivos)) < 0.15,
+                        rng.uniform(0.15, 0.5, len(vivos)), rng.uniform(0.6, 0.95, len(vivos)))
+        gt = vivos.astype(np.int64)
+        cls = classes[vivos]
+
+        n_falsos = rng.poisson(1.5)
+        if n_falsos:
+            c = rng.uniform([0, 0], [largura, altura], (n_falsos, 2))
+            m = rng.uniform(15, 60, (n_falsos, 2))
+            xyxy = np.vstack([xyxy, np.hstack([c - m, c + m])])
+            conf = np.concatenate([conf, rng.uniform(0.1, 0.55, n_falsos)])
+            gt = np.concatenate([gt, np.full(n_falsos, -1, dtype=np.int64)])
+            cls = np.concatenate([cls, rng.choice([2, 3, 5, 7], n_falsos)])
+        frames.append((xyxy.astype(np.float32), conf.astype(np.float32), cls.astype(np.int64), gt))
+    return frames
+
+
+def detectar_video(video, modelo, classes, limite=None):
+    """Roda o YOLO uma vez e retorna `(frames, fps)` com `(xyxy, conf, cls, None)`."""
+    import cv2
+    from ultralytics import YOLO
+
+    from deteccao import extrair_caixas
+
+    yolo = YOLO(modelo)
+    cap = cv2.VideoCapture(video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frames = []
+    while limite is None or len(frames) < limite:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        res = yolo.predict(frame, conf=0.1, verbose=False)[0]
+        xyxy, conf, cls = extrair_caixas(res)
+        sel = np.isin(cls, classes)
+        frames.append((xyxy[sel], conf[sel], cls[sel], None))
+    cap.release()
+    return frames, fps
+
+
+# --- Rastreadores ---
+
+class _Deteccoes:
+    """Imita o `Boxes` do ultralytics com o mínimo que os rastreadores usam."""
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy, self.conf, self.cls = xyxy, conf, cls.astype(np.float32)
+        self.xywh = np.hstack([(xyxy[:, :2] + xyxy[:, 2:]) / 2, xyxy[:, 2:] - xyxy[:, :2]])
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __getitem__(self, idx):
+        return _Deteccoes(self.xyxy[idx], self.conf[idx], self.cls[idx])
+
+
+def rodar_iou(frames, fps, video=None):
+    rastreador = RastreadorIoU()
+    saidas, gasto = [], 0.0
+    for xyxy, conf, cls, _ in frames:
+        t0 = time.perf_counter()
+        caixas, ids, _ = rastreador.atualizar(xyxy, conf, cls)
+        gasto += time.perf_counter() - t0
+        saidas.append((caixas, ids))
+    return saidas, gasto
+
+
+def rodar_botsort(frames, fps, video=None):
+    import cv2
+    from ultralytics.trackers.track import TRACKER_MAP
+    from ultralytics.utils import YAML, IterableSimpleNamespace
+    from ultralytics.utils.checks import check_yaml
+
+    cfg = IterableSimpleNamespace(**YAML.load(check_yaml("botsort.yaml")))
+    cap = cv2.VideoCapture(video) if video else None
+    if cap is None:
+        cfg.gmc_method = "none"  # câmera sintética parada: nada a compensar
+    rastreador = TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=int(fps))
+    vazio = np.zeros((720, 1280, 3), dtype=np.uint8)
+
+    saidas, gasto = [], 0.0
+    for xyxy, conf, cls, _ in frames:
+        img = cap.read()[1] if cap is not None else vazio
+        det = _Deteccoes(xyxy, conf, cls)
+        t0 = time.perf_counter()
+        trilhas = rastreador.update(det, img)
+        gasto += time.perf_counter() - t0
+        if len(trilhas):
+            saidas.append((trilhas[:, :4].astype(np.float32), trilhas[:, 4].astype(np.int64)))
+        else:
+            saidas.append((np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.int64)))
+    if cap is not None:
+        cap.release()
+    return saidas, gasto
+
+
+# --- Métricas ---
+
+def trocas_gt(frames, saidas):
+    """Trocas de ID contra o ID verdadeiro, como no IDSW do MOT."""
+    ultimo = {}
+    trocas = 0
+    for (xyxy, _, _, gt), (caixas, ids) in zip(frames, saidas):
+        if len(caixas) == 0 or len(xyxy) == 0:
+            continue
+        t, d = associar(iou_matriz(caixas, xyxy), 0.5)
+        for tid, g in zip(ids[t].tolist(), gt[d].tolist()):
+            if g < 0:
+                continue
+            if g in ultimo and ultimo[g] != tid:
+                trocas += 1
+            ultimo[g] = tid
+    return trocas
+
+
+def trocas_continuidade(saidas):
+    """Sem ID verdadeiro: caixas que continuam a do frame anterior com outro ID."""
+    trocas = 0
+    for (ant, ids_ant), (caixas, ids) in zip(saidas, saidas[1:]):
+        if len(ant) == 0 or len(caixas) == 0:
+            continue
+        a, b = associar(iou_matriz(ant, caixas), 0.5)
+        trocas += int((ids_ant[a] != ids[b]).sum())
+    return trocas
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=1500)
+    ap.add_argument("--objetos", type=int, default=25, help="objetos simultâneos (modo sintético)")
+    ap.add_argument("--video", default=None)
+    ap.add_argument("--modelo", default=None)
+    ap.add_argument("--classes", type=int, nargs="+", default=[2, 3, 5, 7])
+    args = ap.parse_args()
+
+    if args.video:
+        if not args.modelo:
+            ap.error("--video precisa de --modelo")
+        frames, fps = detectar_video(args.video, args.modelo, args.classes, args.frames)
+    else:
+        frames, fps = gerar_sintetico(args.frames, args.objetos), 30
+    n_det = sum(len(f[1]) for f in frames)
+    print(f"{len(frames)} frames, {n_det / max(len(frames), 1):.1f} detecções por frame")
+
+    rastreadores = [("iou", rodar_iou)]
+    try:
+        import ultralytics  # noqa: F401
+        rastreadores.append(("botsort", rodar_botsort))
+    except ImportError:
+        print("ultralytics não instalado: medindo só o rastreador iou")
+
+    for nome, func in rastreadores:
+        saidas, gasto = func(frames, fps, args.video)
+        ids = set()
+        for _, i in saidas:
+            ids.update(i.tolist())
+        if args.video:
+            trocas = f"trocas (continuidade) {trocas_continuidade(saidas):5d}"
+        else:
+            trocas = f"trocas de ID {trocas_gt(frames, saidas):5d}"
+        print(f"{nome:<8} {gasto / len(frames) * 1e3:7.3f} ms/frame   {trocas}   IDs criados {len(ids):5d}")
+    if not args.video:
+        objetos = len({g for f in frames for g in f[3].tolist() if g >= 0})
+        print(f"objetos reais: {objetos}")
+
+
+if __name__ == "__main__":
+    main()
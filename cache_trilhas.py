@@ -0,0 +1,117 @@
+import os
+import json
+
+import numpy as np
+
+# Um registro por detecção rastreada, em coordenadas da resolução de trabalho
+DTYPE_REGISTRO = np.dtype([
+    ("frame", "<i8"),
+    ("t_ms", "<f8"),
+    ("id", "<i8"),
+    ("classe", "<i2"),
+    ("xyxy", "<f4", (4,)),
+])
+
+EXT_DADOS = ".trilhas.bin"
+EXT_META = ".trilhas.json"
+
+
+def caminhos_trilhas(caminho_relatorio):
+    """Arquivos de dados e metadados gravados ao lado do relatório."""
+    base = os.path.splitext(caminho_relatorio)[0]
+    return base + EXT_DADOS, base + EXT_META
+
+
+class GravadorTrilhas:
+    """
+    Grava a saída do rastreador quadro a quadro em um arquivo binário de
+    registros fixos (`DTYPE_REGISTRO`), mais um JSON com os metadados
+    necessários para recontar depois: resolução original e de trabalho,
+    FPS, passo de detecção, modelo e classes.
+    """
+
+    def __init__(self, caminho_relatorio, meta, registros_por_bloco=4096, continuar=None):
+        self.caminho_dados, self.caminho_meta = caminhos_trilhas(caminho_relatorio)
+        self.meta = dict(meta)
+        self._bloco = []
+        self._n_bloco = 0
+        self.registros_por_bloco = registros_por_bloco
+        self.total = 0
+        os.makedirs(os.path.dirname(self.caminho_dados) or ".", exist_ok=True)
+        if continuar is not None and os.path.exists(self.caminho_dados):
+            # Retomada: mantém os `continuar` primeiros registros e acrescenta depois deles
+            self._f = open(self.caminho_dados, "ab")
+            self._f.truncate(continuar * DTYPE_REGISTRO.itemsize)
+            self.total = continuar
+        else:
+            self._f = open(self.caminho_dados, "wb")
+        self._gravar_meta()
+
+    def _gravar_meta(self):
+        meta = dict(self.meta, registros=self.total, dtype=DTYPE_REGISTRO.descr)
+        with open(self.caminho_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+    def gravar(self, frame, t_ms, xyxy, ids, clss):
+        n = len(ids)
+        if n == 0:
+            return
+        reg = np.empty(n, dtype=DTYPE_REGISTRO)
+        reg["frame"] = frame
+        reg["t_ms"] = t_ms
+        reg["id"] = ids
+        reg["classe"] = clss
+        reg["xyxy"] = xyxy
+        self._bloco.append(reg)
+        self._n_bloco += n
+        if self._n_bloco >= self.registros_por_bloco:
+            self._descarregar()
+
+    def gravar_registros(self, registros):
+        """Acrescenta registros já no formato `DTYPE_REGISTRO`."""
+        if len(registros) == 0:
+            return
+        self._bloco.append(np.asarray(registros, dtype=DTYPE_REGISTRO))
+        self._n_bloco += len(registros)
+        if self._n_bloco >= self.registros_por_bloco:
+            self._descarregar()
+
+    def _descarregar(self):
+        if self._bloco:
+            self._f.write(np.concatenate(self._bloco).tobytes())
+            self.total += self._n_bloco
+            self._bloco = []
+            self._n_bloco = 0
+
+    def posicao(self):
+        """Descarrega o bloco pendente e retorna quantos registros já estão no arquivo."""
+        self._descarregar()
+        self._f.flush()
+        return self.total
+
+    def fechar(self):
+        if self._f.closed:
+            return
+        self._descarregar()
+        self._f.close()
+        self._gravar_meta()
+
+
+def abrir_trilhas(caminho):
+    """
+    Abre um cache de trilhas (arquivo `.trilhas.bin`, `.trilhas.json` ou o
+    relatório correspondente) e retorna `(registros, meta)`, com os registros
+    mapeados em memória.
+    """
+    for ext in (EXT_DADOS, EXT_META):
+        if caminho.endswith(ext):
+            base = caminho[:-len(ext)]
+            break
+    else:
+        base = os.path.splitext(caminho)[0]
+    caminho_dados, caminho_meta = base + EXT_DADOS, base + EXT_META
+    with open(caminho_meta, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if os.path.getsize(caminho_dados) == 0:
+        return np.empty(0, dtype=DTYPE_REGISTRO), meta
+    return np.memmap(caminho_dados, dtype=DTYPE_REGISTRO, mode="r"), meta
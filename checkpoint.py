@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+
+import numpy as np
+
+PASTA_CHECKPOINTS = os.path.join("resultados", "checkpoints")
+
+
+def caminho_checkpoint(video_path, camera_name=None, pasta=PASTA_CHECKPOINTS):
+    """Arquivo de checkpoint de um vídeo (e câmera), estável entre execuções."""
+    fonte = os.path.abspath(video_path) if os.path.exists(video_path) else video_path
+    chave = hashlib.sha1(f"{fonte}|{camera_name or ''}".encode("utf-8")).hexdigest()[:12]
+    base = os.path.splitext(os.path.basename(str(video_path)))[0] or "video"
+    return os.path.join(pasta, f"{base}_{chave}.ckpt.npz")
+
+
+def salvar_checkpoint(caminho, arrays, meta):
+    """
+    Grava `arrays` (nome -> ndarray) e `meta` (JSON) de forma atômica: o
+    arquivo temporário só substitui o anterior depois de completo.
+    """
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    tmp = caminho + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, _meta=np.array(json.dumps(meta)), **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, caminho)
+
+
+def carregar_checkpoint(caminho):
+    """Retorna `(arrays, meta)` ou None se não houver checkpoint válido."""
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with np.load(caminho, allow_pickle=False) as dados:
+            arrays = {k: dados[k] for k in dados.files if k != "_meta"}
+            meta = json.loads(str(dados["_meta"]))
+    except Exception as e:
+        logging.warning(f"Checkpoint '{caminho}' ilegível, ignorando: {e}")
+        return None
+    return arrays, meta
+
+
+class GravadorCheckpoint:
+    """
+    Grava checkpoints em uma thread própria. `enviar` só guarda o estado mais
+    recente e retorna na hora; se a gravação anterior ainda não terminou, o
+    estado pendente é substituído pelo novo, sem travar o laço de frames.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.gravados = 0
+        self._pendente = None
+        self._cond = threading.Condition()
+        self._fim = False
+        self._thread = threading.Thread(target=self._gravar, daemon=True)
+        self._thread.start()
+
+    def enviar(self, arrays, meta):
+        with self._cond:
+            self._pendente = (arrays, meta)
+            self._cond.notify()
+
+    def _gravar(self):
+        while True:
+            with self._cond:
+                while self._pendente is None and not self._fim:
+                    self._cond.wait()
+                if self._pendente is None:
+                    return
+                arrays, meta = self._pendente
+                self._pendente = None
+            try:
+                salvar_checkpoint(self.caminho, arrays, meta)
+                self.gravados += 1
+            except Exception:
+                logging.exception("Erro ao gravar checkpoint.")
+
+    def fechar(self, remover=False):
+        """Grava o que estiver pendente e encerra; com `remover`, apaga o checkpoint."""
+        with self._cond:
+            self._fim = True
+            if remover:
+                self._pendente = None
+            self._cond.notify()
+        self._thread.join()
+        if remover and os.path.exists(self.caminho):
+            os.remove(self.caminho)
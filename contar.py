@@ -1,14 +1,28 @@
 import os
 import cv2
 import json
-import numpy as np
 from ultralytics import YOLO
+import time
 import datetime
+from collections import deque
 import logging
 import sqlite3
 import tkinter as tk
 from tkinter import messagebox
 
+from cache_trilhas import GravadorTrilhas
+from leitor_frames import LeitorAoVivo, eh_ao_vivo
+from exibicao import ExibidorFrames
+from gravador_video import GravadorVideo, caminho_video
+from deteccao import calcular_passo, escala_inferencia, inferir
+from rastreadores import criar_rastreador
+from motor_contagem import QUADRO_VAZIO, MotorContagem
+from perfil import PerfilEtapas
+from estatisticas import PublicadorEstatisticas
+from portao_movimento import PortaoMovimento
+from sobreposicao import CamadaZonas, PainelTexto, RastrosTrilhas
+from zonas import obter_mascara
+
 # --- Configuração básica de logging ---
 logging.basicConfig(
     level=logging.INFO,
@@ -23,6 +37,9 @@ FONT       = cv2.FONT_HERSHEY_SIMPLEX
 THICKNESS  = 1
 LINE_TYPE  = cv2.LINE_AA
 
+# --- Limite de eventos de entrada/saída mantidos em memória ---
+MAX_EVENTOS = 10000
+
 def init_db():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
@@ -55,12 +72,45 @@ def contar_veiculos(
         model_path,
         classes_selecionadas,
         show_video=True,
-        camera_name=None
+        camera_name=None,
+        ttl_trilhas=300,
+        recorte_roi=False,
+        margem_roi=32,
+        portao_movimento=False,
+        passo_deteccao=1,
+        fps_deteccao=None,
+        tamanho_saida=(1280, 720),
+        largura_inferencia=None,
+        salvar_trilhas=False,
+        ao_vivo=None,
+        rastreador="botsort",
+        fps_exibicao=15,
+        salvar_video=False,
+        codec_video="mp4v",
+        tamanho_video=None,
+        decimacao_video=1,
+        politica_video="descartar_novo",
+        perfil_etapas=False,
+        intervalo_perfil_s=60.0,
+        fila_estatisticas=None,
+        intervalo_estatisticas_s=0.5
     ):
     """
     Conta veículos em um vídeo usando YOLO, exibindo em tempo real hora local
     e totais de entradas/saídas. Pergunta se deve salvar o relatório ao fechar
     a janela. Se fornecido, inclui `camera_name` no cabeçalho e no nome do arquivo do relatório.
+    A janela é atualizada no máximo `fps_exibicao` vezes por segundo, em uma
+    thread própria, sem segurar a contagem.
+
+    Com `salvar_video`, grava ao lado do relatório o vídeo anotado (zonas,
+    caixas, rastros e contadores) em uma thread de encoder; veja
+    `GravadorVideo` para `codec_video`, `tamanho_video`, `decimacao_video` e
+    `politica_video` (o que descartar quando o encoder não acompanha).
+
+    Com `perfil_etapas`, mede o tempo de cada etapa (ver `perfil.py`) e
+    inclui p50/p95/p99 e FPS no relatório e no log a cada `intervalo_perfil_s`.
+    Com `fila_estatisticas` (`queue.Queue`), publica nela instantâneos da
+    contagem a cada `intervalo_estatisticas_s` (ver `PublicadorEstatisticas`).
     """
     init_db()
     logging.info("Iniciando contagem de veículos.")
@@ -85,8 +135,6 @@ def contar_veiculos(
         for a in areas:
             if not (isinstance(a, list) and len(a) >= 3):
                 raise ValueError("Cada área deve ter pelo menos 3 pontos.")
-        area_ent_orig = np.array(areas[0], dtype=np.int32)
-        area_sai_orig = np.array(areas[1], dtype=np.int32)
     except Exception as e:
         raise ValueError(f"Erro ao carregar áreas '{areas_path}': {e}")
 
@@ -101,12 +149,9 @@ def contar_veiculos(
                        3:"Moto",5:"Onibus",7:"Caminhao"}
     nomes_sel    = [TODAS_AS_CLASSES[c] for c in classes_selecionadas
                     if c in TODAS_AS_CLASSES]
-    cont_ent     = {n:0 for n in nomes_sel}
-    cont_sai     = {n:0 for n in nomes_sel}
-    ids_ent, ids_sai = set(), set()
-    estados      = {}
-    eventos_ent  = []
-    eventos_sai  = []
+    # Só os eventos mais recentes ficam na memória
+    eventos_ent  = deque(maxlen=MAX_EVENTOS)
+    eventos_sai  = deque(maxlen=MAX_EVENTOS)
 
     # --- Abrir vídeo ---
     cap = cv2.VideoCapture(video_path)
@@ -115,138 +160,240 @@ def contar_veiculos(
     w_o = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     h_o = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = int(cap.get(cv2.CAP_PROP_FPS)) if cap.get(cv2.CAP_PROP_FPS) > 0 else 30
-    w_out, h_out = 1280, 720
+    w_out, h_out = tamanho_saida
+    escala = escala_inferencia(largura_inferencia, w_out)
+    if escala:
+        logging.info(f"Inferência em {largura_inferencia}px de largura "
+                     f"(exibição/zonas em {w_out}x{h_out}).")
+    passo = calcular_passo(fps, passo_deteccao, fps_deteccao)
+    # Streams ao vivo processam sempre o frame mais recente
+    if ao_vivo is None:
+        ao_vivo = eh_ao_vivo(video_path, cap)
+    if ao_vivo:
+        passo = 1
+
+    # Zonas rasterizadas uma vez na resolução de trabalho (com cache)
+    mascara = obter_mascara(areas_path, (w_o, h_o), (w_out, h_out))
+    area_ent, area_sai = mascara.zonas[:2]
+    motor = MotorContagem(mascara, classes_selecionadas, TODAS_AS_CLASSES,
+                          ttl_frames=ttl_trilhas, passo=passo)
+
+    # Inferência opcional apenas no retângulo que envolve as zonas
+    roi = mascara.retangulo(margem_roi) if recorte_roi else None
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        frac = (x1 - x0) * (y1 - y0) / (w_out * h_out)
+        logging.info(f"Inferência restrita a {roi} ({frac:.0%} do frame).")
+
+    tracker = criar_rastreador(rastreador)
+
+    # Pula o detector quando nada se move nas zonas
+    portao = PortaoMovimento(mascara) if portao_movimento else None
+
+    # Cache das trilhas para recontar depois com outras áreas (recontar.py)
+    gravador = None
+    if salvar_trilhas:
+        gravador = GravadorTrilhas(caminho_relatorio, {
+            "video_path": video_path,
+            "camera_name": camera_name,
+            "modelo": os.path.basename(model_path),
+            "classes": list(classes_selecionadas),
+            "dims_origem": [w_o, h_o],
+            "tamanho_saida": [w_out, h_out],
+            "fps": fps,
+            "passo": passo,
+            "inicio": inicio_real.isoformat(sep=' ', timespec='seconds'),
+        })
+    q = QUADRO_VAZIO
+    idx = -1
 
-    fx, fy = w_out / w_o, h_out / h_o
-    area_ent = np.array([[int(x*fx), int(y*fy)] for x,y in area_ent_orig], dtype=np.int32)
-    area_sai = np.array([[int(x*fx), int(y*fy)] for x,y in area_sai_orig], dtype=np.int32)
+    # Sobreposição das zonas e textos pré-renderizados; só as caixas são
+    # desenhadas do zero a cada frame
+    camada_zonas = CamadaZonas([area_ent, area_sai], [(0,255,0), (0,0,255)], (w_out, h_out))
+    painel_hora = PainelTexto(FONT, THICKNESS, LINE_TYPE)
+    painel_contagem = PainelTexto(FONT, THICKNESS, LINE_TYPE)
+
+    def linhas_contagem():
+        linhas = [("ENTRADAS:", (10, 40), 0.8, (0,255,0))]
+        y = 65
+        for n, cnt in motor.cont_ent.items():
+            linhas.append((f"{n}: {cnt}", (10, y), 0.5, (0,255,0)))
+            y += 20
+        y += 10
+        linhas.append(("SAIDAS:", (10, y), 0.8, (0,0,255)))
+        y += 25
+        for n, cnt in motor.cont_sai.items():
+            linhas.append((f"{n}: {cnt}", (10, y), 0.6, (0,0,255)))
+            y += 20
+        return linhas
 
     # --- Configurar janela de exibição ---
     window_name = "Processando - 'f' fullscreen, 'q' sair"
-    fullscreen = False
+    exibidor = None
     if show_video:
-        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-        cv2.resizeWindow(window_name, w_out, h_out)
+        exibidor = ExibidorFrames(window_name, (w_out, h_out), fps_exibicao).iniciar()
 
     break_on_x = False
 
+    # Vídeo anotado gravado em segundo plano; o laço nunca espera o encoder
+    video = None
+    if salvar_video:
+        video = GravadorVideo(
+            caminho_video(caminho_relatorio, codec_video), fps,
+            tamanho_video or (w_out, h_out), codec=codec_video,
+            decimacao=decimacao_video, politica=politica_video
+        ).iniciar()
+    rastros = None
+    if exibidor is not None or video is not None:
+        rastros = RastrosTrilhas(ttl=max(30, 2 * passo))
+
+    perfil = None
+    if perfil_etapas:
+        perfil = PerfilEtapas(camera_name or os.path.basename(str(video_path)),
+                              intervalo_log=intervalo_perfil_s)
+
+    publicador = None
+    if fila_estatisticas is not None:
+        publicador = PublicadorEstatisticas(fila_estatisticas, camera_name or os.path.basename(str(video_path)),
+                                            intervalo_estatisticas_s)
+    n_frames = 0
+
+    # Em streams, uma thread lê continuamente e reconecta se cair
+    leitor = None
+    if ao_vivo:
+        leitor = LeitorAoVivo(video_path, (w_out, h_out), cap=cap, perfil=perfil).iniciar()
+
     # --- Loop de processamento de frames ---
     while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+        if leitor is not None:
+            try:
+                idx, frame, t_ms = next(leitor)
+            except StopIteration:
+                break
+        else:
+            if perfil:
+                t0 = perfil.agora()
+            ret, frame = cap.read()
+            if not ret:
+                break
+            idx += 1
+            t_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            if perfil:
+                t1 = perfil.agora()
+                perfil.registrar("decodificacao", t1 - t0)
+            frame = cv2.resize(frame, (w_out, h_out))
+            if perfil:
+                perfil.registrar("redimensionamento", perfil.agora() - t1)
+        if perfil:
+            perfil.contar_frame()
+        if publicador is not None:
+            n_frames += 1
+            publicador.talvez_publicar(n_frames, motor, leitor)
 
-        t_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
         hora_evt = inicio_real + datetime.timedelta(seconds=(t_ms / 1000.0))
 
-        frame = cv2.resize(frame, (w_out, h_out))
-        res = modelo.track(
-            source=frame,
-            tracker="botsort.yaml",
-            persist=True,
-            classes=classes_selecionadas
-        )[0]
-
-        disp = frame.copy()
-        overlay = disp.copy()
-        cv2.fillPoly(overlay, [area_ent], (0,255,0))
-        cv2.fillPoly(overlay, [area_sai], (0,0,255))
-        cv2.addWeighted(overlay, 0.3, disp, 0.7, 0, disp)
-        cv2.polylines(disp, [area_ent], True, (0,255,0), 2)
-        cv2.polylines(disp, [area_sai], True, (0,0,255), 2)
-
-        cv2.putText(
-            disp,
-            hora_evt.strftime("%Y-%m-%d %H:%M:%S"),
-            (10, 20),
-            FONT,
-            0.6,
-            (255,255,255),
-            THICKNESS,
-            LINE_TYPE
-        )
+        # Processa todas as detecções com ID de uma vez. Fora do passo de
+        # detecção ou sem movimento nas zonas, o detector é pulado e as
+        # últimas caixas continuam na tela
+        if idx % passo == 0 and (portao is None or portao.deve_detectar(frame)):
+            if publicador is not None:
+                t_inf = time.perf_counter()
+            deteccoes = inferir(modelo, frame, classes_selecionadas, roi=roi,
+                                tracker=tracker, escala=escala, perfil=perfil)
+            if publicador is not None:
+                publicador.observar_latencia(time.perf_counter() - t_inf)
+            if gravador is not None:
+                if perfil:
+                    t0 = perfil.agora()
+                gravador.gravar(idx, t_ms, *deteccoes)
+                if perfil:
+                    perfil.registrar("io", perfil.agora() - t0)
+            if perfil:
+                t0 = perfil.agora()
+            q = motor.atualizar(*deteccoes, frame=idx)
+            if perfil:
+                perfil.registrar("contagem", perfil.agora() - t0)
+            if rastros is not None:
+                rastros.atualizar(q.ids, q.centros, idx)
+            # Transições interpoladas recebem o horário do frame em que ocorreram
+            for c, f_evt in zip(q.classes[q.entrou], q.frame_ent[q.entrou]):
+                t_evt = hora_evt - datetime.timedelta(seconds=(idx - f_evt) / fps)
+                eventos_ent.append({'time':t_evt, 'type':TODAS_AS_CLASSES[c]})
+            for c, f_evt in zip(q.classes[q.saiu], q.frame_sai[q.saiu]):
+                t_evt = hora_evt - datetime.timedelta(seconds=(idx - f_evt) / fps)
+                eventos_sai.append({'time':t_evt, 'type':TODAS_AS_CLASSES[c]})
 
-        # Processa cada detecção com ID
-        if hasattr(res.boxes, 'id') and res.boxes.id is not None:
-            ids_ = res.boxes.id.int().cpu().tolist()
-            bxs  = res.boxes.xyxy.cpu().tolist()
-            clss = res.boxes.cls.int().cpu().tolist()
-            for (x1,y1,x2,y2), c, tid in zip(bxs, clss, ids_):
-                if c not in classes_selecionadas:
-                    continue
-                nome = TODAS_AS_CLASSES.get(c, "Desconhecido")
-                cx, cy = (int((x1+x2)/2), int((y1+y2)/2))
-                estados.setdefault(tid, {'in_entry':False, 'in_exit':False})
-
-                # Verifica entrada
-                if cv2.pointPolygonTest(area_ent, (cx,cy), False) >= 0:
-                    if not estados[tid]['in_entry']:
-                        eventos_ent.append({'time':hora_evt, 'type':nome})
-                        if tid not in ids_ent:
-                            ids_ent.add(tid)
-                            cont_ent[nome] += 1
-                        estados[tid]['in_entry'] = True
-                else:
-                    estados[tid]['in_entry'] = False
-
-                # Verifica saída
-                if cv2.pointPolygonTest(area_sai, (cx,cy), False) >= 0:
-                    if not estados[tid]['in_exit']:
-                        eventos_sai.append({'time':hora_evt, 'type':nome})
-                        if tid not in ids_sai:
-                            ids_sai.add(tid)
-                            cont_sai[nome] += 1
-                        estados[tid]['in_exit'] = True
-                else:
-                    estados[tid]['in_exit'] = False
-
-                # Desenha bbox e label
-                cv2.rectangle(disp, (int(x1),int(y1)), (int(x2),int(y2)), (255,0,0), 1)
-                cv2.putText(
-                    disp,
-                    f"{nome} ID:{tid}",
-                    (int(x1), int(y1)-6),
-                    FONT,
-                    0.5,
-                    (255,0,0),
-                    THICKNESS,
-                    LINE_TYPE
-                )
-
-        # Mostra contadores na tela
-        y = 40
-        cv2.putText(disp, "ENTRADAS:", (10, y), FONT, 0.8, (0,255,0), THICKNESS, LINE_TYPE)
-        y += 25
-        for n, cnt in cont_ent.items():
-            cv2.putText(disp, f"{n}: {cnt}", (10, y), FONT, 0.5, (0,255,0), THICKNESS, LINE_TYPE)
-            y += 20
+        if exibidor is not None and exibidor.encerrado:
+            break_on_x = exibidor.motivo == "x"
+            break
+        # Só anota os frames que a janela vai exibir ou o vídeo vai gravar
+        mostrar = exibidor is not None and exibidor.quer_frame()
+        gravar_video = video is not None and video.quer_frame(idx)
+        if not (mostrar or gravar_video):
+            continue
 
-        y += 10
-        cv2.putText(disp, "SAIDAS:", (10, y), FONT, 0.8, (0,0,255), THICKNESS, LINE_TYPE)
-        y += 25
-        for n, cnt in cont_sai.items():
-            cv2.putText(disp, f"{n}: {cnt}", (10, y), FONT, 0.6, (0,0,255), THICKNESS, LINE_TYPE)
-            y += 20
+        # Desenha direto no frame, que não é mais usado depois daqui
+        if perfil:
+            t0 = perfil.agora()
+        disp = camada_zonas.aplicar(frame)
+        hora_txt = hora_evt.strftime("%Y-%m-%d %H:%M:%S")
+        painel_hora.desenhar(disp, hora_txt, [(hora_txt, (10, 20), 0.6, (255,255,255))])
 
-        if show_video:
-            cv2.imshow(window_name, disp)
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('f'):
-                fullscreen = not fullscreen
-                mode = cv2.WINDOW_FULLSCREEN if fullscreen else cv2.WINDOW_NORMAL
-                cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN, mode)
-            if key == ord('q'):
-                break
-            if cv2.getWindowProperty(window_name, cv2.WND_PROP_VISIBLE) < 1:
-                break_on_x = True
-                break
+        rastros.desenhar(disp)
+
+        # Desenha bbox e label
+        for (x1,y1,x2,y2), c, tid in zip(q.xyxy.tolist(), q.classes.tolist(), q.ids.tolist()):
+            nome = TODAS_AS_CLASSES[c]
+            cv2.rectangle(disp, (int(x1),int(y1)), (int(x2),int(y2)), (255,0,0), 1)
+            cv2.putText(
+                disp,
+                f"{nome} ID:{tid}",
+                (int(x1), int(y1)-6),
+                FONT,
+                0.5,
+                (255,0,0),
+                THICKNESS,
+                LINE_TYPE
+            )
+
+        # Contadores: o texto só é refeito quando algum total muda
+        painel_contagem.desenhar(disp, (motor.total_ids_ent, motor.total_ids_sai), linhas_contagem)
+        if perfil:
+            t1 = perfil.agora()
+            perfil.registrar("renderizacao", t1 - t0)
+
+        if mostrar:
+            exibidor.mostrar(disp)
+        if gravar_video:
+            video.enviar(disp)
+            if perfil:
+                perfil.registrar("io", perfil.agora() - t1)
 
     # --- Limpa recursos ---
+    if publicador is not None:
+        publicador.publicar(n_frames, motor, leitor, fim=True)
+    if leitor is not None:
+        leitor.parar()
     cap.release()
-    if show_video:
-        cv2.destroyAllWindows()
+    if gravador is not None:
+        gravador.fechar()
+    if video is not None:
+        video.fechar()
+        logging.info(video.resumo())
+    if exibidor is not None:
+        exibidor.parar()
+        logging.info(f"Exibição: {exibidor.exibidos} frames mostrados (até {fps_exibicao} fps).")
 
     fim_real = datetime.datetime.now()
+    if portao is not None:
+        logging.info(portao.resumo())
+    if leitor is not None:
+        logging.info(leitor.resumo())
+    logging.info(f"Trilhas vivas ao final: {motor.trilhas.vivas} "
+                 f"(pico: {motor.trilhas.pico}, removidas: {motor.trilhas.removidas})")
+    if perfil:
+        perfil.encerrar()
+        logging.info(f"Perfil de '{perfil.nome}':\n{perfil.texto()}")
 
     # --- Pergunta se salva relatório ---
     save = True
@@ -256,6 +403,7 @@ def contar_veiculos(
         root.destroy()
 
     if save:
+        cont_ent, cont_sai = motor.cont_ent, motor.cont_sai
         with open(caminho_relatorio, "w", encoding="utf-8") as f:
             f.write("RELATÓRIO DE CONTAGEM DE VEÍCULOS\n")
             if camera_name:
@@ -268,10 +416,20 @@ def contar_veiculos(
             f.write("TOTAIS GERAIS (IDs únicos):\n")
             for n in nomes_sel:
                 f.write(f"  Entrada {n}: {cont_ent[n]}\n")
-            f.write(f"  Total IDs entrada: {len(ids_ent)}\n\n")
+            f.write(f"  Total IDs entrada: {motor.total_ids_ent}\n\n")
             for n in nomes_sel:
                 f.write(f"  Saída {n}: {cont_sai[n]}\n")
-            f.write(f"  Total IDs saída: {len(ids_sai)}\n\n")
+            f.write(f"  Total IDs saída: {motor.total_ids_sai}\n\n")
+            if portao is not None:
+                f.write(portao.resumo() + "\n")
+            if leitor is not None:
+                f.write(leitor.resumo() + "\n")
+            if gravador is not None:
+                f.write(f"Trilhas gravadas em: {gravador.caminho_dados}\n")
+            if video is not None:
+                f.write(video.resumo() + "\n")
+            if perfil:
+                f.write("\nTEMPOS POR ETAPA:\n" + perfil.texto() + "\n")
         logging.info(f"Relatório gravado em '{caminho_relatorio}'")
         now_iso = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
         log_report(now_iso, caminho_relatorio, video_path, os.path.basename(model_path))
@@ -1,12 +1,26 @@
 import os
 import cv2
 import json
-import numpy as np
+import time
 import datetime
 import logging
 import sqlite3
 from ultralytics import YOLO
 
+from leitor_frames import LeitorAoVivo, LeitorFrames, eh_ao_vivo
+from anel_frames import LeitorFramesProcesso
+from cache_trilhas import GravadorTrilhas
+from checkpoint import GravadorCheckpoint, caminho_checkpoint, carregar_checkpoint
+from deteccao import calcular_passo, escala_inferencia, inferir
+from rastreadores import criar_rastreador
+from motor_contagem import MotorContagem
+from perfil import PerfilEtapas
+from estatisticas import PublicadorEstatisticas
+from metricas import iniciar_servidor, registrar_camera, remover_camera, profundidade_fila as fila_leitor
+from portao_movimento import PortaoMovimento
+from retomada import AquecimentoRetomada
+from zonas import obter_mascara
+
 DB_PATH = os.path.join("resultados", "relatorios.db")
 FONT = cv2.FONT_HERSHEY_SIMPLEX
 
@@ -44,7 +58,29 @@ def contar_veiculos_nVideo(
     model_path,
     classes_selecionadas,
     camera_name=None,
-    stop_event=None
+    stop_event=None,
+    profundidade_fila=8,
+    ttl_trilhas=300,
+    recorte_roi=False,
+    margem_roi=32,
+    portao_movimento=False,
+    passo_deteccao=1,
+    fps_deteccao=None,
+    tamanho_saida=(1280, 720),
+    largura_inferencia=None,
+    salvar_trilhas=False,
+    agendador=None,
+    leitor_processo=False,
+    ao_vivo=None,
+    checkpoint_s=None,
+    retomar=False,
+    aquecimento_retomada=30,
+    rastreador="botsort",
+    perfil_etapas=False,
+    intervalo_perfil_s=60.0,
+    porta_metricas=None,
+    fila_estatisticas=None,
+    intervalo_estatisticas_s=0.5
 ):
     init_db()
     logging.info("Iniciando contagem headless de veículos.")
@@ -61,23 +97,22 @@ def contar_veiculos_nVideo(
     try:
         with open(areas_path, "r", encoding="utf-8") as f:
             areas = json.load(f)
-        area_ent_orig = np.array(areas[0], dtype=np.int32)
-        area_sai_orig = np.array(areas[1], dtype=np.int32)
+        if not (isinstance(areas, list) and len(areas) == 2):
+            raise ValueError("Esperado lista com 2 áreas (entrada, saída).")
     except Exception as e:
         raise ValueError(f"Erro ao carregar áreas '{areas_path}': {e}")
 
-    try:
-        modelo = YOLO(model_path)
-    except Exception as e:
-        raise RuntimeError(f"Erro ao carregar modelo '{model_path}': {e}")
+    # Com um agendador, o modelo é compartilhado com outras câmeras (inferencia_lote.py)
+    modelo = None
+    if agendador is None:
+        try:
+            modelo = YOLO(model_path)
+        except Exception as e:
+            raise RuntimeError(f"Erro ao carregar modelo '{model_path}': {e}")
 
     TODAS_AS_CLASSES = {0:"Pessoa",1:"Bicicleta",2:"Carro",
                         3:"Moto",5:"Onibus",7:"Caminhao"}
     nomes_sel = [TODAS_AS_CLASSES[c] for c in classes_selecionadas if c in TODAS_AS_CLASSES]
-    cont_ent = {n:0 for n in nomes_sel}
-    cont_sai = {n:0 for n in nomes_sel}
-    ids_ent, ids_sai = set(), set()
-    estados = {}
 
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
@@ -85,62 +120,230 @@ def contar_veiculos_nVideo(
 
     w_o = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     h_o = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    w_out, h_out = 1280, 720
-    fx, fy = w_out / w_o, h_out / h_o
-    area_ent = np.array([[int(x*fx), int(y*fy)] for x,y in area_ent_orig], dtype=np.int32)
-    area_sai = np.array([[int(x*fx), int(y*fy)] for x,y in area_sai_orig], dtype=np.int32)
+    fps = cap.get(cv2.CAP_PROP_FPS) if cap.get(cv2.CAP_PROP_FPS) > 0 else 30
+    w_out, h_out = tamanho_saida
+    escala = escala_inferencia(largura_inferencia, w_out)
+    if escala:
+        logging.info(f"Inferência em {largura_inferencia}px de largura "
+                     f"(exibição/zonas em {w_out}x{h_out}).")
+    passo = calcular_passo(fps, passo_deteccao, fps_deteccao)
+    # Streams ao vivo processam sempre o frame mais recente
+    if ao_vivo is None:
+        ao_vivo = eh_ao_vivo(video_path, cap)
+    if ao_vivo and passo > 1:
+        logging.info("Modo ao vivo: frames atrasados já são descartados; passo de detecção ignorado.")
+        passo = 1
+    if passo > 1:
+        logging.info(f"Detecção a cada {passo} frames, com interpolação das trilhas.")
 
-    while True:
-        if stop_event and stop_event.is_set():
-            logging.info("Parada solicitada externamente.")
-            break
+    # Zonas rasterizadas uma vez na resolução de trabalho (com cache)
+    mascara = obter_mascara(areas_path, (w_o, h_o), (w_out, h_out))
+    area_ent, area_sai = mascara.zonas[:2]
+    motor = MotorContagem(mascara, classes_selecionadas, TODAS_AS_CLASSES,
+                          ttl_frames=ttl_trilhas, passo=passo)
 
-        ret, frame = cap.read()
-        if not ret:
-            break
+    # Inferência opcional apenas no retângulo que envolve as zonas
+    roi = mascara.retangulo(margem_roi) if recorte_roi else None
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        frac = (x1 - x0) * (y1 - y0) / (w_out * h_out)
+        logging.info(f"Inferência restrita a {roi} ({frac:.0%} do frame).")
 
-        t_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
-        hora_evt = inicio_real + datetime.timedelta(seconds=(t_ms / 1000.0))
-        frame = cv2.resize(frame, (w_out, h_out))
-
-        res = modelo.track(
-            source=frame,
-            tracker="botsort.yaml",
-            persist=True,
-            classes=classes_selecionadas
-        )[0]
-
-        if hasattr(res.boxes, 'id') and res.boxes.id is not None:
-            ids_ = res.boxes.id.int().cpu().tolist()
-            bxs  = res.boxes.xyxy.cpu().tolist()
-            clss = res.boxes.cls.int().cpu().tolist()
-            for (x1,y1,x2,y2), c, tid in zip(bxs, clss, ids_):
-                if c not in classes_selecionadas:
-                    continue
-                nome = TODAS_AS_CLASSES.get(c, "Desconhecido")
-                cx, cy = (int((x1+x2)/2), int((y1+y2)/2))
-                estados.setdefault(tid, {'in_entry':False, 'in_exit':False})
-
-                if cv2.pointPolygonTest(area_ent, (cx,cy), False) >= 0:
-                    if not estados[tid]['in_entry']:
-                        if tid not in ids_ent:
-                            ids_ent.add(tid)
-                            cont_ent[nome] += 1
-                        estados[tid]['in_entry'] = True
-                else:
-                    estados[tid]['in_entry'] = False
-
-                if cv2.pointPolygonTest(area_sai, (cx,cy), False) >= 0:
-                    if not estados[tid]['in_exit']:
-                        if tid not in ids_sai:
-                            ids_sai.add(tid)
-                            cont_sai[nome] += 1
-                        estados[tid]['in_exit'] = True
+    # Pula o detector quando nada se move nas zonas
+    portao = PortaoMovimento(mascara) if portao_movimento else None
+
+    # Retomada: contadores, trilhas vivas e posição do último checkpoint
+    ckpt_path = caminho_checkpoint(video_path, camera_name)
+    inicio_frame = 0
+    inicio_leitura = 0
+    deslocamento_ids = 0
+    retomada = None
+    registros_trilhas = None
+    dados = carregar_checkpoint(ckpt_path) if retomar else None
+    if dados is not None:
+        arrays, meta_ck = dados
+        if meta_ck["passo"] != passo or meta_ck["tamanho_saida"] != [w_out, h_out]:
+            raise ValueError("Checkpoint gravado com outro passo ou resolução; "
+                             "apague-o ou use as mesmas opções.")
+        motor.restaurar(arrays)
+        inicio_frame = meta_ck["proximo_frame"]
+        # O rastreador recomeça a numeração: IDs novos ficam acima dos vivos
+        deslocamento_ids = meta_ck["deslocamento_ids"]
+        caminho_relatorio = meta_ck["relatorio"]
+        inicio_real = datetime.datetime.fromisoformat(meta_ck["inicio"])
+        registros_trilhas = meta_ck.get("registros_trilhas")
+        inicio_leitura = inicio_frame
+        if not ao_vivo:
+            # Aquece o rastreador novo em frames já contados e reata as trilhas vivas
+            retomada = AquecimentoRetomada(motor, inicio_frame, deslocamento_ids)
+            inicio_leitura = max(inicio_frame - aquecimento_retomada * passo, 0)
+        logging.info(f"Retomando do checkpoint no frame {inicio_frame} "
+                     f"(entradas: {motor.total_ids_ent}, saídas: {motor.total_ids_sai}).")
+    gravador_ckpt = GravadorCheckpoint(ckpt_path) if checkpoint_s else None
+
+    # Cache das trilhas para recontar depois com outras áreas (recontar.py)
+    gravador = None
+    if salvar_trilhas:
+        gravador = GravadorTrilhas(caminho_relatorio, {
+            "video_path": video_path,
+            "camera_name": camera_name,
+            "modelo": os.path.basename(model_path),
+            "classes": list(classes_selecionadas),
+            "dims_origem": [w_o, h_o],
+            "tamanho_saida": [w_out, h_out],
+            "fps": fps,
+            "passo": passo,
+            "inicio": inicio_real.isoformat(sep=' ', timespec='seconds'),
+        }, continuar=registros_trilhas)
+
+    # Tempos por etapa (p50/p95/p99 e FPS), no relatório e no log periódico;
+    # desligado, cada ponto de medida custa só um `if perfil`
+    nome_camera = camera_name or os.path.basename(str(video_path))
+    perfil = None
+    if perfil_etapas:
+        perfil = PerfilEtapas(nome_camera, intervalo_log=intervalo_perfil_s)
+        if leitor_processo and not ao_vivo:
+            logging.info("Perfil: decodificação em outro processo não é medida.")
+
+    tracker = criar_rastreador(rastreador)
+    chave = agendador.registrar(classes_selecionadas, fps, tracker) if agendador is not None else None
+
+    # Decodificação e redimensionamento rodam em paralelo com a inferência,
+    # em uma thread ou em outro processo (frames em memória compartilhada)
+    if ao_vivo:
+        leitor = LeitorAoVivo(video_path, (w_out, h_out), stop_event, cap=cap,
+                              inicio=inicio_leitura, perfil=perfil).iniciar()
+    elif leitor_processo:
+        cap.release()
+        leitor = LeitorFramesProcesso(video_path, (w_out, h_out), max(profundidade_fila, 2),
+                                      stop_event, passo, inicio=inicio_leitura).iniciar()
+    else:
+        leitor = LeitorFrames(cap, (w_out, h_out), profundidade_fila, stop_event, passo,
+                              inicio=inicio_leitura, perfil=perfil).iniciar()
+
+    # Métricas no formato do Prometheus em localhost (`porta_metricas`). O
+    # laço só incrementa contadores; o resto é lido na hora da consulta
+    metricas = None
+    if porta_metricas is not None and iniciar_servidor(porta_metricas) is not None:
+        metricas = registrar_camera(nome_camera).ligar(
+            fila=lambda: fila_leitor(leitor),
+            descartados=lambda: getattr(leitor, "descartados", 0),
+            trilhas=lambda: motor.trilhas.vivas,
+            contagens=lambda: (motor.cont_ent, motor.cont_sai),
+        )
+
+    # Instantâneos periódicos para o painel do App (sem bloquear o laço)
+    publicador = None
+    if fila_estatisticas is not None:
+        publicador = PublicadorEstatisticas(fila_estatisticas, nome_camera, intervalo_estatisticas_s)
+    n_frames = 0
+
+    proximo_ckpt = time.monotonic() + (checkpoint_s or 0)
+    for idx, frame, t_ms in leitor:
+        if retomada is not None and not retomada.concluida:
+            if idx < inicio_frame:
+                # Frames já contados antes do checkpoint: só alimentam o rastreador
+                if agendador is not None:
+                    deteccoes = agendador.inferir(chave, frame, roi=roi, escala=escala)
                 else:
-                    estados[tid]['in_exit'] = False
+                    deteccoes = inferir(modelo, frame, classes_selecionadas, roi=roi,
+                                        tracker=tracker, escala=escala)
+                retomada.observar(idx, *deteccoes)
+                continue
+            retomada.concluir()
+
+        hora_evt = inicio_real + datetime.timedelta(seconds=(t_ms / 1000.0))
+        if perfil:
+            perfil.contar_frame()
+        if metricas is not None:
+            metricas.contar_frame()
+        if publicador is not None:
+            n_frames += 1
+            publicador.talvez_publicar(n_frames, motor, leitor)
 
+        # Todos os frames antes de `idx` já foram contados: o estado é copiado
+        # aqui e gravado em segundo plano
+        if gravador_ckpt is not None and time.monotonic() >= proximo_ckpt:
+            if perfil:
+                t0 = perfil.agora()
+            proximo_ckpt = time.monotonic() + checkpoint_s
+            ids_vivos = motor.trilhas.ids_vivos()[0]
+            gravador_ckpt.enviar(motor.estado(), {
+                "video_path": video_path,
+                "relatorio": caminho_relatorio,
+                "inicio": inicio_real.isoformat(sep=' ', timespec='seconds'),
+                "proximo_frame": int(idx),
+                "passo": passo,
+                "tamanho_saida": [w_out, h_out],
+                "deslocamento_ids": max(deslocamento_ids,
+                                        int(ids_vivos.max()) + 1 if len(ids_vivos) else 0),
+                "registros_trilhas": gravador.posicao() if gravador is not None else None,
+            })
+            if perfil:
+                perfil.registrar("io", perfil.agora() - t0)
+
+        if portao is not None and not portao.deve_detectar(frame):
+            continue
+
+        medir_latencia = metricas is not None or publicador is not None
+        if perfil or medir_latencia:
+            t0 = time.perf_counter()
+        if agendador is not None:
+            # Lote compartilhado: inclui a espera pelo lote e o rastreamento
+            deteccoes = agendador.inferir(chave, frame, roi=roi, escala=escala)
+            if perfil:
+                perfil.registrar("inferencia", time.perf_counter() - t0)
+        else:
+            deteccoes = inferir(modelo, frame, classes_selecionadas, roi=roi,
+                                tracker=tracker, escala=escala, perfil=perfil)
+        if medir_latencia:
+            latencia = time.perf_counter() - t0
+            if metricas is not None:
+                metricas.observar_inferencia(latencia)
+            if publicador is not None:
+                publicador.observar_latencia(latencia)
+        if retomada is not None:
+            deteccoes = retomada.traduzir(*deteccoes)
+        elif deslocamento_ids:
+            xyxy, ids, clss = deteccoes
+            deteccoes = (xyxy, ids + deslocamento_ids, clss)
+        if gravador is not None:
+            if perfil:
+                t0 = perfil.agora()
+            gravador.gravar(idx, t_ms, *deteccoes)
+            if perfil:
+                perfil.registrar("io", perfil.agora() - t0)
+
+        if perfil:
+            t0 = perfil.agora()
+        motor.atualizar(*deteccoes, frame=idx)
+        if perfil:
+            perfil.registrar("contagem", perfil.agora() - t0)
+
+    if stop_event and stop_event.is_set():
+        logging.info("Parada solicitada externamente.")
+    # Sai das métricas antes de liberar o leitor que elas consultam
+    if metricas is not None:
+        remover_camera(metricas)
+    if publicador is not None:
+        publicador.publicar(n_frames, motor, leitor, fim=True)
+    leitor.parar()
     cap.release()
+    if agendador is not None:
+        agendador.liberar(chave)
+    if gravador is not None:
+        gravador.fechar()
     fim_real = datetime.datetime.now()
+    if portao is not None:
+        logging.info(portao.resumo())
+    if ao_vivo:
+        logging.info(leitor.resumo())
+    logging.info(f"Trilhas vivas ao final: {motor.trilhas.vivas} "
+                 f"(pico: {motor.trilhas.pico}, removidas: {motor.trilhas.removidas})")
+    if perfil:
+        perfil.encerrar()
+        logging.info(f"Perfil de '{perfil.nome}':\n{perfil.texto()}")
+    cont_ent, cont_sai = motor.cont_ent, motor.cont_sai
 
     with open(caminho_relatorio, "w", encoding="utf-8") as f:
         f.write("RELATÓRIO DE CONTAGEM DE VEÍCULOS (Modo Sem Vídeo)\n")
@@ -152,11 +355,27 @@ def contar_veiculos_nVideo(
         f.write("ENTRADAS:\n")
         for nome in nomes_sel:
             f.write(f"  {nome}: {cont_ent[nome]}\n")
-        f.write(f"  Total IDs entrada: {len(ids_ent)}\n\n")
+        f.write(f"  Total IDs entrada: {motor.total_ids_ent}\n\n")
         f.write("SAÍDAS:\n")
         for nome in nomes_sel:
             f.write(f"  {nome}: {cont_sai[nome]}\n")
-        f.write(f"  Total IDs saída: {len(ids_sai)}\n")
+        f.write(f"  Total IDs saída: {motor.total_ids_sai}\n")
+        if portao is not None:
+            f.write("\n" + portao.resumo() + "\n")
+        if ao_vivo:
+            f.write("\n" + leitor.resumo() + "\n")
+        if gravador is not None:
+            f.write(f"\nTrilhas gravadas em: {gravador.caminho_dados}\n")
+        if dados is not None:
+            f.write(f"\nRetomado de checkpoint no frame {inicio_frame}\n")
+        if perfil:
+            f.write("\nTEMPOS POR ETAPA:\n" + perfil.texto() + "\n")
+
+    # Contagem concluída: o checkpoint não é mais necessário
+    if gravador_ckpt is not None:
+        gravador_ckpt.fechar(remover=True)
+    elif dados is not None and os.path.exists(ckpt_path):
+        os.remove(ckpt_path)
 
     now_iso = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
     log_report(now_iso, caminho_relatorio, video_path, os.path.basename(model_path))
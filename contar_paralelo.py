@@ -0,0 +1,309 @@
+import os
+import sys
+import shutil
+import logging
+import argparse
+import datetime
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from cache_trilhas import GravadorTrilhas, abrir_trilhas
+from deteccao import calcular_passo, escala_inferencia
+from rastreadores import RASTREADORES, iou_matriz
+from recontar import init_db, log_report, reproduzir
+from zonas import obter_mascara
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Separa os IDs do rastreador de cada segmento antes da costura
+DESLOCAMENTO_IDS = 1 << 40
+
+# Frames com detecção em comum exigidos para costurar duas trilhas
+MIN_FRAMES_COSTURA = 3
+
+
+def dividir_segmentos(total_frames, n_segmentos, sobreposicao):
+    """
+    Divide `[0, total_frames)` em `n_segmentos` faixas `(inicio, fim)`. Cada
+    segmento (exceto o primeiro) começa `sobreposicao` frames antes do seu
+    `inicio`, para o rastreador aquecer e permitir a costura das trilhas.
+    Retorna `(aquecimento, inicio, fim)` por segmento.
+    """
+    n_segmentos = max(1, min(n_segmentos, total_frames))
+    limites = np.linspace(0, total_frames, n_segmentos + 1).astype(int)
+    return [(max(int(a) - sobreposicao, 0) if k else 0, int(a), int(b))
+            for k, (a, b) in enumerate(zip(limites[:-1], limites[1:]))]
+
+
+def _processar_segmento(k, video_path, aquecimento, fim, model_path, classes, tamanho,
+                        passo, roi, escala, caminho_base, threads, rastreador="botsort"):
+    """Processo de um segmento: detecta e rastreia os frames `[aquecimento, fim)`."""
+    import torch
+    from ultralytics import YOLO
+    from deteccao import inferir
+    from rastreadores import criar_rastreador
+
+    # Vários processos dividindo a CPU: cada um com poucas threads
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+
+    modelo = YOLO(model_path)
+    tracker = criar_rastreador(rastreador)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Não foi possível abrir vídeo '{video_path}'.")
+    if aquecimento:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, aquecimento)
+    # A busca pode parar em um keyframe anterior: vale a posição real
+    idx = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+
+    gravador = GravadorTrilhas(caminho_base, {"segmento": k})
+    try:
+        while idx + 1 < fim:
+            idx += 1
+            if idx % passo:
+                if not cap.grab():
+                    break
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            t_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            frame = cv2.resize(frame, tamanho)
+            gravador.gravar(idx, t_ms, *inferir(modelo, frame, classes, roi=roi,
+                                                tracker=tracker, escala=escala))
+    finally:
+        gravador.fechar()
+        cap.release()
+    return k, gravador.caminho_dados
+
+
+def costurar(anterior, seguinte, iou_min=0.5, dist_max=30.0, min_frames=MIN_FRAMES_COSTURA):
+    """
+    Associa as trilhas de dois segmentos vizinhos pelos frames em comum
+    (a sobreposição). Um par é aceito quando aparece junto em pelo menos
+    `min_frames` frames e tem IoU médio >= `iou_min` ou distância média
+    entre centróides <= `dist_max` pixels. A associação é um para um, dos
+    pares mais parecidos para os menos. Retorna `{id_seguinte: id_anterior}`.
+    """
+    comuns = np.intersect1d(anterior["frame"], seguinte["frame"])
+    if len(comuns) == 0:
+        return {}
+    a = anterior[np.isin(anterior["frame"], comuns)]
+    b = seguinte[np.isin(seguinte["frame"], comuns)]
+
+    soma_iou, soma_dist, juntos = {}, {}, {}
+    for f in comuns.tolist():
+        fa, fb = a[a["frame"] == f], b[b["frame"] == f]
+        if len(fa) == 0 or len(fb) == 0:
+            continue
+        iou = iou_matriz(fa["xyxy"], fb["xyxy"])
+        ca = (fa["xyxy"][:, :2] + fa["xyxy"][:, 2:]) / 2
+        cb = (fb["xyxy"][:, :2] + fb["xyxy"][:, 2:]) / 2
+        dist = np.linalg.norm(ca[:, None] - cb[None, :], axis=2)
+        # Só pares minimamente próximos entram no acumulado
+        for i, j in zip(*np.nonzero((iou > 0) | (dist <= dist_max))):
+            par = (int(fa["id"][i]), int(fb["id"][j]))
+            soma_iou[par] = soma_iou.get(par, 0.0) + float(iou[i, j])
+            soma_dist[par] = soma_dist.get(par, 0.0) + float(dist[i, j])
+            juntos[par] = juntos.get(par, 0) + 1
+
+    candidatos = []
+    for par, n in juntos.items():
+        if n < min_frames:
+            continue
+        iou_medio, dist_media = soma_iou[par] / n, soma_dist[par] / n
+        if iou_medio >= iou_min or dist_media <= dist_max:
+            candidatos.append((iou_medio, -dist_media, n, par))
+
+    mapa, usados = {}, set()
+    for *_, (id_a, id_b) in sorted(candidatos, reverse=True):
+        if id_b in mapa or id_a in usados:
+            continue
+        mapa[id_b] = id_a
+        usados.add(id_a)
+    return mapa
+
+
+def juntar_segmentos(segmentos, limites, **kwargs_costura):
+    """
+    Junta os registros dos segmentos em um só fluxo ordenado por frame. Cada
+    segmento contribui com os frames `[inicio, fim)`; os frames de
+    aquecimento servem apenas para costurar as trilhas com o anterior.
+    Retorna `(registros, costuradas)`.
+    """
+    partes, costuradas, anterior = [], 0, None
+    for k, (reg, (_, inicio, fim)) in enumerate(zip(segmentos, limites)):
+        reg = np.array(reg)
+        reg["id"] += k * DESLOCAMENTO_IDS
+        if anterior is not None:
+            mapa = costurar(anterior, reg, **kwargs_costura)
+            if mapa:
+                de = np.fromiter(mapa.keys(), dtype=np.int64)
+                para = np.fromiter(mapa.values(), dtype=np.int64)
+                ordem = np.argsort(de)
+                de, para = de[ordem], para[ordem]
+                pos = np.clip(np.searchsorted(de, reg["id"]), 0, len(de) - 1)
+                achou = de[pos] == reg["id"]
+                reg["id"][achou] = para[pos[achou]]
+            elif np.isin(reg["frame"], anterior["frame"]).any():
+                logging.warning(f"Nenhuma trilha costurada entre os segmentos {k} e {k + 1}; "
+                                "veículos na fronteira podem ser contados duas vezes.")
+            costuradas += len(mapa)
+        anterior = reg
+        partes.append(reg[(reg["frame"] >= inicio) & (reg["frame"] < fim)])
+    registros = np.concatenate(partes) if partes else np.empty(0)
+    return registros, costuradas
+
+
+def contar_veiculos_paralelo(
+    video_path,
+    areas_path,
+    model_path,
+    classes_selecionadas,
+    camera_name=None,
+    processos=None,
+    sobreposicao_s=2.0,
+    passo_deteccao=1,
+    fps_deteccao=None,
+    tamanho_saida=(1280, 720),
+    largura_inferencia=None,
+    recorte_roi=False,
+    margem_roi=32,
+    salvar_trilhas=False,
+    rastreador="botsort"
+):
+    """
+    Conta um arquivo de vídeo local longo dividindo-o em segmentos de tempo
+    processados em paralelo (um modelo e um rastreador por processo). As
+    trilhas são costuradas nas sobreposições e contadas uma única vez com o
+    mesmo `MotorContagem` da contagem sequencial.
+    """
+    init_db()
+    inicio_real = datetime.datetime.now()
+    processos = processos or os.cpu_count() or 1
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Não foi possível abrir vídeo '{video_path}'.")
+    w_o = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    h_o = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS) if cap.get(cv2.CAP_PROP_FPS) > 0 else 30
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total_frames <= 0:
+        raise ValueError(f"'{video_path}' não informa o número de frames; use a contagem sequencial.")
+
+    w_out, h_out = tamanho_saida
+    escala = escala_inferencia(largura_inferencia, w_out)
+    passo = calcular_passo(fps, passo_deteccao, fps_deteccao)
+    mascara = obter_mascara(areas_path, (w_o, h_o), (w_out, h_out))
+    roi = mascara.retangulo(margem_roi) if recorte_roi else None
+
+    # A sobreposição precisa de frames com detecção suficientes para a costura
+    sobreposicao = max(int(round(sobreposicao_s * fps)), MIN_FRAMES_COSTURA * passo)
+    limites = dividir_segmentos(total_frames, processos, sobreposicao)
+    threads = max((os.cpu_count() or 1) // len(limites), 1)
+    logging.info(f"Processando {total_frames} frames em {len(limites)} segmentos paralelos "
+                 f"(sobreposição de {sobreposicao} frames, {threads} thread(s) por processo).")
+
+    ts_str = inicio_real.strftime("%Y%m%d_%H%M%S")
+    cam_str = camera_name.strip().replace(" ", "_") if camera_name else ""
+    nome_rel = f"relatorio_{ts_str}"
+    if cam_str:
+        nome_rel += f"_{cam_str}"
+    caminho_relatorio = os.path.join("resultados", nome_rel + ".txt")
+    pasta_tmp = os.path.join("resultados", nome_rel + "_segmentos")
+    os.makedirs(pasta_tmp, exist_ok=True)
+
+    arquivos = [None] * len(limites)
+    try:
+        with ProcessPoolExecutor(max_workers=len(limites), mp_context=mp.get_context("spawn")) as pool:
+            futuros = [
+                pool.submit(_processar_segmento, k, video_path, aquec, fim, model_path,
+                            list(classes_selecionadas), (w_out, h_out), passo, roi, escala,
+                            os.path.join(pasta_tmp, f"segmento_{k:03d}.txt"), threads, rastreador)
+                for k, (aquec, _, fim) in enumerate(limites)
+            ]
+            for fut in as_completed(futuros):
+                k, caminho = fut.result()
+                arquivos[k] = caminho
+                logging.info(f"Segmento {k + 1}/{len(limites)} concluído.")
+
+        segmentos = [np.array(abrir_trilhas(c)[0]) for c in arquivos]
+        registros, costuradas = juntar_segmentos(segmentos, limites)
+    finally:
+        shutil.rmtree(pasta_tmp, ignore_errors=True)
+    logging.info(f"{costuradas} trilhas costuradas entre segmentos.")
+
+    meta = {
+        "video_path": video_path,
+        "camera_name": camera_name,
+        "modelo": os.path.basename(model_path),
+        "classes": list(classes_selecionadas),
+        "dims_origem": [w_o, h_o],
+        "tamanho_saida": [w_out, h_out],
+        "fps": fps,
+        "passo": passo,
+        "inicio": inicio_real.isoformat(sep=' ', timespec='seconds'),
+    }
+    motor = reproduzir(registros, meta, areas_path, classes_selecionadas)
+    gravador = None
+    if salvar_trilhas:
+        gravador = GravadorTrilhas(caminho_relatorio, meta)
+        gravador.gravar_registros(registros)
+        gravador.fechar()
+
+    fim_real = datetime.datetime.now()
+    cont_ent, cont_sai = motor.cont_ent, motor.cont_sai
+    with open(caminho_relatorio, "w", encoding="utf-8") as f:
+        f.write("RELATÓRIO DE CONTAGEM DE VEÍCULOS (Processamento Paralelo)\n")
+        if camera_name:
+            f.write(f"CÂMERA: {camera_name}\n")
+        f.write(f"Início: {inicio_real.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Fim:    {fim_real.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Segmentos: {len(limites)} (sobreposição de {sobreposicao} frames, "
+                f"{costuradas} trilhas costuradas)\n")
+        f.write("="*40 + "\n")
+        f.write("ENTRADAS:\n")
+        for nome in motor.nomes:
+            f.write(f"  {nome}: {cont_ent[nome]}\n")
+        f.write(f"  Total IDs entrada: {motor.total_ids_ent}\n\n")
+        f.write("SAÍDAS:\n")
+        for nome in motor.nomes:
+            f.write(f"  {nome}: {cont_sai[nome]}\n")
+        f.write(f"  Total IDs saída: {motor.total_ids_sai}\n")
+        if gravador is not None:
+            f.write(f"\nTrilhas gravadas em: {gravador.caminho_dados}\n")
+
+    now_iso = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+    log_report(now_iso, caminho_relatorio, video_path, os.path.basename(model_path))
+    logging.info(f"Relatório salvo em '{caminho_relatorio}' "
+                 f"({(fim_real - inicio_real).total_seconds():.1f}s)")
+    return caminho_relatorio
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Conta um vídeo local longo em segmentos paralelos.")
+    ap.add_argument("video", help="arquivo de vídeo local")
+    ap.add_argument("areas", help="JSON com as áreas de entrada e saída")
+    ap.add_argument("modelo", help="caminho do modelo YOLO (.pt)")
+    ap.add_argument("--classes", type=int, nargs="+", default=[2, 3, 5, 7])
+    ap.add_argument("--processos", type=int, default=None, help="padrão: número de CPUs")
+    ap.add_argument("--sobreposicao", type=float, default=2.0, help="segundos de sobreposição")
+    ap.add_argument("--passo", type=int, default=1, help="detectar a cada N frames")
+    ap.add_argument("--camera", default=None)
+    ap.add_argument("--salvar-trilhas", action="store_true")
+    ap.add_argument("--rastreador", choices=list(RASTREADORES), default="botsort")
+    args = ap.parse_args(argv)
+    contar_veiculos_paralelo(args.video, args.areas, args.modelo, args.classes,
+                             camera_name=args.camera, processos=args.processos,
+                             sobreposicao_s=args.sobreposicao, passo_deteccao=args.passo,
+                             salvar_trilhas=args.salvar_trilhas, rastreador=args.rastreador)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,9 @@ import numpy as np
 import json
 from tkinter import Tk, filedialog, messagebox
 import os
+import logging
+
+from previa_trilhas import PreviaTrilhas, encontrar_trilhas
 
 class AreaSelector:
     def __init__(self, window_name="Definir Areas"):
@@ -24,6 +27,7 @@ class AreaSelector:
         self.original_frame = None
         self.display_frame = None
         self.original_dims = None
+        self.previa = None
 
     def _create_tk_root(self):
         root = Tk()
@@ -62,6 +66,10 @@ class AreaSelector:
         if self.dragging_point_index != -1:
             self.areas[self.current_area_index][self.dragging_point_index] = [x, y]
 
+        # Recalcula a prévia das contagens enquanto os pontos são arrastados
+        if self.previa is not None:
+            self.previa.sincronizar(self.areas)
+
     def _draw(self):
         self.display_frame = self.original_frame.copy()
         for i, area_points in enumerate(self.areas):
@@ -92,6 +100,24 @@ class AreaSelector:
         for i, text in enumerate(instructions):
             cv2.putText(self.display_frame, text, (20, self.WINDOW_HEIGHT - 100 + i*25), self.FONT, 0.6, self.COLORS["text"], 1)
 
+        if self.previa is not None:
+            ent, sai = self.previa.contagens
+            texto = f"Previa ({self.previa.n_trilhas} trilhas): Entradas {ent} | Saidas {sai}"
+            cv2.putText(self.display_frame, texto, (20, 75), self.FONT, 0.7, self.COLORS["text"], 2)
+
+    def _load_previa(self, video_path):
+        """Carrega trilhas de uma contagem anterior deste vídeo, se houver."""
+        caminho = encontrar_trilhas(video_path)
+        if not caminho:
+            return
+        try:
+            self.previa = PreviaTrilhas(caminho, (self.WINDOW_WIDTH, self.WINDOW_HEIGHT))
+        except Exception:
+            logging.exception(f"Falha ao carregar trilhas de '{caminho}'.")
+            return
+        self.previa.desenhar(self.original_frame)
+        logging.info(f"Prévia com {self.previa.n_trilhas} trilhas de '{caminho}'.")
+
     def _select_video(self):
         root = self._create_tk_root()
         video_path = filedialog.askopenfilename(
@@ -169,6 +195,7 @@ class AreaSelector:
         cap.release()
 
         self.original_frame = cv2.resize(frame, (self.WINDOW_WIDTH, self.WINDOW_HEIGHT))
+        self._load_previa(video_path)
 
         cv2.namedWindow(self.window_name)
         cv2.setMouseCallback(self.window_name, self._mouse_callback)
@@ -186,6 +213,8 @@ class AreaSelector:
                     self._refocus_window()
                     continue
 
+            if self.previa is not None:
+                self.previa.sincronizar(self.areas)
             self._draw()
             key = cv2.waitKey(1) & 0xFF
 
@@ -0,0 +1,116 @@
+import cv2
+import numpy as np
+
+from motor_contagem import extrair_deteccoes
+
+
+def extrair_caixas(res):
+    """Caixas de um resultado de `modelo.predict`: `(xyxy, confiança, classe)`."""
+    boxes = res.boxes
+    if boxes is None or len(boxes) == 0:
+        return (np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32),
+                np.empty(0, dtype=np.int64))
+    return (boxes.xyxy.cpu().numpy().astype(np.float32, copy=False),
+            boxes.conf.cpu().numpy().astype(np.float32, copy=False),
+            boxes.cls.int().cpu().numpy().astype(np.int64, copy=False))
+
+
+def calcular_passo(fps_video, passo=1, fps_deteccao=None):
+    """
+    Quantos frames avançar entre detecções: `passo` explícito ou, se
+    `fps_deteccao` for dado, o necessário para chegar perto dessa taxa.
+    """
+    if fps_deteccao:
+        return max(int(round(fps_video / fps_deteccao)), 1)
+    return max(int(passo), 1)
+
+
+def escala_inferencia(largura_inferencia, largura_trabalho):
+    """Fator entre o frame de trabalho e o de inferência (None = sem redução)."""
+    if not largura_inferencia or largura_inferencia >= largura_trabalho:
+        return None
+    return largura_inferencia / largura_trabalho
+
+
+def preparar_quadro(frame, roi=None, escala=None):
+    """
+    Recorta (`roi`) e reduz (`escala`) o frame de trabalho para a inferência.
+    Retorna a imagem, o `imgsz` a usar (None = padrão do modelo) e o
+    deslocamento/escala para `restaurar_caixas`.
+    """
+    x0 = y0 = 0
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        frame = np.ascontiguousarray(frame[y0:y1, x0:x1])
+
+    imgsz = None
+    if escala:
+        h, w = frame.shape[:2]
+        tamanho = (max(int(round(w * escala)), 1), max(int(round(h * escala)), 1))
+        frame = cv2.resize(frame, tamanho, interpolation=cv2.INTER_AREA)
+        imgsz = -(-max(tamanho) // 32) * 32
+    return frame, imgsz, (x0, y0, escala)
+
+
+def restaurar_caixas(xyxy, transformacao):
+    """Leva as caixas da imagem de inferência de volta ao frame de trabalho."""
+    x0, y0, escala = transformacao
+    if escala:
+        xyxy = xyxy / np.float32(escala)
+    if x0 or y0:
+        xyxy = xyxy + np.array([x0, y0, x0, y0], dtype=xyxy.dtype)
+    return xyxy
+
+
+def inferir(modelo, frame, classes, roi=None, tracker="botsort.yaml", escala=None, perfil=None):
+    """
+    Roda `modelo.track` no frame e retorna `(xyxy, ids, classes)` em
+    coordenadas do frame completo. Com `roi = (x0, y0, x1, y1)`, a inferência
+    é feita apenas nesse recorte e as caixas são deslocadas de volta.
+
+    Com `escala < 1`, o frame (ou o recorte) é reduzido antes da inferência e
+    o `imgsz` do modelo acompanha o tamanho reduzido; as caixas voltam para a
+    resolução de trabalho, onde as zonas estão definidas.
+
+    `tracker` é o YAML de um rastreador do ultralytics ou um rastreador
+    próprio com `atualizar(xyxy, conf, classes)` (ver `rastreadores.py`); no
+    segundo caso o modelo só detecta e a associação é feita fora dele.
+
+    Com `perfil` (`PerfilEtapas`), registra os tempos de inferência e de
+    rastreamento. No `modelo.track` os dois rodam juntos: a inferência é o
+    tempo que o próprio ultralytics mede (`res.speed`) e o restante da
+    chamada conta como rastreamento.
+    """
+    img, imgsz, transformacao = preparar_quadro(frame, roi, escala)
+    kwargs = {"imgsz": imgsz} if imgsz else {}
+
+    if perfil:
+        t0 = perfil.agora()
+    if not isinstance(tracker, str):
+        # Mesmo limiar baixo que o `modelo.track` usa, para a 2ª etapa do rastreador
+        res = modelo.predict(source=img, classes=classes, conf=tracker.conf_baixa,
+                             verbose=False, **kwargs)[0]
+        xyxy, conf, clss = extrair_caixas(res)
+        if perfil:
+            t1 = perfil.agora()
+            perfil.registrar("inferencia", t1 - t0)
+        xyxy, ids, clss = tracker.atualizar(xyxy, conf, clss)
+        if perfil:
+            perfil.registrar("rastreamento", perfil.agora() - t1)
+        return restaurar_caixas(xyxy, transformacao), ids, clss
+
+    res = modelo.track(
+        source=img,
+        tracker=tracker,
+        persist=True,
+        classes=classes,
+        **kwargs
+    )[0]
+
+    xyxy, ids, clss = extrair_deteccoes(res)
+    if perfil:
+        total = perfil.agora() - t0
+        modelo_s = min(sum((res.speed or {}).values()) / 1000.0, total)
+        perfil.registrar("inferencia", modelo_s)
+        perfil.registrar("rastreamento", total - modelo_s)
+    return restaurar_caixas(xyxy, transformacao), ids, clss
@@ -0,0 +1,164 @@
+import numpy as np
+
+
+class ArmazemTrilhas:
+    """
+    Estado das trilhas vivas em arrays NumPy (um por campo) indexados por um
+    slot denso: flags de zona, classe, primeiro/último frame, último
+    centróide e última caixa. O mapeamento ID do rastreador -> slot é
+    mantido em arrays ordenados (busca com `np.searchsorted`), então todas
+    as operações são em lote.
+
+    Trilhas sem detecção há mais de `ttl_frames` frames são removidas e seus
+    slots reaproveitados; se ainda assim houver mais que `max_trilhas` vivas,
+    as menos recentes saem primeiro (LRU). O `ttl_frames` deve ser maior que
+    o buffer do rastreador (30 atualizações no BoT-SORT), para que um ID
+    removido nunca volte a aparecer e seja contado de novo. Quando o
+    rastreador não roda em todo frame, o chamador pode passar em `slots` e
+    `expirar` outro relógio (`atualizacao`, por exemplo o número de chamadas
+    ao detector), e o TTL passa a ser medido nele.
+    """
+
+    # nome do campo -> (dtype, forma por trilha)
+    CAMPOS = {
+        "na_entrada": (np.bool_, ()),
+        "na_saida": (np.bool_, ()),
+        "contado_ent": (np.bool_, ()),
+        "contado_sai": (np.bool_, ()),
+        "classe": (np.int16, ()),
+        "primeiro_frame": (np.int64, ()),
+        "centroide": (np.int32, (2,)),
+        "caixa": (np.float32, (4,)),
+    }
+
+    def __init__(self, ttl_frames=300, max_trilhas=10000, capacidade=256):
+        if ttl_frames < 1 or max_trilhas < 1:
+            raise ValueError("ttl_frames e max_trilhas devem ser positivos.")
+        self.ttl_frames = ttl_frames
+        self.max_trilhas = max_trilhas
+        self.capacidade = 0
+        self.pico = 0
+        self.removidas = 0
+
+        # IDs vivos em ordem crescente e o slot de cada um
+        self._ids = np.empty(0, dtype=np.int64)
+        self._slots = np.empty(0, dtype=np.int64)
+        self._livres = []
+
+        self.ultimo_frame = np.empty(0, dtype=np.int64)
+        self.ultima_atualizacao = np.empty(0, dtype=np.int64)
+        for nome, (dtype, forma) in self.CAMPOS.items():
+            setattr(self, nome, np.empty((0, *forma), dtype=dtype))
+        self._crescer(capacidade)
+
+    @property
+    def vivas(self):
+        """Quantidade de trilhas mantidas no armazém."""
+        return len(self._ids)
+
+    def _crescer(self, nova):
+        antiga = self.capacidade
+        for nome in ("ultimo_frame", "ultima_atualizacao", *self.CAMPOS):
+            arr = getattr(self, nome)
+            novo = np.zeros((nova, *arr.shape[1:]), dtype=arr.dtype)
+            novo[:antiga] = arr
+            setattr(self, nome, novo)
+        self._livres.extend(range(nova - 1, antiga - 1, -1))
+        self.capacidade = nova
+
+    def _alocar(self, n, frame):
+        if len(self._livres) < n:
+            self._crescer(max(2 * self.capacidade, self.capacidade + n))
+        slots = np.array(self._livres[-n:][::-1], dtype=np.int64)
+        del self._livres[-n:]
+        for nome in self.CAMPOS:
+            getattr(self, nome)[slots] = 0
+        self.primeiro_frame[slots] = frame
+        return slots
+
+    def slots(self, ids, frame, atualizacao=None):
+        """
+        Retorna o slot de cada ID (criando os que ainda não existem) e o
+        frame em que cada um tinha sido visto antes (-1 para IDs novos), e
+        marca todos como vistos em `frame` (e em `atualizacao`, que por
+        padrão é o próprio `frame`).
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        slots = np.empty(len(ids), dtype=np.int64)
+        if len(ids) == 0:
+            return slots, np.empty(0, dtype=np.int64)
+
+        achou = np.zeros(len(ids), dtype=bool)
+        if len(self._ids):
+            pos = np.minimum(np.searchsorted(self._ids, ids), len(self._ids) - 1)
+            achou = self._ids[pos] == ids
+            slots[achou] = self._slots[pos[achou]]
+
+        if not achou.all():
+            novos, inv = np.unique(ids[~achou], return_inverse=True)
+            s_novos = self._alocar(len(novos), frame)
+            slots[~achou] = s_novos[inv]
+            todos_ids = np.concatenate([self._ids, novos])
+            todos_slots = np.concatenate([self._slots, s_novos])
+            ordem = np.argsort(todos_ids, kind="stable")
+            self._ids = todos_ids[ordem]
+            self._slots = todos_slots[ordem]
+            self.pico = max(self.pico, len(self._ids))
+
+        ultimo = np.where(achou, self.ultimo_frame[slots], -1)
+        self.ultimo_frame[slots] = frame
+        self.ultima_atualizacao[slots] = frame if atualizacao is None else atualizacao
+        return slots, ultimo
+
+    def expirar(self, agora):
+        """
+        Remove trilhas expiradas (TTL) e o excesso mais antigo (LRU). `agora`
+        está no relógio de `atualizacao` passado a `slots`.
+        """
+        if not len(self._ids):
+            return 0
+        ultimo = self.ultima_atualizacao[self._slots]
+        remover = (agora - ultimo) > self.ttl_frames
+
+        excesso = int((~remover).sum()) - self.max_trilhas
+        if excesso > 0:
+            restantes = np.flatnonzero(~remover)
+            mais_antigas = restantes[np.argsort(ultimo[restantes], kind="stable")[:excesso]]
+            remover[mais_antigas] = True
+
+        n = int(remover.sum())
+        if n:
+            self._livres.extend(self._slots[remover].tolist())
+            self._ids = self._ids[~remover]
+            self._slots = self._slots[~remover]
+            self.removidas += n
+        return n
+
+    def ids_vivos(self):
+        """IDs do rastreador das trilhas vivas e seus slots."""
+        return self._ids.copy(), self._slots.copy()
+
+    def estado(self):
+        """Cópia compacta das trilhas vivas (para checkpoint), como dicionário de arrays."""
+        ids, slots = self._ids.copy(), self._slots.copy()
+        est = {"ids": ids, "ultimo_frame": self.ultimo_frame[slots],
+               "ultima_atualizacao": self.ultima_atualizacao[slots],
+               "contadores": np.array([self.pico, self.removidas], dtype=np.int64)}
+        for nome in self.CAMPOS:
+            est[nome] = getattr(self, nome)[slots]
+        return est
+
+    def restaurar(self, est):
+        """Substitui o conteúdo pelo de `estado()`."""
+        n = len(est["ids"])
+        self.__init__(self.ttl_frames, self.max_trilhas, max(n, 256))
+        if n:
+            slots = np.array(self._livres[-n:][::-1], dtype=np.int64)
+            del self._livres[-n:]
+            self._ids = np.asarray(est["ids"], dtype=np.int64)
+            self._slots = slots
+            self.ultimo_frame[slots] = est["ultimo_frame"]
+            self.ultima_atualizacao[slots] = est["ultima_atualizacao"]
+            for nome in self.CAMPOS:
+                getattr(self, nome)[slots] = est[nome]
+        self.pico, self.removidas = (int(v) for v in est["contadores"])
@@ -0,0 +1,64 @@
+import time
+import queue
+
+
+class PublicadorEstatisticas:
+    """
+    Publica instantâneos periódicos da contagem em uma `queue.Queue` para
+    quem acompanha de outra thread (o painel do App). `talvez_publicar` é
+    chamado a cada frame, mas só monta o instantâneo a cada `intervalo`
+    segundos; se a fila estiver cheia, o instantâneo mais antigo sai para
+    dar lugar ao novo, então o laço nunca espera o consumidor.
+
+    Cada instantâneo é um dicionário com `camera`, `decorrido_s`, `frames`,
+    `fps`, `latencia_ms` (média da inferência no intervalo), `entradas` e
+    `saidas` por classe, `descartados` e `fim` (True no último).
+    """
+
+    def __init__(self, fila, camera=None, intervalo=0.5):
+        self.fila = fila
+        self.camera = camera
+        self.intervalo = intervalo
+        self._t0 = time.monotonic()
+        self._proximo = self._t0 + intervalo
+        self._ultimo = (self._t0, 0)
+        self._soma_latencia = 0.0
+        self._n_latencia = 0
+
+    def observar_latencia(self, segundos):
+        self._soma_latencia += segundos
+        self._n_latencia += 1
+
+    def talvez_publicar(self, frames, motor, leitor=None):
+        if time.monotonic() >= self._proximo:
+            self.publicar(frames, motor, leitor)
+
+    def publicar(self, frames, motor, leitor=None, fim=False):
+        agora = time.monotonic()
+        self._proximo = agora + self.intervalo
+        t_ant, f_ant = self._ultimo
+        self._ultimo = (agora, frames)
+        latencia = self._soma_latencia / self._n_latencia * 1000.0 if self._n_latencia else None
+        self._soma_latencia, self._n_latencia = 0.0, 0
+        self._colocar({
+            "camera": self.camera,
+            "decorrido_s": agora - self._t0,
+            "frames": frames,
+            "fps": (frames - f_ant) / (agora - t_ant) if agora > t_ant else 0.0,
+            "latencia_ms": latencia,
+            "entradas": motor.cont_ent,
+            "saidas": motor.cont_sai,
+            "descartados": getattr(leitor, "descartados", 0),
+            "fim": fim,
+        })
+
+    def _colocar(self, item):
+        while True:
+            try:
+                self.fila.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.fila.get_nowait()
+                except queue.Empty:
+                    pass
@@ -0,0 +1,98 @@
+import time
+import logging
+import threading
+
+import cv2
+
+
+class ExibidorFrames:
+    """
+    Janela do OpenCV atendida por uma thread própria. O laço de contagem só
+    entrega o frame anotado mais recente (`mostrar`) e segue em frente; a
+    thread exibe no máximo `fps_max` frames por segundo, descartando os
+    intermediários, e trata as teclas e o fechamento da janela.
+
+    `quer_frame` diz se já passou o intervalo da próxima exibição, para o
+    laço nem anotar frames que seriam descartados.
+    """
+
+    def __init__(self, nome_janela, tamanho, fps_max=15):
+        self.nome_janela = nome_janela
+        self.tamanho = tuple(tamanho)
+        self.intervalo = 1.0 / fps_max if fps_max else 0.0
+        self.motivo = None  # "q" (tecla), "x" (janela fechada) ou "erro"
+        self.exibidos = 0
+        self.descartados = 0
+        self._frame = None
+        self._proximo = 0.0
+        self._cond = threading.Condition()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._laco, daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    @property
+    def encerrado(self):
+        return self.motivo is not None
+
+    def quer_frame(self):
+        return time.monotonic() >= self._proximo
+
+    def mostrar(self, frame):
+        """Entrega o frame mais recente; um anterior ainda não exibido é descartado."""
+        with self._cond:
+            if self._frame is not None:
+                self.descartados += 1
+            self._frame = frame
+            self._proximo = time.monotonic() + self.intervalo
+            self._cond.notify()
+
+    def parar(self):
+        self._parar.set()
+        with self._cond:
+            self._cond.notify()
+        self._thread.join(timeout=2.0)
+
+    def _laco(self):
+        try:
+            self._exibir()
+        except Exception:
+            logging.exception("Erro na janela de exibição.")
+            self.motivo = "erro"
+
+    def _exibir(self):
+        # Todas as chamadas de janela ficam nesta thread
+        cv2.namedWindow(self.nome_janela, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(self.nome_janela, *self.tamanho)
+        fullscreen = False
+        exibiu = False
+        proxima_exibicao = 0.0
+        try:
+            while not self._parar.is_set() and self.motivo is None:
+                with self._cond:
+                    if self._frame is None:
+                        # Sem frame novo, acorda mesmo assim para atender a janela
+                        self._cond.wait(timeout=self.intervalo or 0.05)
+                    frame, self._frame = self._frame, None
+                if frame is not None:
+                    cv2.imshow(self.nome_janela, frame)
+                    self.exibidos += 1
+                    exibiu = True
+                    proxima_exibicao = time.monotonic() + self.intervalo
+
+                # Atende a janela até a vez da próxima exibição (teto de `fps_max`)
+                espera = max(1, int((proxima_exibicao - time.monotonic()) * 1000))
+                key = cv2.waitKey(espera) & 0xFF
+                if key == ord('f'):
+                    fullscreen = not fullscreen
+                    mode = cv2.WINDOW_FULLSCREEN if fullscreen else cv2.WINDOW_NORMAL
+                    cv2.setWindowProperty(self.nome_janela, cv2.WND_PROP_FULLSCREEN, mode)
+                if key == ord('q'):
+                    self.motivo = "q"
+                elif exibiu and cv2.getWindowProperty(self.nome_janela, cv2.WND_PROP_VISIBLE) < 1:
+                    self.motivo = "x"
+        finally:
+            cv2.destroyWindow(self.nome_janela)
+            cv2.waitKey(1)
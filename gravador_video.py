@@ -0,0 +1,137 @@
+import os
+import queue
+import shutil
+import logging
+import threading
+import subprocess
+
+import cv2
+
+# Extensão do arquivo para cada FOURCC do OpenCV
+EXTENSOES_FOURCC = {"mp4v": ".mp4", "avc1": ".mp4", "XVID": ".avi", "MJPG": ".avi"}
+
+POLITICAS = ("descartar_novo", "descartar_antigo")
+
+
+def caminho_video(caminho_relatorio, codec="mp4v"):
+    """Arquivo do vídeo anotado, ao lado do relatório."""
+    ext = EXTENSOES_FOURCC.get(codec, ".avi") if len(codec) == 4 else ".mp4"
+    return os.path.splitext(caminho_relatorio)[0] + ext
+
+
+class GravadorVideo:
+    """
+    Grava o vídeo anotado em uma thread própria. O laço de contagem só põe o
+    frame em uma fila limitada (`enviar` nunca bloqueia); com a fila cheia,
+    `politica` decide o que perder: o frame novo ("descartar_novo") ou o mais
+    antigo da fila ("descartar_antigo").
+
+    `codec` com 4 letras é um FOURCC do `cv2.VideoWriter` (ex.: "mp4v",
+    "XVID"); outro nome é tratado como encoder do ffmpeg (ex.: "libx264"),
+    alimentado por pipe. `tamanho` redimensiona na thread do encoder e
+    `decimacao` grava só um a cada N frames (o FPS do arquivo acompanha).
+    """
+
+    def __init__(self, caminho, fps, tamanho, codec="mp4v", decimacao=1,
+                 fila_max=64, politica="descartar_novo"):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política '{politica}' inválida (use {POLITICAS}).")
+        self.caminho = caminho
+        self.decimacao = max(int(decimacao), 1)
+        self.fps = max(fps / self.decimacao, 1.0)
+        self.tamanho = tuple(int(v) for v in tamanho)
+        self.codec = codec
+        self.politica = politica
+        self.escritos = 0
+        self.descartados = 0
+        self.erro = None
+        self._fila = queue.Queue(maxsize=fila_max)
+        self._saida = self._abrir()
+        self._thread = threading.Thread(target=self._laco, daemon=True)
+
+    def _abrir(self):
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        w, h = self.tamanho
+        if len(self.codec) == 4:
+            escritor = cv2.VideoWriter(self.caminho, cv2.VideoWriter_fourcc(*self.codec), self.fps, (w, h))
+            if not escritor.isOpened():
+                raise IOError(f"Não foi possível criar o vídeo '{self.caminho}' com o codec '{self.codec}'.")
+            return escritor
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError(f"Codec '{self.codec}' requer o ffmpeg instalado no PATH.")
+        cmd = [ffmpeg, "-loglevel", "error", "-y",
+               "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{w}x{h}", "-r", f"{self.fps:g}", "-i", "-",
+               "-c:v", self.codec, "-pix_fmt", "yuv420p", self.caminho]
+        return subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def quer_frame(self, idx):
+        """Se o frame `idx` entra no vídeo (para não anotar os que a decimação pula)."""
+        return idx % self.decimacao == 0
+
+    def enviar(self, frame):
+        """Enfileira um frame anotado sem bloquear; retorna False se algum foi descartado."""
+        try:
+            self._fila.put_nowait(frame)
+            return True
+        except queue.Full:
+            pass
+        self.descartados += 1
+        if self.politica == "descartar_antigo":
+            try:
+                self._fila.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._fila.put_nowait(frame)
+            except queue.Full:
+                pass
+        return False
+
+    def _laco(self):
+        while True:
+            frame = self._fila.get()
+            if frame is None:
+                break
+            if self.erro is not None:
+                continue
+            try:
+                if frame.shape[1::-1] != self.tamanho:
+                    frame = cv2.resize(frame, self.tamanho, interpolation=cv2.INTER_AREA)
+                if isinstance(self._saida, cv2.VideoWriter):
+                    self._saida.write(frame)
+                else:
+                    self._saida.stdin.write(frame.tobytes())
+                self.escritos += 1
+            except Exception as e:
+                # Falha no encoder não derruba a contagem: o resto é descartado
+                logging.exception("Erro ao gravar o vídeo anotado.")
+                self.erro = e
+
+    def fechar(self):
+        # O sentinela precisa entrar mesmo com a fila cheia
+        while True:
+            try:
+                self._fila.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                if not self._thread.is_alive():
+                    break
+        if self._thread.is_alive():
+            self._thread.join()
+        if isinstance(self._saida, cv2.VideoWriter):
+            self._saida.release()
+        else:
+            try:
+                self._saida.stdin.close()
+            except OSError:
+                pass
+            self._saida.wait()
+
+    def resumo(self):
+        return (f"Vídeo anotado: {self.caminho} ({self.escritos} frames gravados, "
+                f"{self.descartados} descartados por fila cheia)")
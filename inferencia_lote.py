@@ -0,0 +1,228 @@
+import sys
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+import itertools
+from concurrent.futures import Future
+
+import numpy as np
+from ultralytics import YOLO
+from ultralytics.trackers.track import TRACKER_MAP
+from ultralytics.utils import YAML, IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
+
+from deteccao import extrair_caixas, preparar_quadro, restaurar_caixas
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+
+class AgendadorInferencia:
+    """
+    Compartilha um único modelo YOLO entre várias câmeras. Cada câmera
+    envia seus frames por `inferir`; uma thread junta os pedidos em lotes de
+    até `max_lote` frames (esperando no máximo `max_espera_ms` para completar
+    o lote), roda um único forward pass e devolve a cada câmera as caixas já
+    rastreadas pelo rastreador próprio dela.
+
+    Como cada câmera espera o resultado antes de enviar o próximo frame, um
+    lote nunca tem dois frames da mesma câmera e a ordem por câmera é mantida.
+    """
+
+    def __init__(self, model_path, max_lote=8, max_espera_ms=10, tracker="botsort.yaml"):
+        if max_lote < 1:
+            raise ValueError("max_lote deve ser pelo menos 1.")
+        try:
+            self.modelo = YOLO(model_path)
+        except Exception as e:
+            raise RuntimeError(f"Erro ao carregar modelo '{model_path}': {e}")
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000.0
+        self._cfg_tracker = IterableSimpleNamespace(**YAML.load(check_yaml(tracker)))
+
+        self._cameras = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._fila = queue.Queue()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._laco, daemon=True)
+
+        self.lotes = 0
+        self.frames = 0
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join(timeout=2.0)
+
+    @property
+    def tamanho_medio_lote(self):
+        return self.frames / self.lotes if self.lotes else 0.0
+
+    def registrar(self, classes, frame_rate=30, rastreador=None):
+        """
+        Registra uma câmera com seu próprio rastreador e retorna a chave dela.
+        `rastreador` pode ser o YAML de um rastreador do ultralytics (padrão:
+        o do agendador) ou um rastreador próprio de `rastreadores.py`.
+        """
+        if rastreador is None or isinstance(rastreador, str):
+            cfg = self._cfg_tracker
+            if rastreador is not None:
+                cfg = IterableSimpleNamespace(**YAML.load(check_yaml(rastreador)))
+            rastreador = TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=int(frame_rate))
+        with self._lock:
+            chave = next(self._ids)
+            self._cameras[chave] = (rastreador, np.asarray(classes))
+        return chave
+
+    def liberar(self, chave):
+        with self._lock:
+            self._cameras.pop(chave, None)
+
+    def inferir(self, chave, frame, roi=None, escala=None):
+        """
+        Mesmo contrato de `deteccao.inferir`, mas com o forward pass feito
+        em lote junto com as outras câmeras. Bloqueia até o resultado.
+        """
+        img, imgsz, transformacao = preparar_quadro(frame, roi, escala)
+        futuro = Future()
+        self._fila.put((chave, img, imgsz, futuro))
+        xyxy, ids, clss = futuro.result()
+        return restaurar_caixas(xyxy, transformacao), ids, clss
+
+    def _laco(self):
+        while not self._parar.is_set():
+            try:
+                lote = [self._fila.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            limite = time.monotonic() + self.max_espera
+            while len(lote) < self.max_lote:
+                resto = limite - time.monotonic()
+                if resto <= 0:
+                    break
+                try:
+                    lote.append(self._fila.get(timeout=resto))
+                except queue.Empty:
+                    break
+            self._processar(lote)
+
+        # Libera quem ainda estiver esperando
+        while True:
+            try:
+                _, _, _, futuro = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            futuro.set_exception(RuntimeError("Agendador de inferência encerrado."))
+
+    def _processar(self, lote):
+        # Câmeras com `imgsz` diferentes não cabem no mesmo tensor
+        grupos = {}
+        for item in lote:
+            grupos.setdefault(item[2], []).append(item)
+        for imgsz, itens in grupos.items():
+            self._processar_grupo(itens, imgsz)
+
+    def _processar_grupo(self, lote, imgsz):
+        try:
+            kwargs = {"imgsz": imgsz} if imgsz else {}
+            # Limiar baixo como no `modelo.track`: os rastreadores filtram depois
+            resultados = self.modelo.predict(
+                source=[img for _, img, _, _ in lote],
+                conf=0.1,
+                verbose=False,
+                **kwargs
+            )
+        except Exception as e:
+            for *_, futuro in lote:
+                futuro.set_exception(e)
+            return
+
+        self.lotes += 1
+        self.frames += len(lote)
+        for (chave, img, _, futuro), res in zip(lote, resultados):
+            try:
+                with self._lock:
+                    rastreador, classes = self._cameras[chave]
+                if hasattr(rastreador, "atualizar"):
+                    xyxy, conf, clss = extrair_caixas(res)
+                    sel = np.isin(clss, classes)
+                    futuro.set_result(rastreador.atualizar(xyxy[sel], conf[sel], clss[sel]))
+                    continue
+                det = res.boxes.cpu().numpy()
+                det = det[np.isin(det.cls.astype(int), classes)]
+                trilhas = rastreador.update(det, img)
+                if len(trilhas) == 0:
+                    vazio = (np.empty((0, 4), dtype=np.float32),
+                             np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+                    futuro.set_result(vazio)
+                    continue
+                futuro.set_result((trilhas[:, :4].astype(np.float32),
+                                   trilhas[:, 4].astype(np.int64),
+                                   trilhas[:, 6].astype(np.int64)))
+            except Exception as e:
+                futuro.set_exception(e)
+
+
+def contar_multicamera(cameras, model_path, max_lote=8, max_espera_ms=10, stop_event=None, **opcoes):
+    """
+    Conta várias câmeras ao mesmo tempo com um único modelo. `cameras` é uma
+    lista de dicionários com `video_path`, `areas_path`, `classes` e,
+    opcionalmente, `camera_name`. As demais opções são repassadas a
+    `contar_veiculos_nVideo`. Retorna os caminhos dos relatórios por câmera
+    (None para as que falharam).
+    """
+    from contar_nVideo import contar_veiculos_nVideo
+
+    agendador = AgendadorInferencia(model_path, max_lote, max_espera_ms).iniciar()
+    relatorios = [None] * len(cameras)
+
+    def rodar(i, cam):
+        try:
+            relatorios[i] = contar_veiculos_nVideo(
+                video_path=cam["video_path"],
+                areas_path=cam["areas_path"],
+                model_path=model_path,
+                classes_selecionadas=cam["classes"],
+                camera_name=cam.get("camera_name"),
+                stop_event=stop_event,
+                agendador=agendador,
+                **opcoes
+            )
+        except Exception:
+            logging.exception(f"Erro na câmera {cam.get('camera_name') or cam['video_path']}.")
+
+    threads = [threading.Thread(target=rodar, args=(i, cam), daemon=True)
+               for i, cam in enumerate(cameras)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    agendador.parar()
+    logging.info(f"Inferência em lote: {agendador.frames} frames em {agendador.lotes} lotes "
+                 f"(média {agendador.tamanho_medio_lote:.1f} por lote).")
+    return relatorios
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Contagem simultânea de várias câmeras com um modelo compartilhado.")
+    ap.add_argument("cameras", help="JSON com a lista de câmeras (video_path, areas_path, classes, camera_name)")
+    ap.add_argument("modelo", help="caminho do modelo YOLO (.pt)")
+    ap.add_argument("--max-lote", type=int, default=8)
+    ap.add_argument("--max-espera-ms", type=float, default=10)
+    ap.add_argument("--porta-metricas", type=int, default=None,
+                    help="expõe métricas do Prometheus em http://127.0.0.1:PORTA/metrics")
+    args = ap.parse_args(argv)
+    with open(args.cameras, "r", encoding="utf-8") as f:
+        cameras = json.load(f)
+    contar_multicamera(cameras, args.modelo, args.max_lote, args.max_espera_ms,
+                       porta_metricas=args.porta_metricas)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
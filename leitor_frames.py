@@ -0,0 +1,295 @@
+import time
+import queue
+import logging
+import threading
+from urllib.parse import urlsplit
+
+import cv2
+
+# Sentinela colocada na fila quando o vídeo termina ou a leitura é interrompida
+_FIM = object()
+
+# Protocolos que só existem como transmissão contínua
+ESQUEMAS_AO_VIVO = ("rtsp", "rtsps", "rtmp", "rtmps", "rtp", "udp", "tcp", "srt")
+
+
+def eh_ao_vivo(fonte, cap=None):
+    """
+    Se `fonte` é uma transmissão ao vivo: protocolos de stream e playlists
+    HLS (`.m3u8`). Outras URLs (por exemplo `https://.../video.mp4`) são
+    arquivos finitos, a menos que `cap` não informe o número de frames.
+    """
+    url = urlsplit(str(fonte))
+    if not url.scheme or len(url.scheme) == 1:  # caminho local (inclusive `C:\...`)
+        return False
+    if url.scheme.lower() in ESQUEMAS_AO_VIVO or url.path.lower().endswith(".m3u8"):
+        return True
+    return cap is not None and cap.get(cv2.CAP_PROP_FRAME_COUNT) <= 0
+
+
+def posicionar(cap, inicio):
+    """
+    Avança `cap` para o frame `inicio` e retorna a posição real, que pode
+    ficar antes (keyframe); os frames até `inicio` devem ser pulados.
+    """
+    if inicio <= 0:
+        return 0
+    cap.set(cv2.CAP_PROP_POS_FRAMES, inicio)
+    return min(int(cap.get(cv2.CAP_PROP_POS_FRAMES)), inicio)
+
+
+class LeitorFrames:
+    """
+    Lê e redimensiona frames de um `cv2.VideoCapture` em uma thread própria,
+    entregando-os por uma fila limitada. Enquanto o modelo processa um frame,
+    os próximos já estão sendo decodificados.
+
+    A fila tem `profundidade` posições: quando cheia, a thread de leitura
+    espera (backpressure) em vez de acumular frames na memória. Tanto a
+    leitura quanto o consumo respeitam `stop_event`. Com `passo > 1`, só um
+    a cada `passo` frames é decodificado; os demais são apenas avançados
+    com `grab()`. Com `inicio`, a leitura começa nesse frame (retomada).
+    Com `perfil` (`PerfilEtapas`), mede decodificação e redimensionamento.
+    """
+
+    def __init__(self, cap, tamanho, profundidade=8, stop_event=None, passo=1, inicio=0, perfil=None):
+        if profundidade < 1:
+            raise ValueError("A profundidade da fila deve ser pelo menos 1.")
+        self.cap = cap
+        self.tamanho = tamanho
+        self.passo = max(int(passo), 1)
+        self.stop_event = stop_event
+        self.inicio = inicio
+        self.perfil = perfil
+        self._parar = threading.Event()
+        self.fila = queue.Queue(maxsize=profundidade)
+        self._thread = threading.Thread(target=self._produzir, daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def _parado(self):
+        return self._parar.is_set() or (self.stop_event is not None and self.stop_event.is_set())
+
+    def _colocar(self, item):
+        # Bloqueia enquanto a fila estiver cheia, mas acorda periodicamente
+        # para verificar se a parada foi solicitada.
+        while not self._parado():
+            try:
+                self.fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produzir(self):
+        perfil = self.perfil
+        try:
+            idx = posicionar(self.cap, self.inicio) - 1
+            while not self._parado():
+                idx += 1
+                if idx < self.inicio or idx % self.passo:
+                    if not self.cap.grab():
+                        break
+                    continue
+                if perfil:
+                    t0 = perfil.agora()
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                t_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+                if perfil:
+                    t1 = perfil.agora()
+                    perfil.registrar("decodificacao", t1 - t0)
+                frame = cv2.resize(frame, self.tamanho)
+                if perfil:
+                    perfil.registrar("redimensionamento", perfil.agora() - t1)
+                if not self._colocar((idx, frame, t_ms)):
+                    break
+        except Exception:
+            logging.exception("Erro na leitura de frames.")
+        finally:
+            self._colocar(_FIM)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """Retorna `(indice, frame, t_ms)`; encerra ao fim do vídeo ou na parada."""
+        while True:
+            if self._parado():
+                raise StopIteration
+            try:
+                item = self.fila.get(timeout=0.1)
+            except queue.Empty:
+                if not self._thread.is_alive() and self.fila.empty():
+                    raise StopIteration
+                continue
+            if item is _FIM:
+                raise StopIteration
+            return item
+
+    def parar(self):
+        """Sinaliza a parada e aguarda a thread de leitura terminar."""
+        self._parar.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+
+
+class LeitorAoVivo:
+    """
+    Leitor para streams (URL): uma thread lê continuamente e guarda só o
+    frame mais recente, de modo que o consumidor sempre processa o mais
+    novo e a latência não cresce quando a inferência é mais lenta que o
+    stream. Frames substituídos antes de serem consumidos são contados em
+    `descartados`.
+
+    Quando o stream cai, a conexão é refeita com espera exponencial (de
+    `espera_inicial` até `espera_max` segundos) sem encerrar a iteração, e o
+    consumidor mantém seus contadores. `t_ms` é o tempo de relógio desde o
+    início da leitura, não `CAP_PROP_POS_MSEC`. Desiste após `max_tentativas`
+    reconexões seguidas sem sucesso (None: tenta para sempre). Se a fonte
+    informa o número de frames (arquivo servido por URL), chegar ao último é
+    o fim do vídeo, e uma queda no meio retoma da posição lida. Os índices dos
+    frames começam em `inicio` (numeração contínua ao retomar). Com
+    `perfil`, mede a decodificação (thread de leitura) e o redimensionamento.
+    """
+
+    def __init__(self, fonte, tamanho, stop_event=None, cap=None,
+                 espera_inicial=0.5, espera_max=30.0, max_tentativas=10, inicio=0, perfil=None):
+        self.fonte = fonte
+        self.tamanho = tamanho
+        self.stop_event = stop_event
+        self.cap = cap
+        self.espera_inicial = espera_inicial
+        self.espera_max = espera_max
+        self.max_tentativas = max_tentativas
+        self.inicio = inicio
+        self.perfil = perfil
+        self._parar = threading.Event()
+        self._cond = threading.Condition()
+        self._ultimo = None
+        self._fim = False
+        self._total = 0
+        self._posicao = 0
+        self.lidos = 0
+        self.descartados = 0
+        self.quedas = 0
+        self.reconexoes = 0
+        self._thread = threading.Thread(target=self._capturar, daemon=True)
+
+    def iniciar(self):
+        self._t0 = time.monotonic()
+        self._thread.start()
+        return self
+
+    def _parado(self):
+        return self._parar.is_set() or (self.stop_event is not None and self.stop_event.is_set())
+
+    def _esperar(self, segundos):
+        # Acorda cedo se a parada for solicitada
+        fim = time.monotonic() + segundos
+        while not self._parado():
+            resto = fim - time.monotonic()
+            if resto <= 0:
+                return
+            self._parar.wait(min(resto, 0.1))
+
+    def _conectar(self):
+        espera = self.espera_inicial
+        tentativas = 0
+        while not self._parado():
+            cap = cv2.VideoCapture(self.fonte)
+            if cap.isOpened():
+                if self._total > 0 and self._posicao:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, self._posicao)
+                if self.quedas:
+                    self.reconexoes += 1
+                    logging.info(f"Stream reconectado após {tentativas + 1} tentativa(s).")
+                return cap
+            cap.release()
+            tentativas += 1
+            if self.max_tentativas is not None and tentativas >= self.max_tentativas:
+                logging.error(f"Stream indisponível após {tentativas} tentativas; encerrando.")
+                return None
+            logging.warning(f"Falha ao reconectar ao stream; nova tentativa em {espera:.1f}s.")
+            self._esperar(espera)
+            espera = min(espera * 2, self.espera_max)
+        return None
+
+    def _capturar(self):
+        idx = self.inicio - 1
+        perfil = self.perfil
+        try:
+            if self.cap is not None:
+                self._total = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            while not self._parado():
+                if self.cap is None:
+                    self.cap = self._conectar()
+                    if self.cap is None:
+                        break
+                    self._total = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                if perfil:
+                    t0 = perfil.agora()
+                ret, frame = self.cap.read()
+                if not ret:
+                    if 0 < self._total <= self._posicao + 1:
+                        logging.info("Fim do vídeo.")
+                        break
+                    self.quedas += 1
+                    logging.warning("Stream interrompido; reconectando...")
+                    self.cap.release()
+                    self.cap = None
+                    continue
+                idx += 1
+                self._posicao += 1
+                t_ms = (time.monotonic() - self._t0) * 1000.0
+                if perfil:
+                    perfil.registrar("decodificacao", perfil.agora() - t0)
+                with self._cond:
+                    self.lidos += 1
+                    if self._ultimo is not None:
+                        self.descartados += 1
+                    self._ultimo = (idx, frame, t_ms)
+                    self._cond.notify()
+        except Exception:
+            logging.exception("Erro na leitura do stream.")
+        finally:
+            if self.cap is not None:
+                self.cap.release()
+            with self._cond:
+                self._fim = True
+                self._cond.notify()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """Retorna `(indice, frame, t_ms)` do frame mais recente disponível."""
+        with self._cond:
+            while self._ultimo is None:
+                if self._fim or self._parado():
+                    raise StopIteration
+                self._cond.wait(0.1)
+            idx, frame, t_ms = self._ultimo
+            self._ultimo = None
+        # Só o frame consumido é redimensionado
+        if not self.perfil:
+            return idx, cv2.resize(frame, self.tamanho), t_ms
+        t0 = self.perfil.agora()
+        frame = cv2.resize(frame, self.tamanho)
+        self.perfil.registrar("redimensionamento", self.perfil.agora() - t0)
+        return idx, frame, t_ms
+
+    def resumo(self):
+        total = self.lidos
+        prop = self.descartados / total if total else 0.0
+        return (f"Ao vivo: {total} frames lidos, {self.descartados} descartados ({prop:.0%}), "
+                f"{self.quedas} queda(s) do stream, {self.reconexoes} reconexão(ões)")
+
+    def parar(self):
+        """Sinaliza a parada e aguarda a thread de leitura terminar."""
+        self._parar.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
@@ -0,0 +1,159 @@
+"""
+Processa em lote uma pasta (ou padrões glob) de vídeos sem interface
+gráfica, com vários processos. Vídeos que já têm relatório em
+`relatorios.db` são pulados e os interrompidos continuam do último
+checkpoint, então basta rodar de novo após uma queda.
+
+Uso: python lote.py VIDEOS... --modelo models/yolov8n.pt [--areas resultados/areas.json] [--processos 4]
+
+As áreas de cada vídeo são procuradas ao lado dele (`<video>.areas.json` ou
+`<video>.json`); sem elas, vale `--areas`.
+"""
+import os
+import sys
+import glob
+import sqlite3
+import logging
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from rastreadores import RASTREADORES
+from recontar import DB_PATH, init_db
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+EXTENSOES_VIDEO = (".mp4", ".avi", ".mkv", ".mov")
+
+
+def listar_videos(entradas):
+    """Expande pastas e padrões glob em uma lista ordenada de arquivos de vídeo."""
+    videos = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            candidatos = glob.glob(os.path.join(entrada, "**", "*"), recursive=True)
+        else:
+            candidatos = glob.glob(entrada, recursive=True)
+        for c in candidatos:
+            if os.path.isfile(c) and c.lower().endswith(EXTENSOES_VIDEO):
+                videos.add(os.path.abspath(c))
+    return sorted(videos)
+
+
+def areas_do_video(video, padrao=None):
+    """Arquivo de áreas do vídeo (ao lado dele) ou o padrão; None se não houver."""
+    base = os.path.splitext(video)[0]
+    for candidato in (base + ".areas.json", base + ".json"):
+        if os.path.exists(candidato):
+            return candidato
+    return padrao if padrao and os.path.exists(padrao) else None
+
+
+def videos_processados():
+    """Fontes que já têm relatório de contagem (recontagens não contam)."""
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("SELECT DISTINCT video_source FROM relatorios WHERE model_used NOT LIKE 'recontagem%'")
+    fontes = {os.path.abspath(r[0]) for r in c.fetchall() if "://" not in r[0]}
+    conn.close()
+    return fontes
+
+
+def _processar(video, areas, modelo, classes, threads, opcoes):
+    """Processo do lote: conta um vídeo e retorna o caminho do relatório."""
+    import torch
+    from contar_nVideo import contar_veiculos_nVideo
+
+    torch.set_num_threads(threads)
+    return contar_veiculos_nVideo(
+        video_path=video,
+        areas_path=areas,
+        model_path=modelo,
+        classes_selecionadas=classes,
+        camera_name=os.path.splitext(os.path.basename(video))[0],
+        **opcoes
+    )
+
+
+def processar_lote(entradas, modelo, classes, areas_padrao=None, processos=2, **opcoes):
+    """
+    Conta todos os vídeos de `entradas` que ainda não têm relatório. Retorna
+    `(concluidos, falhas, pulados)` com os caminhos dos vídeos.
+    """
+    videos = listar_videos(entradas)
+    feitos = videos_processados()
+    pendentes, pulados = [], []
+    for v in videos:
+        if v in feitos:
+            pulados.append(v)
+            continue
+        areas = areas_do_video(v, areas_padrao)
+        if areas is None:
+            logging.warning(f"Sem áreas para '{v}'; pulando.")
+            pulados.append(v)
+            continue
+        pendentes.append((v, areas))
+    logging.info(f"{len(videos)} vídeos encontrados: {len(pendentes)} pendentes, "
+                 f"{len(pulados)} pulados (já processados ou sem áreas).")
+
+    concluidos, falhas = [], []
+    if not pendentes:
+        return concluidos, falhas, pulados
+
+    processos = max(1, min(processos, len(pendentes)))
+    threads = max((os.cpu_count() or 1) // processos, 1)
+    with ProcessPoolExecutor(max_workers=processos, mp_context=mp.get_context("spawn")) as pool:
+        futuros = {
+            pool.submit(_processar, v, a, modelo, list(classes), threads, opcoes): v
+            for v, a in pendentes
+        }
+        for i, fut in enumerate(as_completed(futuros), 1):
+            v = futuros[fut]
+            try:
+                relatorio = fut.result()
+                concluidos.append(v)
+                logging.info(f"[{i}/{len(pendentes)}] {os.path.basename(v)} -> {relatorio}")
+            except Exception as e:
+                falhas.append(v)
+                logging.error(f"[{i}/{len(pendentes)}] {os.path.basename(v)} falhou: {e}")
+    return concluidos, falhas, pulados
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("videos", nargs="+", help="pastas, arquivos ou padrões glob")
+    ap.add_argument("--modelo", required=True, help="caminho do modelo YOLO (.pt)")
+    ap.add_argument("--areas", default=None, help="áreas padrão para vídeos sem arquivo próprio")
+    ap.add_argument("--classes", type=int, nargs="+", default=[2, 3, 5, 7])
+    ap.add_argument("--processos", type=int, default=2)
+    ap.add_argument("--passo", type=int, default=1, help="detectar a cada N frames")
+    ap.add_argument("--largura-inferencia", type=int, default=None)
+    ap.add_argument("--roi", action="store_true", help="detectar só na região das áreas")
+    ap.add_argument("--portao", action="store_true", help="pular detecção sem movimento")
+    ap.add_argument("--salvar-trilhas", action="store_true")
+    ap.add_argument("--rastreador", choices=list(RASTREADORES), default="botsort",
+                    help="iou: rastreador leve em NumPy, sem compensação de movimento da câmera")
+    ap.add_argument("--perfil", action="store_true",
+                    help="mede o tempo de cada etapa e inclui p50/p95/p99 no relatório")
+    ap.add_argument("--checkpoint", type=float, default=60.0,
+                    help="segundos entre checkpoints (0 desativa); vídeos interrompidos continuam de onde pararam")
+    args = ap.parse_args(argv)
+
+    _, falhas, _ = processar_lote(
+        args.videos, args.modelo, args.classes, args.areas, args.processos,
+        passo_deteccao=args.passo,
+        largura_inferencia=args.largura_inferencia,
+        recorte_roi=args.roi,
+        portao_movimento=args.portao,
+        salvar_trilhas=args.salvar_trilhas,
+        checkpoint_s=args.checkpoint or None,
+        retomar=bool(args.checkpoint),
+        rastreador=args.rastreador,
+        perfil_etapas=args.perfil,
+    )
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
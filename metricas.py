@@ -0,0 +1,208 @@
+"""
+Endpoint de métricas no formato de texto do Prometheus, servido em
+localhost por uma thread em segundo plano (um servidor por processo,
+compartilhado por todas as câmeras que rodam nele).
+
+O laço de frames só incrementa contadores em `MetricasCamera`; valores
+que já existem em outros objetos (fila do leitor, trilhas vivas,
+contagens) são lidos por funções registradas em `ligar`, chamadas apenas
+quando alguém consulta o endpoint, na thread do servidor.
+
+    curl http://127.0.0.1:9400/metrics
+"""
+import time
+import bisect
+import logging
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PORTA_PADRAO = 9400
+
+# FPS: uma amostra `(instante, frames)` por segundo, nos últimos 10 s
+INTERVALO_AMOSTRA_FPS = 1.0
+AMOSTRAS_FPS = 11
+
+# Limites (s) do histograma de latência de inferência
+BALDES_INFERENCIA = (0.005, 0.01, 0.02, 0.035, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5)
+
+_servidor = None
+_cameras = {}
+_lock = threading.Lock()
+
+
+def profundidade_fila(leitor):
+    """Frames esperando no leitor, para qualquer um dos leitores de `leitor_frames`/`anel_frames`."""
+    if hasattr(leitor, "fila"):
+        return leitor.fila.qsize()
+    if hasattr(leitor, "anel"):
+        return leitor.anel.ocupacao()
+    return int(getattr(leitor, "_ultimo", None) is not None)
+
+
+class MetricasCamera:
+    """
+    Métricas de uma câmera; atualizadas pelo laço sem travas. O FPS sai de
+    amostras guardadas pelo próprio laço em `contar_frame`, então consultar
+    o endpoint não altera o valor (vários coletores leem o mesmo número).
+    """
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.frames = 0
+        self.inferencias = 0
+        self.soma_inferencia = 0.0
+        self.baldes = [0] * (len(BALDES_INFERENCIA) + 1)
+        self._fontes = {}
+        agora = time.monotonic()
+        self._amostras = deque([(agora, 0)], maxlen=AMOSTRAS_FPS)
+        self._proxima_amostra = agora + INTERVALO_AMOSTRA_FPS
+
+    def ligar(self, **fontes):
+        """
+        Registra funções lidas na consulta: `fila`, `descartados`,
+        `trilhas` (inteiros) e `contagens` (`(cont_ent, cont_sai)`).
+        """
+        self._fontes.update(fontes)
+        return self
+
+    def observar_inferencia(self, segundos):
+        self.baldes[bisect.bisect_left(BALDES_INFERENCIA, segundos)] += 1
+        self.soma_inferencia += segundos
+        self.inferencias += 1
+
+    def contar_frame(self):
+        self.frames += 1
+        agora = time.monotonic()
+        if agora >= self._proxima_amostra:
+            self._amostras.append((agora, self.frames))
+            self._proxima_amostra = agora + INTERVALO_AMOSTRA_FPS
+
+    def fps(self):
+        """FPS na janela das amostras (até 10 s); só lê, não muda o estado."""
+        t0, f0 = self._amostras[0]
+        t1, f1 = self._amostras[-1]
+        return (f1 - f0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def fonte(self, nome, padrao=None):
+        func = self._fontes.get(nome)
+        if func is None:
+            return padrao
+        try:
+            return func()
+        except Exception:
+            logging.debug(f"Métrica '{nome}' indisponível para '{self.nome}'.", exc_info=True)
+            return padrao
+
+
+def _rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def gerar_texto():
+    """Todas as métricas das câmeras registradas, no formato de texto do Prometheus."""
+    with _lock:
+        cameras = list(_cameras.values())
+
+    linhas = []
+
+    def metrica(nome, tipo, ajuda, amostras):
+        linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+        for rotulos, valor in amostras:
+            txt = ",".join(f'{k}="{_rotulo(v)}"' for k, v in rotulos.items())
+            linhas.append(f"{nome}{{{txt}}} {valor}")
+
+    metrica("vehicle_tracker_frames_processed_total", "counter", "Frames processados pelo laço.",
+            [({"camera": c.nome}, c.frames) for c in cameras])
+    metrica("vehicle_tracker_fps", "gauge", "Frames por segundo nos últimos 10 s.",
+            [({"camera": c.nome}, f"{c.fps():.3f}") for c in cameras])
+    metrica("vehicle_tracker_queue_depth", "gauge", "Frames decodificados esperando na fila do leitor.",
+            [({"camera": c.nome}, c.fonte("fila", 0)) for c in cameras])
+    metrica("vehicle_tracker_frames_dropped_total", "counter",
+            "Frames descartados pelo leitor (ao vivo ou anel com sobrescrita).",
+            [({"camera": c.nome}, c.fonte("descartados", 0)) for c in cameras])
+    metrica("vehicle_tracker_live_tracks", "gauge", "Trilhas vivas no motor de contagem.",
+            [({"camera": c.nome}, c.fonte("trilhas", 0)) for c in cameras])
+
+    entradas, saidas = [], []
+    for c in cameras:
+        cont_ent, cont_sai = c.fonte("contagens", ({}, {}))
+        entradas += [({"camera": c.nome, "class": n}, v) for n, v in cont_ent.items()]
+        saidas += [({"camera": c.nome, "class": n}, v) for n, v in cont_sai.items()]
+    metrica("vehicle_tracker_entries_total", "counter", "Entradas contadas por classe.", entradas)
+    metrica("vehicle_tracker_exits_total", "counter", "Saídas contadas por classe.", saidas)
+
+    nome = "vehicle_tracker_inference_seconds"
+    linhas.append(f"# HELP {nome} Latência de inferência por frame (inclui rastreamento).")
+    linhas.append(f"# TYPE {nome} histogram")
+    for c in cameras:
+        cam = _rotulo(c.nome)
+        baldes, soma, n = list(c.baldes), c.soma_inferencia, c.inferencias
+        acumulado = 0
+        for limite, qtd in zip(BALDES_INFERENCIA, baldes):
+            acumulado += qtd
+            linhas.append(f'{nome}_bucket{{camera="{cam}",le="{limite}"}} {acumulado}')
+        linhas.append(f'{nome}_bucket{{camera="{cam}",le="+Inf"}} {acumulado + baldes[-1]}')
+        linhas.append(f'{nome}_sum{{camera="{cam}"}} {soma:.6f}')
+        linhas.append(f'{nome}_count{{camera="{cam}"}} {n}')
+    return "\n".join(linhas) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        corpo = gerar_texto().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_servidor(porta=PORTA_PADRAO, host="127.0.0.1"):
+    """
+    Sobe o servidor do processo (só na primeira chamada) e retorna a porta
+    em uso, ou None se não foi possível abrir a porta; a contagem segue
+    normalmente sem métricas nesse caso.
+    """
+    global _servidor
+    with _lock:
+        if _servidor is None:
+            try:
+                _servidor = ThreadingHTTPServer((host, porta), _Handler)
+            except OSError as e:
+                logging.warning(f"Métricas desativadas: não foi possível abrir {host}:{porta} ({e}).")
+                return None
+            _servidor.daemon_threads = True
+            threading.Thread(target=_servidor.serve_forever, daemon=True).start()
+            logging.info(f"Métricas em http://{host}:{_servidor.server_port}/metrics")
+        return _servidor.server_port
+
+
+def parar_servidor():
+    global _servidor
+    with _lock:
+        servidor, _servidor = _servidor, None
+    if servidor is not None:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def registrar_camera(nome):
+    """Cria as métricas de uma câmera (substitui outra com o mesmo nome)."""
+    m = MetricasCamera(nome)
+    with _lock:
+        _cameras[nome] = m
+    return m
+
+
+def remover_camera(metricas):
+    with _lock:
+        if _cameras.get(metricas.nome) is metricas:
+            del _cameras[metricas.nome]
@@ -0,0 +1,221 @@
+from collections import namedtuple
+
+import numpy as np
+
+from estado_trilhas import ArmazemTrilhas
+
+# Detecções de um frame já filtradas pelas classes contadas, com os
+# centróides e as máscaras de quem acabou de entrar em cada área;
+# `frame_ent`/`frame_sai` dão o frame (possivelmente interpolado) em que
+# cada transição aconteceu.
+Quadro = namedtuple("Quadro", ["xyxy", "ids", "classes", "centros", "entrou", "saiu",
+                               "frame_ent", "frame_sai"])
+
+QUADRO_VAZIO = Quadro(np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.int64),
+                      np.empty(0, dtype=np.int64), np.empty((0, 2), dtype=np.int32),
+                      np.zeros(0, dtype=bool), np.zeros(0, dtype=bool),
+                      np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+
+def extrair_deteccoes(res):
+    """
+    Converte `res.boxes` de um resultado do YOLO em arrays NumPy
+    `(xyxy, ids, classes)`. Sem IDs de rastreamento, retorna arrays vazios.
+    """
+    boxes = res.boxes
+    if boxes is None or getattr(boxes, "id", None) is None:
+        return (np.empty((0, 4), dtype=np.float32),
+                np.empty(0, dtype=np.int64),
+                np.empty(0, dtype=np.int64))
+    xyxy = boxes.xyxy.cpu().numpy().astype(np.float32, copy=False)
+    ids = boxes.id.int().cpu().numpy().astype(np.int64, copy=False)
+    clss = boxes.cls.int().cpu().numpy().astype(np.int64, copy=False)
+    return xyxy, ids, clss
+
+
+class MotorContagem:
+    """
+    Motor de contagem de entradas/saídas que processa todas as detecções de
+    um frame de uma vez. A pertinência às zonas vem da `MascaraZonas`
+    (zona 0 = entrada, zona 1 = saída) e o estado de cada trilha (dentro da
+    entrada/saída, já contada) fica em um `ArmazemTrilhas`, que descarta
+    trilhas inativas para manter a memória limitada em execuções longas.
+    Os contadores não dependem das trilhas vivas e nunca diminuem.
+
+    `ttl_frames` é contado em chamadas a `atualizar` (uma por execução do
+    detector), não em frames do vídeo: o buffer do rastreador conta
+    atualizações, e com `passo` > 1 ou frames pulados pelo portão de
+    movimento o rastreador fica parado enquanto o índice do frame avança.
+    """
+
+    def __init__(self, mascara, classes_selecionadas, nomes_classes,
+                 ttl_frames=300, max_trilhas=10000, intervalo_expiracao=30, passo=1):
+        self.mascara = mascara
+        self.trilhas = ArmazemTrilhas(ttl_frames, max_trilhas)
+        self.intervalo_expiracao = intervalo_expiracao
+        self.passo = max(int(passo), 1)
+        self.frame = -1
+        self.atualizacoes = 0
+        self._ultima_expiracao = -1
+        self.nomes = [nomes_classes[c] for c in classes_selecionadas if c in nomes_classes]
+
+        # Tabela classe do YOLO -> posição em `self.nomes` (-1 = não contada)
+        ids_sel = [c for c in classes_selecionadas if c in nomes_classes]
+        self._idx_classe = np.full(max(ids_sel, default=0) + 1, -1, dtype=np.int64)
+        for i, c in enumerate(ids_sel):
+            self._idx_classe[c] = i
+
+        self._cont_ent = np.zeros(len(self.nomes), dtype=np.int64)
+        self._cont_sai = np.zeros(len(self.nomes), dtype=np.int64)
+        self.total_ids_ent = 0
+        self.total_ids_sai = 0
+
+    @property
+    def cont_ent(self):
+        return dict(zip(self.nomes, self._cont_ent.tolist()))
+
+    @property
+    def cont_sai(self):
+        return dict(zip(self.nomes, self._cont_sai.tolist()))
+
+    def estado(self):
+        """Contadores e trilhas vivas como dicionário de arrays (para checkpoint)."""
+        est = {"trilhas_" + k: v for k, v in self.trilhas.estado().items()}
+        est.update(
+            cont_ent=self._cont_ent.copy(),
+            cont_sai=self._cont_sai.copy(),
+            motor=np.array([self.frame, self._ultima_expiracao,
+                            self.total_ids_ent, self.total_ids_sai, self.atualizacoes],
+                           dtype=np.int64),
+        )
+        return est
+
+    def restaurar(self, est):
+        """Retoma a partir de `estado()`; as classes selecionadas devem ser as mesmas."""
+        if len(est["cont_ent"]) != len(self.nomes):
+            raise ValueError("Checkpoint com classes diferentes das selecionadas.")
+        self.trilhas.restaurar({k[len("trilhas_"):]: v for k, v in est.items()
+                                if k.startswith("trilhas_")})
+        self._cont_ent = np.array(est["cont_ent"], dtype=np.int64)
+        self._cont_sai = np.array(est["cont_sai"], dtype=np.int64)
+        (self.frame, self._ultima_expiracao, self.total_ids_ent, self.total_ids_sai,
+         self.atualizacoes) = (int(v) for v in est["motor"])
+
+    def classes_contadas(self, clss):
+        """Índices em `self.nomes` para cada classe (-1 se não contada)."""
+        idx = np.full(len(clss), -1, dtype=np.int64)
+        validas = (clss >= 0) & (clss < len(self._idx_classe))
+        idx[validas] = self._idx_classe[clss[validas]]
+        return idx
+
+    def _cruzamentos(self, antes, depois, bit, c0, c1, lacuna):
+        """
+        Detecta transições fora -> dentro de uma zona entre duas detecções.
+        Para trilhas com `1 < lacuna <= passo`, os centróides dos frames
+        pulados são interpolados linearmente e testados também, de modo que
+        um veículo que atravesse uma zona estreita entre duas detecções não
+        seja perdido. Retorna a máscara de transição e, para cada uma, o
+        deslocamento (em frames) a partir da detecção anterior.
+        """
+        entrou = depois & ~antes
+        desloc = lacuna.copy()
+        interp = (lacuna > 1) & (lacuna <= self.passo)
+        if not interp.any():
+            return entrou, desloc
+
+        g = lacuna[interp][:, None]
+        k = np.arange(1, self.passo)[None, :]
+        frac = np.minimum(k / g, 1.0)
+        pts = c0[interp][:, None, :] + (c1[interp] - c0[interp])[:, None, :] * frac[..., None]
+        dentro = (self.mascara.rotulos(pts.reshape(-1, 2)).reshape(frac.shape) & bit) != 0
+        # posições além da lacuna repetem o estado final
+        dentro = np.where(k < g, dentro, depois[interp][:, None])
+
+        seq = np.concatenate([antes[interp][:, None], dentro, depois[interp][:, None]], axis=1)
+        trans = seq[:, 1:] & ~seq[:, :-1]
+        houve = trans.any(axis=1)
+        entrou[interp] = houve
+        desloc[interp] = np.minimum(trans.argmax(axis=1) + 1, lacuna[interp])
+        return entrou, desloc
+
+    def atualizar(self, xyxy, ids, clss, frame=None):
+        """
+        Atualiza o estado com as detecções de um frame e retorna um `Quadro`
+        apenas com as detecções das classes contadas. `frame` é o índice do
+        frame no vídeo (por padrão, o seguinte ao da última chamada); com
+        detecção a cada `passo` frames, os frames intermediários são
+        interpolados.
+        """
+        self.frame = self.frame + 1 if frame is None else frame
+        self.atualizacoes += 1
+        if self.atualizacoes - self._ultima_expiracao >= self.intervalo_expiracao:
+            self.trilhas.expirar(self.atualizacoes)
+            self._ultima_expiracao = self.atualizacoes
+
+        idx = self.classes_contadas(clss)
+        sel = idx >= 0
+        xyxy, ids, clss, idx = xyxy[sel], ids[sel], clss[sel], idx[sel]
+
+        centros = np.empty((len(ids), 2), dtype=np.int32)
+        centros[:, 0] = (xyxy[:, 0] + xyxy[:, 2]) / 2
+        centros[:, 1] = (xyxy[:, 1] + xyxy[:, 3]) / 2
+
+        if len(ids) == 0:
+            return QUADRO_VAZIO
+
+        t = self.trilhas
+        slots, ultimo = t.slots(ids, self.frame, self.atualizacoes)
+        rot = self.mascara.rotulos(centros)
+        dentro_ent = (rot & 1) != 0
+        dentro_sai = (rot & 2) != 0
+
+        # Trilhas novas não têm posição anterior para interpolar
+        lacuna = np.where(ultimo >= 0, self.frame - ultimo, 1)
+        c0 = t.centroide[slots]
+        entrou, desl_ent = self._cruzamentos(t.na_entrada[slots], dentro_ent, 1, c0, centros, lacuna)
+        saiu, desl_sai = self._cruzamentos(t.na_saida[slots], dentro_sai, 2, c0, centros, lacuna)
+        frame_ent = self.frame - lacuna + desl_ent
+        frame_sai = self.frame - lacuna + desl_sai
+
+        novos_ent = entrou & ~t.contado_ent[slots]
+        novos_sai = saiu & ~t.contado_sai[slots]
+
+        self._cont_ent += np.bincount(idx[novos_ent], minlength=len(self.nomes))
+        self._cont_sai += np.bincount(idx[novos_sai], minlength=len(self.nomes))
+        self.total_ids_ent += int(novos_ent.sum())
+        self.total_ids_sai += int(novos_sai.sum())
+
+        t.contado_ent[slots[novos_ent]] = True
+        t.contado_sai[slots[novos_sai]] = True
+        t.na_entrada[slots] = dentro_ent
+        t.na_saida[slots] = dentro_sai
+        t.classe[slots] = clss
+        t.centroide[slots] = centros
+        t.caixa[slots] = xyxy
+
+        return Quadro(xyxy, ids, clss, centros, entrou, saiu, frame_ent, frame_sai)
+
+    def semear(self, xyxy, ids, clss, frame):
+        """
+        Registra trilhas com a posição e as zonas em que estão no `frame`,
+        sem contar nada: quem já está dentro de uma zona só é contado ao
+        entrar de novo. Usado na retomada para trilhas que o rastreador novo
+        encontrou no meio do caminho.
+        """
+        idx = self.classes_contadas(clss)
+        sel = idx >= 0
+        xyxy, ids, clss = xyxy[sel], ids[sel], clss[sel]
+        if len(ids) == 0:
+            return
+        centros = np.empty((len(ids), 2), dtype=np.int32)
+        centros[:, 0] = (xyxy[:, 0] + xyxy[:, 2]) / 2
+        centros[:, 1] = (xyxy[:, 1] + xyxy[:, 3]) / 2
+
+        t = self.trilhas
+        slots, _ = t.slots(ids, frame, self.atualizacoes)
+        rot = self.mascara.rotulos(centros)
+        t.na_entrada[slots] = (rot & 1) != 0
+        t.na_saida[slots] = (rot & 2) != 0
+        t.classe[slots] = clss
+        t.centroide[slots] = centros
+        t.caixa[slots] = xyxy
@@ -0,0 +1,249 @@
+import sys
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+import multiprocessing as mp
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# Estados de cada câmera
+PARADA = "parada"
+RODANDO = "rodando"
+CONCLUIDA = "concluída"
+REINICIANDO = "reiniciando"
+FALHOU = "falhou"
+
+
+def _trabalhador(nome, config, stop_event, fila_status):
+    """Processo de uma câmera: roda a contagem headless e informa o resultado."""
+    from contar_nVideo import contar_veiculos_nVideo
+    try:
+        relatorio = contar_veiculos_nVideo(stop_event=stop_event, **config)
+    except Exception as e:
+        logging.exception(f"Erro na câmera '{nome}'.")
+        fila_status.put((nome, "erro", str(e)))
+        sys.exit(1)
+    fila_status.put((nome, "relatorio", relatorio))
+
+
+class Orquestrador:
+    """
+    Roda várias contagens `contar_veiculos_nVideo` em paralelo, uma por
+    processo, com parada individual, reinício automático quando o processo
+    morre (até `max_reinicios`, com espera crescente) e um status agregado
+    para a interface ou para o modo headless.
+    """
+
+    def __init__(self, max_reinicios=3, espera_reinicio=2.0, intervalo=0.5):
+        self._ctx = mp.get_context("spawn")
+        self._fila = self._ctx.Queue()
+        self._cameras = {}
+        self._lock = threading.Lock()
+        self.max_reinicios = max_reinicios
+        self.espera_reinicio = espera_reinicio
+        self.intervalo = intervalo
+        self._fim = threading.Event()
+        self._supervisor = threading.Thread(target=self._supervisionar, daemon=True)
+        self._supervisor.start()
+
+    def adicionar(self, nome, video_path, areas_path, model_path, classes_selecionadas, **opcoes):
+        """Registra uma câmera; `opcoes` são repassadas a `contar_veiculos_nVideo`."""
+        config = dict(opcoes, video_path=video_path, areas_path=areas_path,
+                      model_path=model_path, classes_selecionadas=list(classes_selecionadas),
+                      camera_name=opcoes.get("camera_name") or nome)
+        with self._lock:
+            if nome in self._cameras and self._cameras[nome]["estado"] in (RODANDO, REINICIANDO):
+                raise ValueError(f"Câmera '{nome}' já está em execução.")
+            self._cameras[nome] = {
+                "config": config, "estado": PARADA, "processo": None, "stop": None,
+                "reinicios": 0, "relatorio": None, "erro": None,
+                "inicio": None, "proximo_inicio": None,
+            }
+
+    def remover(self, nome):
+        self.parar(nome)
+        with self._lock:
+            self._cameras.pop(nome, None)
+
+    def iniciar(self, nome):
+        with self._lock:
+            cam = self._cameras[nome]
+            if cam["estado"] in (RODANDO, REINICIANDO):
+                return
+            cam["reinicios"] = 0
+            cam["erro"] = None
+            self._lancar(nome, cam)
+
+    def iniciar_todas(self):
+        for nome in self.nomes():
+            self.iniciar(nome)
+
+    def _lancar(self, nome, cam, retomar=False):
+        config = cam["config"]
+        if retomar and config.get("checkpoint_s"):
+            # Reinício após queda continua do último checkpoint
+            config = dict(config, retomar=True)
+        cam["stop"] = self._ctx.Event()
+        cam["processo"] = self._ctx.Process(
+            target=_trabalhador, name=f"camera-{nome}",
+            args=(nome, config, cam["stop"], self._fila), daemon=True
+        )
+        cam["processo"].start()
+        cam["estado"] = RODANDO
+        cam["inicio"] = time.time()
+        cam["proximo_inicio"] = None
+        logging.info(f"Câmera '{nome}' iniciada (pid {cam['processo'].pid}).")
+
+    def parar(self, nome, timeout=10.0):
+        """Pede a parada da câmera; o processo grava o relatório parcial e sai."""
+        with self._lock:
+            cam = self._cameras.get(nome)
+            if cam is None:
+                return
+            cam["proximo_inicio"] = None
+            if cam["estado"] == REINICIANDO:
+                cam["estado"] = PARADA
+            proc, stop = cam["processo"], cam["stop"]
+        if proc is None or not proc.is_alive():
+            return
+        stop.set()
+        proc.join(timeout)
+        if proc.is_alive():
+            logging.warning(f"Câmera '{nome}' não parou a tempo; encerrando processo.")
+            proc.terminate()
+            proc.join()
+        self._atualizar()
+
+    def parar_todas(self, timeout=10.0):
+        for nome in self.nomes():
+            with self._lock:
+                stop = self._cameras[nome]["stop"]
+            if stop is not None:
+                stop.set()
+        for nome in self.nomes():
+            self.parar(nome, timeout)
+
+    def encerrar(self):
+        self.parar_todas()
+        self._fim.set()
+        self._supervisor.join(timeout=2.0)
+
+    def nomes(self):
+        with self._lock:
+            return list(self._cameras)
+
+    def status(self):
+        """Cópia do estado de cada câmera: estado, pid, reinícios, relatório, erro, duração."""
+        self._atualizar()
+        agora = time.time()
+        with self._lock:
+            return {
+                nome: {
+                    "estado": cam["estado"],
+                    "pid": cam["processo"].pid if cam["processo"] is not None else None,
+                    "reinicios": cam["reinicios"],
+                    "relatorio": cam["relatorio"],
+                    "erro": cam["erro"],
+                    "duracao": agora - cam["inicio"] if cam["inicio"] else 0.0,
+                    "video_path": cam["config"]["video_path"],
+                }
+                for nome, cam in self._cameras.items()
+            }
+
+    def ativas(self):
+        return sum(1 for s in self.status().values() if s["estado"] in (RODANDO, REINICIANDO))
+
+    def aguardar(self):
+        while self.ativas():
+            time.sleep(self.intervalo)
+
+    def _atualizar(self):
+        # Mensagens enviadas pelos processos
+        while True:
+            try:
+                nome, tipo, valor = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                cam = self._cameras.get(nome)
+                if cam is None:
+                    continue
+                if tipo == "relatorio":
+                    cam["relatorio"] = valor
+                else:
+                    cam["erro"] = valor
+
+        with self._lock:
+            agora = time.time()
+            for nome, cam in self._cameras.items():
+                proc = cam["processo"]
+                if cam["estado"] == RODANDO and proc is not None and not proc.is_alive():
+                    proc.join()
+                    if proc.exitcode == 0 or cam["stop"].is_set():
+                        cam["estado"] = PARADA if cam["stop"].is_set() else CONCLUIDA
+                        logging.info(f"Câmera '{nome}' finalizada ({cam['estado']}).")
+                    elif cam["reinicios"] < self.max_reinicios:
+                        espera = self.espera_reinicio * 2 ** cam["reinicios"]
+                        cam["reinicios"] += 1
+                        cam["estado"] = REINICIANDO
+                        cam["proximo_inicio"] = agora + espera
+                        logging.warning(f"Câmera '{nome}' caiu (código {proc.exitcode}); "
+                                        f"reinício {cam['reinicios']}/{self.max_reinicios} em {espera:.0f}s.")
+                    else:
+                        cam["estado"] = FALHOU
+                        logging.error(f"Câmera '{nome}' falhou {cam['reinicios'] + 1} vezes; desistindo.")
+                elif cam["estado"] == REINICIANDO and cam["proximo_inicio"] and agora >= cam["proximo_inicio"]:
+                    self._lancar(nome, cam, retomar=True)
+
+    def _supervisionar(self):
+        while not self._fim.wait(self.intervalo):
+            try:
+                self._atualizar()
+            except Exception:
+                logging.exception("Erro no supervisor de câmeras.")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Roda várias câmeras em processos separados, com reinício automático.")
+    ap.add_argument("cameras", help="JSON com a lista de câmeras (video_path, areas_path, classes, camera_name)")
+    ap.add_argument("modelo", help="caminho do modelo YOLO (.pt)")
+    ap.add_argument("--max-reinicios", type=int, default=3)
+    ap.add_argument("--intervalo-status", type=float, default=30.0,
+                    help="segundos entre os resumos de status no log")
+    args = ap.parse_args(argv)
+    with open(args.cameras, "r", encoding="utf-8") as f:
+        cameras = json.load(f)
+
+    orq = Orquestrador(max_reinicios=args.max_reinicios)
+    for i, cam in enumerate(cameras):
+        cam = dict(cam)
+        nome = cam.pop("camera_name", None) or f"camera_{i + 1}"
+        orq.adicionar(nome, cam.pop("video_path"), cam.pop("areas_path"), args.modelo,
+                      cam.pop("classes"), **cam)
+    orq.iniciar_todas()
+
+    try:
+        ultimo = time.time()
+        while orq.ativas():
+            time.sleep(1.0)
+            if time.time() - ultimo >= args.intervalo_status:
+                ultimo = time.time()
+                for nome, st in orq.status().items():
+                    logging.info(f"[{nome}] {st['estado']} ({st['duracao']:.0f}s, reinícios: {st['reinicios']})")
+    except KeyboardInterrupt:
+        logging.info("Interrompido; parando câmeras...")
+    finally:
+        orq.encerrar()
+
+    falhas = 0
+    for nome, st in orq.status().items():
+        logging.info(f"[{nome}] {st['estado']}: {st['relatorio'] or st['erro'] or '-'}")
+        falhas += st["estado"] == FALHOU
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Perfil de tempo por etapa do pipeline de frames. Uso típico no laço:
+
+    perfil = PerfilEtapas("camera 1") if medir else None
+    ...
+    if perfil:
+        t0 = perfil.agora()
+    deteccoes = inferir(...)
+    if perfil:
+        perfil.registrar("inferencia", perfil.agora() - t0)
+
+Com o perfil desligado (`None`), o custo é só o teste `if perfil`. Os
+perfis ativos ficam em um registro do processo (`perfis_ativos`), para que
+outros componentes (métricas, painel) leiam os números sem acoplamento.
+"""
+import time
+import logging
+import threading
+
+import numpy as np
+
+ETAPAS = ("decodificacao", "redimensionamento", "inferencia", "rastreamento",
+          "contagem", "renderizacao", "io")
+
+_PERFIS = {}
+_perfis_lock = threading.Lock()
+
+
+def perfis_ativos():
+    """Cópia do registro `nome -> PerfilEtapas` dos perfis ativos no processo."""
+    with _perfis_lock:
+        return dict(_PERFIS)
+
+
+class PerfilEtapas:
+    """
+    Guarda as últimas `janela` durações de cada etapa em buffers circulares
+    e os instantes dos últimos frames, de onde saem p50/p95/p99 e o FPS
+    recentes. Cada etapa deve ser registrada por uma única thread (por
+    exemplo, decodificação na thread de leitura e o resto no laço); a
+    leitura das estatísticas pode vir de qualquer thread.
+    """
+
+    agora = staticmethod(time.perf_counter)
+
+    def __init__(self, nome, janela=1024, intervalo_log=60.0):
+        self.nome = nome
+        self.janela = janela
+        self.intervalo_log = intervalo_log
+        self.frames = 0
+        self._duracoes = {e: np.zeros(janela) for e in ETAPAS}
+        self._n = dict.fromkeys(ETAPAS, 0)
+        self._total = dict.fromkeys(ETAPAS, 0.0)
+        self._instantes = np.zeros(janela)
+        self._proximo_log = time.monotonic() + intervalo_log if intervalo_log else None
+        with _perfis_lock:
+            _PERFIS[nome] = self
+
+    def registrar(self, etapa, segundos):
+        n = self._n[etapa]
+        self._duracoes[etapa][n % self.janela] = segundos
+        self._n[etapa] = n + 1
+        self._total[etapa] += segundos
+
+    def contar_frame(self):
+        """Marca um frame concluído; loga o resumo quando dá o intervalo."""
+        self._instantes[self.frames % self.janela] = time.monotonic()
+        self.frames += 1
+        if self._proximo_log is not None and time.monotonic() >= self._proximo_log:
+            self._proximo_log = time.monotonic() + self.intervalo_log
+            logging.info(f"Perfil de '{self.nome}':\n{self.texto()}")
+
+    def fps(self):
+        """FPS nos últimos `janela` frames."""
+        n = min(self.frames, self.janela)
+        if n < 2:
+            return 0.0
+        t = self._instantes[:n] if self.frames <= self.janela else self._instantes
+        dt = t.max() - t.min()
+        return (n - 1) / dt if dt > 0 else 0.0
+
+    def estatisticas(self):
+        """
+        `{etapa: {"n", "media_ms", "p50_ms", "p95_ms", "p99_ms"}}` das etapas
+        já medidas (média desde o início; percentis na janela recente).
+        """
+        est = {}
+        for etapa in ETAPAS:
+            n = self._n[etapa]
+            if n == 0:
+                continue
+            recentes = self._duracoes[etapa][:min(n, self.janela)] * 1000.0
+            p50, p95, p99 = np.percentile(recentes, [50, 95, 99])
+            est[etapa] = {"n": n, "media_ms": self._total[etapa] / n * 1000.0,
+                          "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+        return est
+
+    def texto(self):
+        linhas = [f"  {'etapa':<18}{'n':>8}{'média':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)"]
+        for etapa, e in self.estatisticas().items():
+            linhas.append(f"  {etapa:<18}{e['n']:>8}{e['media_ms']:>9.2f}{e['p50_ms']:>9.2f}"
+                          f"{e['p95_ms']:>9.2f}{e['p99_ms']:>9.2f}")
+        linhas.append(f"  {self.frames} frames, {self.fps():.1f} FPS recentes")
+        return "\n".join(linhas)
+
+    def encerrar(self):
+        """Tira o perfil do registro de perfis ativos."""
+        with _perfis_lock:
+            if _PERFIS.get(self.nome) is self:
+                del _PERFIS[self.nome]
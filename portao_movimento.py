@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+
+class PortaoMovimento:
+    """
+    Filtro barato de movimento para pular o detector em frames parados.
+    Compara cada frame (reduzido e em tons de cinza) com o anterior, apenas
+    dentro das zonas de contagem, e só libera a detecção quando a fração de
+    pixels alterados passa de `min_fracao`.
+
+    Nos frames pulados o rastreador não é chamado, então o estado dele fica
+    congelado e é retomado normalmente no próximo frame com movimento. Para
+    não perder objetos muito lentos, a detecção é forçada depois de
+    `max_pulos` frames seguidos sem rodar.
+    """
+
+    def __init__(self, mascara, escala=0.25, limiar=25, min_fracao=0.002, max_pulos=30):
+        w, h = mascara.tamanho
+        self.tamanho = (max(int(w * escala), 1), max(int(h * escala), 1))
+        regiao = cv2.resize((mascara.mascara != 0).astype(np.uint8), self.tamanho,
+                            interpolation=cv2.INTER_NEAREST).astype(bool)
+        if not regiao.any():
+            regiao[:] = True
+        self.regiao = regiao
+        self._n_pixels = int(regiao.sum())
+        self.limiar = limiar
+        self.min_fracao = min_fracao
+        self.max_pulos = max_pulos
+
+        self._anterior = None
+        self._pulos_seguidos = 0
+        self.frames = 0
+        self.pulados = 0
+
+    @property
+    def proporcao_pulos(self):
+        return self.pulados / self.frames if self.frames else 0.0
+
+    def deve_detectar(self, frame):
+        """Retorna True se o detector deve rodar neste frame."""
+        self.frames += 1
+        cinza = cv2.cvtColor(cv2.resize(frame, self.tamanho, interpolation=cv2.INTER_AREA),
+                             cv2.COLOR_BGR2GRAY)
+        cinza = cv2.GaussianBlur(cinza, (5, 5), 0)
+        anterior, self._anterior = self._anterior, cinza
+
+        if anterior is None or self._pulos_seguidos >= self.max_pulos:
+            self._pulos_seguidos = 0
+            return True
+
+        mudou = (cv2.absdiff(cinza, anterior) > self.limiar) & self.regiao
+        if mudou.sum() >= self.min_fracao * self._n_pixels:
+            self._pulos_seguidos = 0
+            return True
+
+        self._pulos_seguidos += 1
+        self.pulados += 1
+        return False
+
+    def resumo(self):
+        return (f"Frames sem movimento (detector pulado): {self.pulados}/{self.frames} "
+                f"({self.proporcao_pulos:.1%})")
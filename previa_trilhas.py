@@ -0,0 +1,187 @@
+import os
+import glob
+import json
+
+import cv2
+import numpy as np
+
+from cache_trilhas import EXT_META, abrir_trilhas
+
+
+def encontrar_trilhas(video_path, pasta="resultados"):
+    """Cache de trilhas mais recente gravado para `video_path`, ou None."""
+    alvo = os.path.abspath(video_path) if os.path.exists(video_path) else video_path
+    candidatos = []
+    for meta_path in glob.glob(os.path.join(pasta, "*" + EXT_META)):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                origem = json.load(f).get("video_path", "")
+        except (OSError, ValueError):
+            continue
+        if os.path.exists(origem):
+            origem = os.path.abspath(origem)
+        if origem == alvo:
+            candidatos.append(meta_path)
+    if not candidatos:
+        return None
+    return max(candidatos, key=os.path.getmtime)
+
+
+def _simples(poligono):
+    """True se nenhuma aresta do polígono cruza outra não adjacente."""
+    p = np.asarray(poligono, dtype=np.float64)
+    n = len(p)
+    a, b = p, np.roll(p, -1, axis=0)
+
+    def lado(o, u, v):
+        return np.sign((u[..., 0] - o[..., 0]) * (v[..., 1] - o[..., 1])
+                       - (u[..., 1] - o[..., 1]) * (v[..., 0] - o[..., 0]))
+
+    i, j = np.triu_indices(n, k=2)
+    nao_adj = (j - i) % n != n - 1
+    i, j = i[nao_adj], j[nao_adj]
+    cruza = ((lado(a[i], b[i], a[j]) * lado(a[i], b[i], b[j]) < 0)
+             & (lado(a[j], b[j], a[i]) * lado(a[j], b[j], b[i]) < 0))
+    return not cruza.any()
+
+
+class IndiceGrade:
+    """
+    Índice espacial em grade uniforme: os pontos ficam ordenados pela célula
+    e cada consulta por retângulo só visita as células que ele cobre.
+    """
+
+    def __init__(self, pontos, tamanho, celula=32):
+        self.celula = celula
+        w, h = tamanho
+        self.nx = -(-w // celula)
+        self.ny = -(-h // celula)
+        cx = np.clip(pontos[:, 0] // celula, 0, self.nx - 1)
+        cy = np.clip(pontos[:, 1] // celula, 0, self.ny - 1)
+        cel = cy * self.nx + cx
+        self.ordem = np.argsort(cel, kind="stable")
+        self.inicio = np.searchsorted(cel[self.ordem], np.arange(self.nx * self.ny + 1))
+
+    def consultar(self, x0, y0, x1, y1):
+        """Índices dos pontos nas células que cobrem o retângulo (inclusivo)."""
+        c = self.celula
+        cx0, cx1 = max(int(x0) // c, 0), min(int(x1) // c, self.nx - 1)
+        cy0, cy1 = max(int(y0) // c, 0), min(int(y1) // c, self.ny - 1)
+        if cx0 > cx1 or cy0 > cy1:
+            return np.empty(0, dtype=np.int64)
+        partes = []
+        for cy in range(cy0, cy1 + 1):
+            a = self.inicio[cy * self.nx + cx0]
+            b = self.inicio[cy * self.nx + cx1 + 1]
+            if b > a:
+                partes.append(self.ordem[a:b])
+        return np.concatenate(partes) if partes else np.empty(0, dtype=np.int64)
+
+
+class PreviaTrilhas:
+    """
+    Prévia das contagens a partir de um cache de trilhas, para o editor de
+    áreas. Uma trilha conta na zona se algum dos seus pontos cai dentro
+    dela (mesma regra do `MotorContagem` sem interpolação). Quando uma área
+    muda, só os pontos do retângulo afetado são testados de novo.
+    """
+
+    def __init__(self, caminho_trilhas, tamanho_janela, n_zonas=2):
+        registros, meta = abrir_trilhas(caminho_trilhas)
+        self.meta = meta
+        self.tamanho = tuple(tamanho_janela)
+        sw, sh = meta["tamanho_saida"]
+        fx, fy = self.tamanho[0] / sw, self.tamanho[1] / sh
+
+        xyxy = np.asarray(registros["xyxy"], dtype=np.float32)
+        self.pontos = np.empty((len(xyxy), 2), dtype=np.int32)
+        self.pontos[:, 0] = (xyxy[:, 0] + xyxy[:, 2]) / 2 * fx
+        self.pontos[:, 1] = (xyxy[:, 1] + xyxy[:, 3]) / 2 * fy
+        self.ids, self.trilha = np.unique(np.asarray(registros["id"]), return_inverse=True)
+        self.trilha = self.trilha.reshape(-1)
+        self.frames = np.asarray(registros["frame"])
+        self.indice = IndiceGrade(self.pontos, self.tamanho)
+
+        n_trilhas = len(self.ids)
+        self.dentro = [np.zeros(len(self.pontos), dtype=bool) for _ in range(n_zonas)]
+        self.n_dentro = [np.zeros(n_trilhas, dtype=np.int64) for _ in range(n_zonas)]
+        self.contagens = [0] * n_zonas
+        self._zonas = [[] for _ in range(n_zonas)]
+
+    @property
+    def n_trilhas(self):
+        return len(self.ids)
+
+    def desenhar(self, frame, cor=(200, 200, 200)):
+        """Desenha as trilhas (uma polilinha por ID) sobre `frame`."""
+        ordem = np.lexsort((self.frames, self.trilha))
+        pts, trilha = self.pontos[ordem], self.trilha[ordem]
+        cortes = np.flatnonzero(np.diff(trilha)) + 1
+        linhas = [p.reshape(-1, 1, 2) for p in np.split(pts, cortes) if len(p) > 1]
+        cv2.polylines(frame, linhas, False, cor, 1, cv2.LINE_AA)
+        return frame
+
+    def _retangulo_alterado(self, antiga, nova):
+        """Retângulo que contém toda a região alterada entre dois polígonos."""
+        # Com auto-interseção o preenchimento pode mudar longe do vértice
+        # movido, então só polígonos simples usam o retângulo local
+        if len(antiga) == len(nova) and len(nova) >= 3 and _simples(antiga) and _simples(nova):
+            a, b = np.asarray(antiga), np.asarray(nova)
+            mudou = np.flatnonzero((a != b).any(axis=1))
+            if len(mudou) == 0:
+                return None
+            n = len(a)
+            vizinhos = np.unique(np.concatenate([mudou - 1, mudou, mudou + 1]) % n)
+            pts = np.concatenate([a[vizinhos], b[mudou]])
+        else:
+            pts = [p for p in (antiga, nova) if len(p)]
+            if not pts:
+                return None
+            pts = np.concatenate([np.asarray(p) for p in pts])
+        x0, y0 = pts.min(axis=0)
+        x1, y1 = pts.max(axis=0)
+        return int(x0), int(y0), int(x1), int(y1)
+
+    def atualizar_zona(self, z, poligono):
+        """Atualiza a contagem da zona `z` após uma mudança no polígono."""
+        poligono = [list(p) for p in poligono]
+        ret = self._retangulo_alterado(self._zonas[z], poligono)
+        self._zonas[z] = poligono
+        if ret is None:
+            return self.contagens[z]
+
+        # Só os pontos dentro do retângulo alterado podem mudar de estado
+        x0, y0, x1, y1 = ret
+        idx = self.indice.consultar(*ret)
+        px = self.pontos[idx, 0] - x0
+        py = self.pontos[idx, 1] - y0
+        ok = (px >= 0) & (px <= x1 - x0) & (py >= 0) & (py <= y1 - y0)
+        idx, px, py = idx[ok], px[ok], py[ok]
+        if len(idx) == 0:
+            return self.contagens[z]
+
+        novo = np.zeros(len(idx), dtype=bool)
+        if len(poligono) >= 3:
+            local = np.zeros((y1 - y0 + 1, x1 - x0 + 1), dtype=np.uint8)
+            cv2.fillPoly(local, [np.array(poligono, dtype=np.int32) - (x0, y0)], 1)
+            novo = local[py, px] == 1
+
+        antigo = self.dentro[z][idx]
+        delta = novo.astype(np.int64) - antigo
+        muda = delta != 0
+        if muda.any():
+            trilhas = self.trilha[idx[muda]]
+            afetadas = np.unique(trilhas)
+            antes = self.n_dentro[z][afetadas] > 0
+            np.add.at(self.n_dentro[z], trilhas, delta[muda])
+            depois = self.n_dentro[z][afetadas] > 0
+            self.contagens[z] += int(depois.sum()) - int(antes.sum())
+            self.dentro[z][idx] = novo
+        return self.contagens[z]
+
+    def sincronizar(self, areas):
+        """Atualiza todas as zonas a partir das áreas do editor."""
+        for z, area in enumerate(areas[:len(self._zonas)]):
+            if area != self._zonas[z]:
+                self.atualizar_zona(z, area)
+        return self.contagens
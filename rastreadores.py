@@ -0,0 +1,143 @@
+import numpy as np
+
+# Nome exibido -> configuração do ultralytics (str) ou classe do rastreador próprio
+RASTREADORES = {
+    "botsort": "botsort.yaml",
+    "bytetrack": "bytetrack.yaml",
+    "iou": "RastreadorIoU",
+}
+
+
+def criar_rastreador(nome="botsort"):
+    """
+    Rastreador para `deteccao.inferir`: o nome do YAML do ultralytics (que
+    roda dentro de `modelo.track`) ou uma instância nova de `RastreadorIoU`.
+    """
+    if nome not in RASTREADORES:
+        raise ValueError(f"Rastreador desconhecido '{nome}' (use {list(RASTREADORES)}).")
+    if nome == "iou":
+        return RastreadorIoU()
+    return RASTREADORES[nome]
+
+
+def iou_matriz(a, b):
+    """IoU entre todas as caixas de `a` (N, 4) e `b` (M, 4)."""
+    x0 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y0 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x1 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y1 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def associar(iou, iou_min):
+    """
+    Associação gulosa um para um pelos maiores IoU (>= `iou_min`).
+    Retorna os índices `(linhas, colunas)` dos pares aceitos.
+    """
+    linhas, colunas = np.nonzero(iou >= iou_min)
+    if len(linhas) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    ordem = np.argsort(-iou[linhas, colunas], kind="stable")
+    usadas_l, usadas_c = set(), set()
+    sel_l, sel_c = [], []
+    for i, j in zip(linhas[ordem].tolist(), colunas[ordem].tolist()):
+        if i in usadas_l or j in usadas_c:
+            continue
+        usadas_l.add(i)
+        usadas_c.add(j)
+        sel_l.append(i)
+        sel_c.append(j)
+    return np.array(sel_l, dtype=np.int64), np.array(sel_c, dtype=np.int64)
+
+
+class RastreadorIoU:
+    """
+    Rastreador leve por IoU no estilo ByteTrack, todo em NumPy: sem
+    compensação de movimento da câmera nem ReID, pensado para câmeras fixas.
+
+    A cada frame, as trilhas (com posição prevista por velocidade constante)
+    são associadas primeiro às detecções de confiança alta e depois, as que
+    sobraram e estavam ativas no frame anterior, às de confiança baixa.
+    Detecções altas sem trilha abrem trilhas novas; trilhas sem detecção por
+    mais de `buffer` frames são descartadas.
+    """
+
+    def __init__(self, conf_alta=0.5, conf_baixa=0.1, conf_nova=0.6,
+                 iou_min=0.3, iou_min_baixa=0.5, buffer=30):
+        self.conf_alta = conf_alta
+        self.conf_baixa = conf_baixa
+        self.conf_nova = conf_nova
+        self.iou_min = iou_min
+        self.iou_min_baixa = iou_min_baixa
+        self.buffer = buffer
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._xyxy = np.empty((0, 4), dtype=np.float32)
+        self._vel = np.empty((0, 4), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._perdido = np.empty(0, dtype=np.int64)
+        self._proximo_id = 1
+
+    @property
+    def ativas(self):
+        return len(self._ids)
+
+    def atualizar(self, xyxy, conf, clss):
+        """
+        Recebe as detecções do frame `(xyxy, confiança, classe)` e retorna
+        `(xyxy, ids, classes)` das detecções associadas a uma trilha.
+        """
+        xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        clss = np.asarray(clss, dtype=np.int64).reshape(-1)
+
+        det_ids = np.full(len(xyxy), -1, dtype=np.int64)
+        casadas = np.zeros(len(self._ids), dtype=bool)
+        previsto = self._xyxy + self._vel * (self._perdido + 1)[:, None]
+
+        # 1ª etapa: todas as trilhas contra as detecções de confiança alta
+        alta = np.flatnonzero(conf >= self.conf_alta)
+        if len(self._ids) and len(alta):
+            t, d = associar(iou_matriz(previsto, xyxy[alta]), self.iou_min)
+            self._casar(t, alta[d], xyxy, det_ids)
+            casadas[t] = True
+
+        # 2ª etapa: trilhas ativas no frame anterior contra as de confiança baixa
+        baixa = np.flatnonzero((conf >= self.conf_baixa) & (conf < self.conf_alta))
+        restantes = np.flatnonzero(~casadas & (self._perdido == 0))
+        if len(restantes) and len(baixa):
+            t, d = associar(iou_matriz(previsto[restantes], xyxy[baixa]), self.iou_min_baixa)
+            self._casar(restantes[t], baixa[d], xyxy, det_ids)
+            casadas[restantes[t]] = True
+
+        # Trilhas sem detecção envelhecem e saem após `buffer` frames
+        self._perdido[~casadas] += 1
+        manter = self._perdido <= self.buffer
+        self._xyxy, self._vel = self._xyxy[manter], self._vel[manter]
+        self._ids, self._perdido = self._ids[manter], self._perdido[manter]
+
+        # Detecções altas sem trilha abrem trilhas novas
+        novas = alta[(det_ids[alta] < 0) & (conf[alta] >= self.conf_nova)]
+        if len(novas):
+            ids_novos = np.arange(self._proximo_id, self._proximo_id + len(novas), dtype=np.int64)
+            self._proximo_id += len(novas)
+            det_ids[novas] = ids_novos
+            self._xyxy = np.concatenate([self._xyxy, xyxy[novas]])
+            self._vel = np.concatenate([self._vel, np.zeros((len(novas), 4), dtype=np.float32)])
+            self._ids = np.concatenate([self._ids, ids_novos])
+            self._perdido = np.concatenate([self._perdido, np.zeros(len(novas), dtype=np.int64)])
+
+        sel = det_ids >= 0
+        return xyxy[sel], det_ids[sel], clss[sel]
+
+    def _casar(self, t, d, xyxy, det_ids):
+        # Velocidade suavizada por frame desde a última detecção
+        nova_vel = (xyxy[d] - self._xyxy[t]) / (self._perdido[t] + 1)[:, None]
+        self._vel[t] = 0.5 * self._vel[t] + 0.5 * nova_vel
+        self._xyxy[t] = xyxy[d]
+        self._perdido[t] = 0
+        det_ids[d] = self._ids[t]
@@ -0,0 +1,144 @@
+import os
+import sys
+import sqlite3
+import logging
+import argparse
+import datetime
+
+import numpy as np
+
+from cache_trilhas import abrir_trilhas
+from motor_contagem import MotorContagem
+from zonas import obter_mascara
+
+DB_PATH = os.path.join("resultados", "relatorios.db")
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+TODAS_AS_CLASSES = {0:"Pessoa",1:"Bicicleta",2:"Carro",
+                    3:"Moto",5:"Onibus",7:"Caminhao"}
+
+
+def init_db():
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS relatorios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            report_path TEXT NOT NULL,
+            video_source TEXT NOT NULL,
+            model_used TEXT NOT NULL
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+def log_report(timestamp, report_path, video_source, model_used):
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('''
+        INSERT INTO relatorios (timestamp, report_path, video_source, model_used)
+        VALUES (?, ?, ?, ?)
+    ''', (timestamp, report_path, video_source, model_used))
+    conn.commit()
+    conn.close()
+
+
+def reproduzir(registros, meta, areas_path, classes_selecionadas=None):
+    """
+    Passa os registros gravados pelo `MotorContagem` com as áreas de
+    `areas_path`, sem carregar o modelo. Retorna o motor com as contagens.
+    """
+    if classes_selecionadas is None:
+        classes_selecionadas = meta["classes"]
+    mascara = obter_mascara(areas_path, meta["dims_origem"], meta["tamanho_saida"])
+    motor = MotorContagem(mascara, classes_selecionadas, TODAS_AS_CLASSES,
+                          passo=meta.get("passo", 1))
+    if len(registros) == 0:
+        return motor
+
+    frames = np.asarray(registros["frame"])
+    xyxy = np.asarray(registros["xyxy"])
+    ids = np.asarray(registros["id"])
+    clss = np.asarray(registros["classe"]).astype(np.int64)
+
+    # Registros estão em ordem de frame: fatia cada frame pelos limites
+    limites = np.flatnonzero(np.diff(frames)) + 1
+    inicios = np.concatenate([[0], limites])
+    fins = np.concatenate([limites, [len(frames)]])
+    for a, b in zip(inicios.tolist(), fins.tolist()):
+        motor.atualizar(xyxy[a:b], ids[a:b], clss[a:b], frame=int(frames[a]))
+    return motor
+
+
+def recontar(caminho_trilhas, areas_path, classes_selecionadas=None, camera_name=None):
+    """
+    Reconta um vídeo já processado a partir do cache de trilhas gravado ao
+    lado do relatório original, usando um novo arquivo de áreas. Grava um
+    novo relatório e retorna o caminho dele.
+    """
+    init_db()
+    inicio = datetime.datetime.now()
+    try:
+        registros, meta = abrir_trilhas(caminho_trilhas)
+    except Exception as e:
+        raise ValueError(f"Erro ao abrir trilhas '{caminho_trilhas}': {e}")
+
+    logging.info(f"Recontando {len(registros)} detecções de '{meta['video_path']}'.")
+    motor = reproduzir(registros, meta, areas_path, classes_selecionadas)
+    nomes_sel = motor.nomes
+    cont_ent, cont_sai = motor.cont_ent, motor.cont_sai
+    duracao = datetime.datetime.now() - inicio
+
+    ts_str = inicio.strftime("%Y%m%d_%H%M%S")
+    camera_name = camera_name or meta.get("camera_name")
+    cam_str = camera_name.strip().replace(" ", "_") if camera_name else ""
+    nome_rel = f"relatorio_{ts_str}"
+    if cam_str:
+        nome_rel += f"_{cam_str}"
+    nome_rel += "_recontagem.txt"
+    caminho_relatorio = os.path.join("resultados", nome_rel)
+
+    with open(caminho_relatorio, "w", encoding="utf-8") as f:
+        f.write("RELATÓRIO DE CONTAGEM DE VEÍCULOS (Recontagem)\n")
+        if camera_name:
+            f.write(f"CÂMERA: {camera_name}\n")
+        f.write(f"Vídeo:   {meta['video_path']}\n")
+        f.write(f"Trilhas: {caminho_trilhas}\n")
+        f.write(f"Áreas:   {areas_path}\n")
+        f.write(f"Contagem original: {meta.get('inicio', '?')}\n")
+        f.write(f"Recontado em {duracao.total_seconds():.1f}s\n")
+        f.write("="*40 + "\n")
+        f.write("ENTRADAS:\n")
+        for nome in nomes_sel:
+            f.write(f"  {nome}: {cont_ent[nome]}\n")
+        f.write(f"  Total IDs entrada: {motor.total_ids_ent}\n\n")
+        f.write("SAÍDAS:\n")
+        for nome in nomes_sel:
+            f.write(f"  {nome}: {cont_sai[nome]}\n")
+        f.write(f"  Total IDs saída: {motor.total_ids_sai}\n")
+
+    now_iso = datetime.datetime.now().isoformat(sep=' ', timespec='seconds')
+    log_report(now_iso, caminho_relatorio, meta["video_path"],
+               f"recontagem ({meta.get('modelo', '?')})")
+    logging.info(f"Relatório salvo em '{caminho_relatorio}' ({duracao.total_seconds():.1f}s)")
+    return caminho_relatorio
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        description="Reconta um vídeo a partir do cache de trilhas, com novas áreas, sem rodar o modelo."
+    )
+    ap.add_argument("trilhas", help="arquivo .trilhas.bin/.trilhas.json ou o relatório original")
+    ap.add_argument("areas", help="JSON com as novas áreas de entrada e saída")
+    ap.add_argument("--classes", type=int, nargs="+", default=None,
+                    help="IDs de classe a contar (padrão: as da contagem original)")
+    ap.add_argument("--camera", default=None, help="nome da câmera no relatório")
+    args = ap.parse_args(argv)
+    recontar(args.trilhas, args.areas, args.classes, args.camera)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
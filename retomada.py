@@ -0,0 +1,91 @@
+import logging
+
+import numpy as np
+
+from rastreadores import associar, iou_matriz
+
+
+class AquecimentoRetomada:
+    """
+    Reata as trilhas restauradas de um checkpoint ao rastreador novo. Na
+    retomada, o rastreador recomeça do zero com outra numeração; sem
+    reassociação, cada veículo que estava dentro de uma zona no checkpoint
+    viraria uma trilha nova, fora de todas as zonas, e seria contado de novo.
+
+    A leitura volta alguns frames antes do checkpoint, e as detecções desses
+    frames (já contados) passam pelo rastreador e são guardadas por
+    `observar`, sem contagem. Em `concluir`, cada trilha restaurada vista
+    nessa janela é associada por IoU, um para um, à trilha nova com a caixa
+    mais parecida no mesmo frame, como na costura dos segmentos de
+    `contar_paralelo`. As trilhas novas que sobram são semeadas no motor com
+    a posição e as zonas da última detecção, sem contar. Depois, `traduzir`
+    troca os IDs do rastreador novo pelos restaurados; os demais ficam acima
+    de `deslocamento_ids`.
+    """
+
+    def __init__(self, motor, inicio_frame, deslocamento_ids, iou_min=0.5):
+        self.motor = motor
+        self.inicio_frame = inicio_frame
+        self.deslocamento_ids = deslocamento_ids
+        self.iou_min = iou_min
+        self.concluida = False
+        self.reatadas = 0
+        self.semeadas = 0
+        self._quadros = []
+        self._de = np.empty(0, dtype=np.int64)
+        self._para = np.empty(0, dtype=np.int64)
+
+    def observar(self, frame, xyxy, ids, clss):
+        """Guarda as detecções de um frame de aquecimento (IDs do rastreador novo)."""
+        self._quadros.append((frame, xyxy, ids, clss))
+
+    def concluir(self):
+        """Associa as trilhas novas às restauradas e semeia as que sobraram."""
+        self.concluida = True
+        quadros, self._quadros = self._quadros, []
+        t = self.motor.trilhas
+        ids_vivos, slots = t.ids_vivos()
+        ultimo = t.ultimo_frame[slots]
+
+        # Cada trilha restaurada é comparada no frame em que foi vista pela última vez
+        mapa = {}
+        for frame, xyxy, ids, _ in quadros:
+            vistas = ultimo == frame
+            if not vistas.any() or len(ids) == 0:
+                continue
+            linhas, colunas = associar(iou_matriz(t.caixa[slots[vistas]], xyxy), self.iou_min)
+            for antigo, novo in zip(ids_vivos[vistas][linhas].tolist(), ids[colunas].tolist()):
+                mapa.setdefault(novo, antigo)
+        if mapa:
+            de = np.fromiter(mapa.keys(), dtype=np.int64)
+            para = np.fromiter(mapa.values(), dtype=np.int64)
+            ordem = np.argsort(de)
+            self._de, self._para = de[ordem], para[ordem]
+        self.reatadas = len(mapa)
+
+        # Última detecção de cada trilha nova sem par, semeada em ordem de frame
+        ultimas = {}
+        for frame, xyxy, ids, clss in quadros:
+            for i, tid in enumerate(ids.tolist()):
+                if tid not in mapa:
+                    ultimas[tid] = (frame, xyxy[i], clss[i])
+        por_frame = {}
+        for tid, (frame, caixa, classe) in ultimas.items():
+            por_frame.setdefault(frame, []).append((tid, caixa, classe))
+        for frame in sorted(por_frame):
+            tids, caixas, classes = zip(*por_frame[frame])
+            self.motor.semear(np.array(caixas, dtype=np.float32).reshape(-1, 4),
+                              np.array(tids, dtype=np.int64) + self.deslocamento_ids,
+                              np.array(classes, dtype=np.int64), frame)
+        self.semeadas = len(ultimas)
+        logging.info(f"Retomada: {self.reatadas} trilha(s) restaurada(s) reatada(s) ao "
+                     f"rastreador, {self.semeadas} trilha(s) nova(s) semeada(s).")
+
+    def traduzir(self, xyxy, ids, clss):
+        """IDs do rastreador novo -> IDs do motor (restaurados ou deslocados)."""
+        saida = ids + self.deslocamento_ids
+        if len(self._de) and len(ids):
+            pos = np.clip(np.searchsorted(self._de, ids), 0, len(self._de) - 1)
+            achou = self._de[pos] == ids
+            saida[achou] = self._para[pos[achou]]
+        return xyxy, saida, clss
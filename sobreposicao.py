@@ -0,0 +1,169 @@
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class CamadaZonas:
+    """
+    Sobreposição das zonas pré-renderizada uma única vez: para cada zona
+    guarda o retângulo que a envolve, a máscara do preenchimento e a do
+    contorno. `aplicar` mistura a cor só dentro desses retângulos, direto no
+    frame, sem cópias do frame inteiro.
+
+    O resultado é o mesmo de `fillPoly` em uma cópia + `addWeighted` no frame
+    todo + `polylines`: onde as zonas se sobrepõem vale a cor da última, e os
+    contornos ficam por cima dos preenchimentos.
+    """
+
+    def __init__(self, zonas, cores, tamanho, alfa=0.3, espessura=2):
+        w, h = tamanho
+        self.alfa = alfa
+        self._preenchimentos = []
+        self._contornos = []
+        zonas = [np.asarray(z, dtype=np.int32).reshape(-1, 2) for z in zonas]
+
+        # Máscaras no frame inteiro só durante a construção
+        cheias = []
+        for zona in zonas:
+            m = np.zeros((h, w), dtype=np.uint8)
+            if len(zona) >= 3:
+                cv2.fillPoly(m, [zona], 1)
+            cheias.append(m.astype(bool))
+        for i, (zona, cor) in enumerate(zip(zonas, cores)):
+            if len(zona) < 3:
+                continue
+            # Zonas posteriores cobrem as anteriores, como no `fillPoly` em sequência
+            preench = cheias[i].copy()
+            for posterior in cheias[i + 1:]:
+                preench &= ~posterior
+            self._adicionar(self._preenchimentos, preench, cor)
+
+            linha = np.zeros((h, w), dtype=np.uint8)
+            cv2.polylines(linha, [zona], True, 1, espessura)
+            self._adicionar(self._contornos, linha.astype(bool), cor)
+
+    @staticmethod
+    def _adicionar(lista, mascara, cor):
+        ys, xs = np.nonzero(mascara)
+        if len(ys) == 0:
+            return
+        y0, y1, x0, x1 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+        local = mascara[y0:y1, x0:x1].astype(np.uint8)
+        cor_local = np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        cor_local[:] = cor
+        lista.append((slice(y0, y1), slice(x0, x1), local, cor_local,
+                      np.empty_like(cor_local)))
+
+    def aplicar(self, frame):
+        """Desenha as zonas em `frame` (BGR, no tamanho de trabalho), no próprio array."""
+        for ys, xs, mascara, cor, buf in self._preenchimentos:
+            roi = frame[ys, xs]
+            cv2.addWeighted(cor, self.alfa, roi, 1 - self.alfa, 0, dst=buf)
+            cv2.copyTo(buf, mascara, roi)
+        for ys, xs, mascara, cor, _ in self._contornos:
+            cv2.copyTo(cor, mascara, frame[ys, xs])
+        return frame
+
+
+class PainelTexto:
+    """
+    Bloco de texto renderizado só quando a `chave` muda (por exemplo, os
+    totais de contagem). Entre mudanças, `desenhar` apenas mistura a imagem
+    já pronta no frame, usando a cobertura do antialiasing como alfa.
+    """
+
+    def __init__(self, fonte=cv2.FONT_HERSHEY_SIMPLEX, espessura=1, tipo_linha=cv2.LINE_AA):
+        self.fonte = fonte
+        self.espessura = espessura
+        self.tipo_linha = tipo_linha
+        self.renderizacoes = 0
+        self._chave = object()
+        self._pronto = None
+        self._cache_forma = None
+        self._cache_pixels = None
+
+    def desenhar(self, frame, chave, linhas):
+        """
+        `linhas` é uma lista de `(texto, (x, y), escala, cor)` ou uma função
+        que a retorna; só é usada quando `chave` difere da última.
+        """
+        if chave != self._chave:
+            self._renderizar(linhas() if callable(linhas) else linhas)
+            self._chave = chave
+        if self._pronto is None:
+            return frame
+
+        # Mistura só os pixels cobertos pelo texto (poucos, mesmo em painéis grandes)
+        ys, xs, inv, cor = self._pixels(frame.shape[:2])
+        px = frame[ys, xs]
+        frame[ys, xs] = (px * inv + cor) // 255
+        return frame
+
+    def _pixels(self, forma):
+        if self._cache_forma != forma:
+            ys, xs, inv, cor = self._pronto
+            ok = (ys >= 0) & (ys < forma[0]) & (xs >= 0) & (xs < forma[1])
+            self._cache_pixels = (ys[ok], xs[ok], inv[ok], cor[ok])
+            self._cache_forma = forma
+        return self._cache_pixels
+
+    def _renderizar(self, linhas):
+        self.renderizacoes += 1
+        if not linhas:
+            self._pronto = None
+            return
+        caixas = []
+        for texto, (x, y), escala, _ in linhas:
+            (tw, th), base = cv2.getTextSize(texto, self.fonte, escala, self.espessura)
+            caixas.append((x, y - th, x + tw, y + base))
+        m = self.espessura + 1
+        x0 = min(c[0] for c in caixas) - m
+        y0 = min(c[1] for c in caixas) - m
+        x1 = max(c[2] for c in caixas) + m
+        y1 = max(c[3] for c in caixas) + m
+
+        alfa = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        cores = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        tmp = np.empty_like(alfa)
+        for texto, (x, y), escala, cor in linhas:
+            tmp[:] = 0
+            cv2.putText(tmp, texto, (x - x0, y - y0), self.fonte, escala, 255,
+                        self.espessura, self.tipo_linha)
+            # Cor pura onde há cobertura; o antialiasing entra pelo alfa
+            cores[tmp > 0] = cor
+            np.maximum(alfa, tmp, out=alfa)
+        ys, xs = np.nonzero(alfa)
+        a = alfa[ys, xs].astype(np.uint16)[:, None]
+        self._pronto = (ys + y0, xs + x0, 255 - a, cores[ys, xs].astype(np.uint16) * a + 127)
+        self._cache_forma = None
+
+
+class RastrosTrilhas:
+    """
+    Últimos `comprimento` centróides de cada trilha, para desenhar o rastro.
+    Trilhas sem detecção há mais de `ttl` frames são esquecidas.
+    """
+
+    def __init__(self, comprimento=30, ttl=30):
+        self.comprimento = comprimento
+        self.ttl = ttl
+        self._pontos = {}
+        self._visto = {}
+
+    def atualizar(self, ids, centros, frame):
+        for tid, c in zip(ids.tolist(), centros.tolist()):
+            pts = self._pontos.get(tid)
+            if pts is None:
+                pts = self._pontos[tid] = deque(maxlen=self.comprimento)
+            pts.append(c)
+            self._visto[tid] = frame
+        velhas = [t for t, f in self._visto.items() if frame - f > self.ttl]
+        for t in velhas:
+            del self._pontos[t], self._visto[t]
+
+    def desenhar(self, frame, cor=(255, 0, 0), espessura=1):
+        linhas = [np.array(p, dtype=np.int32) for p in self._pontos.values() if len(p) > 1]
+        if linhas:
+            cv2.polylines(frame, linhas, False, cor, espessura)
+        return frame
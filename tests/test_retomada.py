@@ -0,0 +1,114 @@
+"""
+Retomada de checkpoint no meio de uma zona: a contagem deve ser a mesma de
+uma execução sem interrupção. Detecções sintéticas de veículos cruzando as
+duas zonas, rastreadas pelo `RastreadorIoU` (sem modelo).
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpoint import carregar_checkpoint, salvar_checkpoint
+from motor_contagem import MotorContagem
+from rastreadores import RastreadorIoU
+from retomada import AquecimentoRetomada
+from zonas import MascaraZonas
+
+CLASSES = {2: "Carro", 7: "Caminhao"}
+TAMANHO = (1280, 720)
+ZONAS = [
+    [(200, 0), (400, 0), (400, 720), (200, 720)],  # entrada
+    [(700, 0), (900, 0), (900, 720), (700, 720)],  # saída
+]
+TOTAL_FRAMES = 320
+AQUECIMENTO = 30
+
+# (primeiro frame, y, velocidade em px/frame, classe)
+VEICULOS = [(0, 200, 4.0, 2), (40, 450, 5.0, 7)]
+
+
+def deteccoes(frame):
+    caixas, classes = [], []
+    for f0, y, vel, classe in VEICULOS:
+        x = (frame - f0) * vel
+        if frame >= f0 and x < TAMANHO[0]:
+            caixas.append((x, y, x + 60, y + 40))
+            classes.append(classe)
+    xyxy = np.array(caixas, dtype=np.float32).reshape(-1, 4)
+    return xyxy, np.full(len(xyxy), 0.9, dtype=np.float32), np.array(classes, dtype=np.int64)
+
+
+def novo_motor(passo):
+    return MotorContagem(MascaraZonas(ZONAS, TAMANHO), list(CLASSES), CLASSES, passo=passo)
+
+
+def contar_direto(passo):
+    motor, rastreador = novo_motor(passo), RastreadorIoU()
+    for f in range(0, TOTAL_FRAMES, passo):
+        motor.atualizar(*rastreador.atualizar(*deteccoes(f)), frame=f)
+    return motor
+
+
+def contar_com_queda(passo, queda, caminho):
+    # Execução interrompida: checkpoint gravado no frame `queda`, como em contar_nVideo
+    motor, rastreador = novo_motor(passo), RastreadorIoU()
+    for f in range(0, queda, passo):
+        motor.atualizar(*rastreador.atualizar(*deteccoes(f)), frame=f)
+    ids_vivos = motor.trilhas.ids_vivos()[0]
+    salvar_checkpoint(caminho, motor.estado(), {"proximo_frame": queda,
+                                                "deslocamento_ids": int(ids_vivos.max()) + 1})
+
+    # Processo novo: motor restaurado e rastreador do zero
+    arrays, meta = carregar_checkpoint(caminho)
+    motor, rastreador = novo_motor(passo), RastreadorIoU()
+    motor.restaurar(arrays)
+    inicio = meta["proximo_frame"]
+    retomada = AquecimentoRetomada(motor, inicio, meta["deslocamento_ids"])
+    for f in range(max(inicio - AQUECIMENTO * passo, 0), TOTAL_FRAMES):
+        if f % passo:
+            continue
+        det = rastreador.atualizar(*deteccoes(f))
+        if f < inicio:
+            retomada.observar(f, *det)
+            continue
+        if not retomada.concluida:
+            retomada.concluir()
+        motor.atualizar(*retomada.traduzir(*det), frame=f)
+    return motor, retomada
+
+
+@pytest.mark.parametrize("passo", [1, 3])
+@pytest.mark.parametrize("queda", [60, 120, 190, 220])
+def test_retomada_conta_como_sem_interrupcao(tmp_path, passo, queda):
+    queda = queda // passo * passo
+    direto = contar_direto(passo)
+    retomado, _ = contar_com_queda(passo, queda, str(tmp_path / "ckpt.npz"))
+
+    assert direto.cont_ent == {"Carro": 1, "Caminhao": 1}
+    assert direto.cont_sai == {"Carro": 1, "Caminhao": 1}
+    assert retomado.cont_ent == direto.cont_ent
+    assert retomado.cont_sai == direto.cont_sai
+
+
+def test_retomada_reata_trilhas_dentro_da_zona(tmp_path):
+    # No frame 190 o carro está na zona de saída e o caminhão na de entrada
+    _, retomada = contar_com_queda(1, 190, str(tmp_path / "ckpt.npz"))
+    assert retomada.reatadas == 2
+    assert retomada.semeadas == 0
+
+
+def test_trilha_nova_dentro_da_zona_e_semeada_sem_contar():
+    motor = novo_motor(1)
+    retomada = AquecimentoRetomada(motor, 10, deslocamento_ids=100)
+    xyxy = np.array([[270, 200, 330, 240]], dtype=np.float32)  # centro na zona de entrada
+    retomada.observar(9, xyxy, np.array([1]), np.array([2]))
+    retomada.concluir()
+    assert retomada.semeadas == 1
+
+    _, ids, _ = retomada.traduzir(xyxy + 4, np.array([1]), np.array([2]))
+    motor.atualizar(xyxy + 4, ids, np.array([2]), frame=10)
+    assert ids.tolist() == [101]
+    assert motor.cont_ent == {"Carro": 0, "Caminhao": 0}
@@ -0,0 +1,110 @@
+import os
+import json
+import threading
+
+import cv2
+import numpy as np
+
+# Máscaras já rasterizadas, indexadas por (arquivo, mtime, tamanho, resoluções)
+_CACHE_MASCARAS = {}
+_CACHE_MAX = 8
+_cache_lock = threading.Lock()
+
+
+def escalar_zonas(areas, dims_origem, dims_saida):
+    """Converte as áreas do JSON (resolução original) para a resolução de trabalho."""
+    fx = dims_saida[0] / dims_origem[0]
+    fy = dims_saida[1] / dims_origem[1]
+    return [
+        np.array([[int(x*fx), int(y*fy)] for x, y in area], dtype=np.int32).reshape(-1, 2)
+        for area in areas
+    ]
+
+
+class MascaraZonas:
+    """
+    Rasteriza as zonas uma única vez em uma máscara de rótulos do tamanho do
+    frame de trabalho. Cada zona ocupa um bit, então zonas sobrepostas são
+    suportadas e a pertinência de um ponto vira uma indexação O(1).
+    """
+
+    def __init__(self, zonas, tamanho):
+        self.zonas = [np.asarray(z, dtype=np.int32).reshape(-1, 2) for z in zonas]
+        self.tamanho = tuple(tamanho)
+        w, h = self.tamanho
+        if len(self.zonas) <= 8:
+            dtype = np.uint8
+        elif len(self.zonas) <= 16:
+            dtype = np.uint16
+        elif len(self.zonas) <= 32:
+            dtype = np.uint32
+        else:
+            raise ValueError("Máximo de 32 zonas por máscara.")
+
+        self.mascara = np.zeros((h, w), dtype=dtype)
+        tmp = np.zeros((h, w), dtype=np.uint8)
+        for i, zona in enumerate(self.zonas):
+            if len(zona) < 3:
+                continue
+            tmp[:] = 0
+            cv2.fillPoly(tmp, [zona], 1)
+            self.mascara |= tmp.astype(dtype) << dtype(i)
+
+    def retangulo(self, margem=0):
+        """
+        Retângulo `(x0, y0, x1, y1)` que envolve a união das zonas, expandido
+        por `margem` pixels e limitado ao frame. Sem zonas, retorna None.
+        """
+        pontos = [z for z in self.zonas if len(z) >= 3]
+        if not pontos:
+            return None
+        pontos = np.concatenate(pontos)
+        w, h = self.tamanho
+        x0, y0 = pontos.min(axis=0) - margem
+        x1, y1 = pontos.max(axis=0) + margem + 1
+        return (max(int(x0), 0), max(int(y0), 0), min(int(x1), w), min(int(y1), h))
+
+    def rotulos(self, pontos):
+        """Bits de zona para um array `(N, 2)` de pontos; fora do frame vale 0."""
+        pontos = np.asarray(pontos)
+        rot = np.zeros(len(pontos), dtype=self.mascara.dtype)
+        if len(pontos) == 0:
+            return rot
+        x = pontos[:, 0].astype(np.int64, copy=False)
+        y = pontos[:, 1].astype(np.int64, copy=False)
+        h, w = self.mascara.shape
+        ok = (x >= 0) & (x < w) & (y >= 0) & (y < h)
+        rot[ok] = self.mascara[y[ok], x[ok]]
+        return rot
+
+    def contem(self, pontos, zona):
+        """Máscara booleana dos pontos dentro da zona de índice `zona`."""
+        return (self.rotulos(pontos) >> zona) & 1 == 1
+
+
+def carregar_areas(areas_path):
+    with open(areas_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def obter_mascara(areas_path, dims_origem, dims_saida):
+    """
+    Retorna a `MascaraZonas` das áreas do JSON na resolução de trabalho.
+    A máscara é reconstruída quando o arquivo de áreas ou alguma das
+    resoluções muda; caso contrário, reaproveita a versão em cache.
+    """
+    st = os.stat(areas_path)
+    chave = (os.path.abspath(areas_path), st.st_mtime_ns, st.st_size,
+             tuple(dims_origem), tuple(dims_saida))
+    with _cache_lock:
+        mascara = _CACHE_MASCARAS.get(chave)
+    if mascara is not None:
+        return mascara
+
+    zonas = escalar_zonas(carregar_areas(areas_path), dims_origem, dims_saida)
+    mascara = MascaraZonas(zonas, dims_saida)
+    with _cache_lock:
+        if len(_CACHE_MASCARAS) >= _CACHE_MAX:
+            _CACHE_MASCARAS.pop(next(iter(_CACHE_MASCARAS)))
+        _CACHE_MASCARAS[chave] = mascara
+    return mascara